@@ -18,11 +18,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "production.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "production.middleware.PrimaryPinMiddleware",
+    "production.middleware.AccessScopeMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -31,7 +34,7 @@ ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "production.metrics.InstrumentedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -55,9 +58,41 @@ DATABASES = {
         "PASSWORD": os.environ.get("DJANGO_DB_PASSWORD", ""),
         "HOST": os.environ.get("DJANGO_DB_HOST", ""),
         "PORT": os.environ.get("DJANGO_DB_PORT", ""),
+        "CONN_MAX_AGE": int(os.environ.get("DJANGO_DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# SQLite production mode: WAL lets readers run alongside the single writer, and IMMEDIATE
+# transactions take the write lock at BEGIN, so concurrent saves wait on busy_timeout instead
+# of failing with "database is locked" when a read lock cannot be upgraded.
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3" and os.environ.get("DJANGO_SQLITE_TUNING", "true").lower() == "true":
+    DATABASES["default"]["OPTIONS"] = {
+        "transaction_mode": "IMMEDIATE",
+        "init_command": ";".join(
+            [
+                "PRAGMA journal_mode=WAL",
+                f"PRAGMA busy_timeout={int(os.environ.get('DJANGO_SQLITE_BUSY_TIMEOUT_MS', '20000'))}",
+                "PRAGMA synchronous=NORMAL",
+                f"PRAGMA cache_size=-{int(os.environ.get('DJANGO_SQLITE_CACHE_KB', '65536'))}",
+            ]
+        ),
+    }
+
+# Read replicas for reports, listings, exports and admin changelists (production.routers).
+# DJANGO_DB_REPLICA_HOSTS="10.0.0.2,10.0.0.3" clones the default settings per host; for local
+# testing DJANGO_DB_REPLICA_NAME=replica.sqlite3 adds a second SQLite file (copy db.sqlite3 to it).
+PRODUCTION_READ_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get("DJANGO_DB_REPLICA_HOSTS", "").split(",")), start=1):
+    DATABASES[f"replica{index}"] = {**DATABASES["default"], "HOST": host.strip(), "TEST": {"MIRROR": "default"}}
+    PRODUCTION_READ_REPLICAS.append(f"replica{index}")
+if os.environ.get("DJANGO_DB_REPLICA_NAME"):
+    DATABASES["replica"] = {**DATABASES["default"], "NAME": os.environ["DJANGO_DB_REPLICA_NAME"], "TEST": {"MIRROR": "default"}}
+    PRODUCTION_READ_REPLICAS.append("replica")
+DATABASE_ROUTERS = ["production.routers.PrimaryReplicaRouter"]
+# Seconds a client keeps reading from the primary after it writes.
+PRODUCTION_REPLICA_PIN_SECONDS = int(os.environ.get("PRODUCTION_REPLICA_PIN_SECONDS", "5"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -76,3 +111,56 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 LOGIN_URL = "/admin/login/"
+
+# Cache alias shared by all app processes (e.g. a Redis/Memcached cache) used to version the
+# in-process target rule index. Leave unset for single-process deployments.
+PRODUCTION_TARGET_CACHE_ALIAS = os.environ.get("PRODUCTION_TARGET_CACHE_ALIAS") or None
+
+# Seconds to cache each user's groups and supervised sections across requests (0 = per request only).
+PRODUCTION_ACCESS_CACHE_TIMEOUT = int(os.environ.get("PRODUCTION_ACCESS_CACHE_TIMEOUT", "0"))
+PRODUCTION_ACCESS_CACHE_ALIAS = os.environ.get("PRODUCTION_ACCESS_CACHE_ALIAS", "default")
+
+# Cache alias holding the master-data version token and the fragments keyed by it (the add-row
+# fragment; cached entries pages embed the token too). Use a cache shared by all app processes so
+# Worker/Item/Section edits are visible everywhere at once; leave unset to render them per request.
+PRODUCTION_CHOICES_CACHE_ALIAS = os.environ.get("PRODUCTION_CHOICES_CACHE_ALIAS") or None
+
+# Cache alias shared by all app processes holding rendered daily-entries pages, keyed by
+# per-(date, section) version tokens that every entry write bumps. Leave unset to render every
+# request: a process-local cache would keep serving (and 304-ing) pages other processes changed.
+# Pages embed master data, so they are only cached when PRODUCTION_CHOICES_CACHE_ALIAS is set too.
+PRODUCTION_PAGE_CACHE_ALIAS = os.environ.get("PRODUCTION_PAGE_CACHE_ALIAS") or None
+PRODUCTION_ENTRIES_CACHE_TIMEOUT = int(os.environ.get("PRODUCTION_ENTRIES_CACHE_TIMEOUT", "600"))
+
+# Seconds browsers may reuse the entry form's target prefetch (production:entry-targets) before
+# revalidating. Stale targets only affect the preview: submitted rows are re-resolved on the server.
+PRODUCTION_TARGETS_MAX_AGE = int(os.environ.get("PRODUCTION_TARGETS_MAX_AGE", "300"))
+
+# Background jobs (exports, recomputes, rollup rebuilds, payroll runs) run by `manage.py run_production_worker`.
+# Result files are written under PRODUCTION_JOB_RESULTS_DIR and removed PRODUCTION_JOB_RESULT_TTL_SECONDS
+# after their job finished; a running job whose heartbeat is older than PRODUCTION_JOB_STALE_SECONDS
+# is requeued, up to PRODUCTION_JOB_MAX_ATTEMPTS tries.
+PRODUCTION_JOB_RESULTS_DIR = Path(os.environ.get("PRODUCTION_JOB_RESULTS_DIR", BASE_DIR / "job_results"))
+PRODUCTION_JOB_RESULT_TTL_SECONDS = int(os.environ.get("PRODUCTION_JOB_RESULT_TTL_SECONDS", str(7 * 24 * 3600)))
+PRODUCTION_JOB_STALE_SECONDS = int(os.environ.get("PRODUCTION_JOB_STALE_SECONDS", "300"))
+PRODUCTION_JOB_MAX_ATTEMPTS = int(os.environ.get("PRODUCTION_JOB_MAX_ATTEMPTS", "3"))
+
+# Largest row count the admin changelists count exactly; unfiltered lists use planner estimates.
+PRODUCTION_ADMIN_COUNT_LIMIT = int(os.environ.get("PRODUCTION_ADMIN_COUNT_LIMIT", "10000"))
+
+# Largest batch accepted by the JSON ingestion endpoint (production:entries-ingest).
+PRODUCTION_INGEST_MAX_ROWS = int(os.environ.get("PRODUCTION_INGEST_MAX_ROWS", "5000"))
+
+# Per-view latency/query metrics served at /metrics. Set PRODUCTION_METRICS_TOKEN to require
+# "Authorization: Bearer <token>" from the scraper; otherwise restrict /metrics at the proxy.
+PRODUCTION_METRICS_ENABLED = os.environ.get("PRODUCTION_METRICS_ENABLED", "true").lower() == "true"
+PRODUCTION_METRICS_TOKEN = os.environ.get("PRODUCTION_METRICS_TOKEN", "")
+# Requests slower than this many milliseconds are logged with their slowest queries (0 disables).
+PRODUCTION_SLOW_REQUEST_MS = float(os.environ.get("PRODUCTION_SLOW_REQUEST_MS", "1000"))
+
+# Months of ProductionEntry kept in the hot table, counting the current one; older months are moved
+# to the archive table by `manage.py archive_production`.
+PRODUCTION_ARCHIVE_HOT_MONTHS = int(os.environ.get("PRODUCTION_ARCHIVE_HOT_MONTHS", "13"))
+
+# Serve the entry-row and listing endpoints with their async views; enable when running under ASGI.
+PRODUCTION_ASYNC_VIEWS = os.environ.get("PRODUCTION_ASYNC_VIEWS", "false").lower() == "true"
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from production.views import metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("production/", include("production.urls")),
+    path("metrics", metrics, name="metrics"),
 ]
@@ -1,6 +1,98 @@
-from django.contrib import admin
+from datetime import date
 
-from .models import Item, ProductionEntry, Section, TargetRule, Worker
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from . import jobs, payroll
+from .models import (
+    ApiToken,
+    DailyProductionSummary,
+    Item,
+    Job,
+    PayrollLine,
+    PayrollRun,
+    ProductionArchive,
+    ProductionEntry,
+    Section,
+    TargetRule,
+    Worker,
+)
+from .routers import replica_reads
+
+
+class ReplicaChangeListMixin:
+    # Changelists are the heavy admin reads; serve their GETs from a read replica.
+    def changelist_view(self, request, extra_context=None):
+        return replica_reads(super().changelist_view)(request, extra_context)
+
+
+DEFAULT_COUNT_LIMIT = 10000
+
+
+def _estimated_rows(model, alias: str):
+    # Planner statistics instead of a full scan; None where the backend keeps none.
+    connection = connections[alias]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s", [table]
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    # An exact COUNT(*) scans the whole table. Unfiltered changelists use the planner's estimate;
+    # otherwise at most PRODUCTION_ADMIN_COUNT_LIMIT rows are counted, so a huge filtered result
+    # pages up to the limit and is narrowed further with the date hierarchy or filters.
+    @cached_property
+    def count(self) -> int:
+        limit = getattr(settings, "PRODUCTION_ADMIN_COUNT_LIMIT", DEFAULT_COUNT_LIMIT)
+        if not self.object_list.query.where:
+            estimate = _estimated_rows(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return self.object_list[:limit].count()
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    # Foreign-key filter that searches the related admin instead of listing every row.
+    template = "admin/production/autocomplete_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.admin_site = model_admin.admin_site
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self) -> bool:
+        return True
+
+    def widget_html(self) -> str:
+        choice = forms.ModelChoiceField(
+            queryset=self.field.related_model._default_manager.all(),
+            widget=AutocompleteSelect(self.field, self.admin_site, attrs={"data-filter-param": self.lookup_kwarg}),
+            required=False,
+        )
+        value = self.lookup_val[-1] if self.lookup_val else None
+        return choice.widget.render(f"filter-{self.field_path}", value)
+
+    @staticmethod
+    def media(field, admin_site) -> forms.Media:
+        return AutocompleteSelect(field, admin_site).media + forms.Media(
+            js=["admin/js/jquery.init.js", "production/admin/autocomplete_filter.js"]
+        )
 
 
 @admin.register(Section)
@@ -28,10 +120,53 @@ class TargetRuleAdmin(admin.ModelAdmin):
     list_display = ("section", "item", "target_qty", "shift_hours", "start_date", "end_date")
     search_fields = ("section__name", "item__name")
     list_filter = ("section", "item")
+    actions = ["recompute_entries"]
+
+    @admin.action(description="Recompute outcomes of entries covered by selected rules (and their ranges before edits)")
+    def recompute_entries(self, request, queryset):
+        queued = self._queue_recompute(request, queryset)
+        TargetRule.objects.filter(pk__in=[rule.pk for rule in queryset]).update(stale_start=None, stale_end=None)
+        self.message_user(
+            request, f"Queued {len(queued)} recompute job(s): {', '.join(f'#{job.id}' for job in queued)}.", messages.SUCCESS
+        )
+
+    def delete_model(self, request, obj):
+        queued = self._queue_recompute(request, [obj])
+        super().delete_model(request, obj)
+        self._report_delete(request, queued)
+
+    def delete_queryset(self, request, queryset):
+        queued = self._queue_recompute(request, list(queryset))
+        super().delete_queryset(request, queryset)
+        self._report_delete(request, queued)
+
+    def _report_delete(self, request, queued):
+        if queued:
+            self.message_user(
+                request, f"Queued {len(queued)} recompute job(s) for entries the deleted rules covered.", messages.INFO
+            )
+
+    def _queue_recompute(self, request, rules):
+        # Long ranges would outlive the request; run_production_worker picks the jobs up. Each job
+        # spans the rule's current range and any range it covered before an edit (stale_*).
+        queued = []
+        for rule in rules:
+            start = min(day for day in (rule.start_date, rule.stale_start) if day)
+            end = max(day for day in (rule.end_date or date.today(), rule.stale_end) if day)
+            if end < start:
+                continue
+            params = {
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "section_ids": [rule.section_id],
+                "item_ids": [rule.item_id],
+            }
+            queued.append(jobs.enqueue(Job.KIND_RECOMPUTE, params=params, user=request.user))
+        return queued
 
 
 @admin.register(ProductionEntry)
-class ProductionEntryAdmin(admin.ModelAdmin):
+class ProductionEntryAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = (
         "entry_date",
         "section",
@@ -43,6 +178,128 @@ class ProductionEntryAdmin(admin.ModelAdmin):
         "overtime_hours",
         "target_met",
     )
-    list_filter = ("entry_date", "section", "item", "worker")
+    list_filter = ("section", ("item", AutocompleteFilter), ("worker", AutocompleteFilter))
+    list_select_related = ("section", "worker", "item")
+    # Drill-down and ordering both run on production_entry_date_idx (entry_date, id).
+    date_hierarchy = "entry_date"
+    ordering = ("-entry_date", "-id")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     search_fields = ("worker__name", "item__name")
+    autocomplete_fields = ("section", "worker", "item")
     readonly_fields = ("created_at", "updated_at", "created_by")
+
+    @property
+    def media(self):
+        return super().media + AutocompleteFilter.media(ProductionEntry._meta.get_field("worker"), self.admin_site)
+
+
+@admin.register(DailyProductionSummary)
+class DailyProductionSummaryAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = (
+        "entry_date",
+        "section",
+        "item",
+        "actual_qty",
+        "target_qty",
+        "overtime_hours",
+        "entry_count",
+        "target_met_count",
+    )
+    list_filter = ("section",)
+    list_select_related = ("section", "item")
+    date_hierarchy = "entry_date"
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
+
+
+@admin.register(ProductionArchive)
+class ProductionArchiveAdmin(admin.ModelAdmin):
+    # Months are archived and restored with the archive_production / restore_production commands.
+    list_display = ("month", "entry_count", "archived_at")
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
+
+    def has_delete_permission(self, request, obj=None) -> bool:
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    # Jobs are queued from views and admin actions and run by run_production_worker.
+    list_display = ("id", "kind", "status", "progress", "message", "attempts", "worker", "created_by", "created_at", "finished_at")
+    list_filter = ("status", "kind")
+    list_select_related = ("created_by",)
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
+
+
+class PayrollLineInline(admin.TabularInline):
+    model = PayrollLine
+    fields = ("worker", "days_worked", "days_target_met", "overtime_hours", "entry_count")
+    readonly_fields = fields
+    ordering = ("worker__name",)
+    extra = 0
+    can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("worker")
+
+    def has_add_permission(self, request, obj=None) -> bool:
+        return False
+
+
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    # Runs are computed by payroll jobs (or run_payroll); the admin only reviews and finalizes them.
+    list_display = ("period_start", "period_end", "worker_count", "computed_at", "computed_by", "finalized_at")
+    list_select_related = ("computed_by",)
+    readonly_fields = ("period_start", "period_end", "worker_count", "computed_at", "computed_by", "finalized_at")
+    inlines = [PayrollLineInline]
+    actions = ["rerun", "finalize"]
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    @admin.action(description="Recompute selected payroll runs")
+    def rerun(self, request, queryset):
+        queued = [
+            jobs.enqueue(
+                Job.KIND_PAYROLL,
+                params={"start": run.period_start.isoformat(), "end": run.period_end.isoformat()},
+                user=request.user,
+            )
+            for run in queryset.filter(finalized_at__isnull=True)
+        ]
+        self.message_user(
+            request, f"Queued {len(queued)} payroll job(s): {', '.join(f'#{job.id}' for job in queued)}.", messages.SUCCESS
+        )
+
+    @admin.action(description="Finalize selected payroll runs")
+    def finalize(self, request, queryset):
+        finalized = sum(payroll.finalize(run) for run in queryset)
+        self.message_user(request, f"Finalized {finalized} payroll run(s).", messages.SUCCESS)
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    # Tokens are issued with `manage.py create_api_token`; the raw key is only shown then.
+    list_display = ("name", "user", "is_active", "created_at")
+    list_filter = ("is_active",)
+    search_fields = ("name", "user__username")
+    readonly_fields = ("user", "key_hash", "created_at")
+
+    def has_add_permission(self, request) -> bool:
+        return False
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import ArchivedProductionEntry, ProductionArchive, ProductionEntry, ProductionEntryHistory
+from .pagecache import entry_pages
+
+DEFAULT_HOT_MONTHS = 13
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def month_end(value: date) -> date:
+    return (month_start(value) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def default_cutoff(today: Optional[date] = None) -> date:
+    # First day of the oldest month kept hot; PRODUCTION_ARCHIVE_HOT_MONTHS counts the current month.
+    months = max(1, getattr(settings, "PRODUCTION_ARCHIVE_HOT_MONTHS", DEFAULT_HOT_MONTHS))
+    cutoff = month_start(today or date.today())
+    for _ in range(months - 1):
+        cutoff = month_start(cutoff - timedelta(days=1))
+    return cutoff
+
+
+def entry_source(start: date, end: date):
+    # Model to read entries in [start, end] from: the hot table, or the history view once
+    # the range reaches an archived month.
+    if ProductionArchive.objects.filter(month__gte=month_start(start), month__lte=end).exists():
+        return ProductionEntryHistory
+    return ProductionEntry
+
+
+def archived_months(dates: Iterable[date]) -> set[date]:
+    # Archived months are read-only: a row written there would share its natural key with an
+    # archived copy, double count through the history view and block restore_month.
+    months = {month_start(value) for value in dates}
+    return set(ProductionArchive.objects.filter(month__in=months).values_list("month", flat=True)) if months else set()
+
+
+def _move(source, target, start: date, end: date) -> int:
+    # Set-based copy keeps ids and timestamps (bulk_create would re-stamp auto_now fields).
+    # The delete only removes rows that were copied, so concurrent backdated inserts stay put.
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(field.column) for field in ArchivedProductionEntry._meta.concrete_fields)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(target._meta.db_table)} ({columns}) "
+            f"SELECT {columns} FROM {quote(source._meta.db_table)} WHERE {quote('entry_date')} BETWEEN %s AND %s",
+            [connection.ops.adapt_datefield_value(start), connection.ops.adapt_datefield_value(end)],
+        )
+        moved = cursor.rowcount
+    copied = target.objects.filter(entry_date__range=(start, end)).values("id")
+    # _raw_delete skips per-row post_delete signals: daily rollups keep covering archived months.
+    source.objects.filter(entry_date__range=(start, end), id__in=copied)._raw_delete(source.objects.db)
+    return moved
+
+
+def _touch_pages(model, start: date, end: date) -> None:
+    entry_pages.touch(model.objects.filter(entry_date__range=(start, end)).values_list("entry_date", "section_id").distinct())
+
+
+def archive_month(month: date) -> int:
+    start, end = month_start(month), month_end(month)
+    with transaction.atomic():
+        _touch_pages(ProductionEntry, start, end)
+        moved = _move(ProductionEntry, ArchivedProductionEntry, start, end)
+        if moved:
+            ProductionArchive.objects.get_or_create(month=start)
+            ProductionArchive.objects.filter(month=start).update(entry_count=F("entry_count") + moved)
+    return moved
+
+
+def restore_month(month: date) -> int:
+    start, end = month_start(month), month_end(month)
+    with transaction.atomic():
+        _touch_pages(ArchivedProductionEntry, start, end)
+        moved = _move(ArchivedProductionEntry, ProductionEntry, start, end)
+        ProductionArchive.objects.filter(month=start).delete()
+    return moved
+
+
+def months_to_archive(cutoff: date) -> list[date]:
+    return list(ProductionEntry.objects.filter(entry_date__lt=month_start(cutoff)).dates("entry_date", "month"))
+
+
+def archive_before(cutoff: date, progress: Optional[Callable[[date, int], None]] = None) -> int:
+    # One transaction per month, so an interrupted run leaves every month wholly hot or archived.
+    total = 0
+    for month in months_to_archive(cutoff):
+        moved = archive_month(month)
+        total += moved
+        if progress:
+            progress(month, moved)
+    return total
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import platform
+import statistics
+import time
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Optional
+from uuid import uuid4
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from .models import Item, ProductionEntry, Section, TargetRule, Worker
+from .pagecache import entry_pages
+from .resolver import target_resolver
+from .urls import build_urlpatterns
+
+DEFAULT_SIZES = (1, 50, 500)
+ASYNC_BURST = 100
+ASYNC_CONCURRENCY = 20
+
+
+class RootURLConf:
+    # ROOT_URLCONF stand-in that binds the production routes to their sync or async views.
+    def __init__(self, *, async_views: bool) -> None:
+        self.urlpatterns = [path("production/", include((build_urlpatterns(async_views=async_views), "production")))]
+
+
+def measure(name: str, func: Callable[[], object], repeat: int) -> dict:
+    timings, queries = [], []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(ctx.captured_queries))
+    return {
+        "name": name,
+        "repeat": repeat,
+        "wall_ms": {
+            "min": round(min(timings), 3),
+            "median": round(statistics.median(timings), 3),
+            "max": round(max(timings), 3),
+        },
+        "queries": {"min": min(queries), "max": max(queries)},
+    }
+
+
+def _rolled_back(func: Callable[[], object]) -> Callable[[], object]:
+    def run():
+        with transaction.atomic():
+            func()
+            transaction.set_rollback(True)
+
+    return run
+
+
+def _check(response, expected: int = 200):
+    if response.status_code != expected:
+        raise RuntimeError(f"{response.request['PATH_INFO']} returned {response.status_code}")
+    return response
+
+
+def _sync_burst(client: Client, url: str, params: dict, count: int) -> Callable[[], object]:
+    def run():
+        for _ in range(count):
+            _check(client.get(url, params))
+
+    return run
+
+
+def _async_burst(client: AsyncClient, url: str, params: dict, count: int, concurrency: int) -> Callable[[], object]:
+    async def run():
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with gate:
+                _check(await client.get(url, params))
+
+        await asyncio.gather(*(one() for _ in range(count)))
+
+    return async_to_sync(run)
+
+
+def compare_wsgi_asgi(user, host: str, scenarios: list[tuple[str, str, dict]], repeat: int, count: int, concurrency: int) -> list[dict]:
+    # Same routes served by the sync views through the WSGI handler (sequential requests)
+    # and by the async views through the ASGI handler (count requests, concurrency in flight).
+    results = []
+    for name, route, params in scenarios:
+        with override_settings(ROOT_URLCONF=RootURLConf(async_views=False)):
+            client = Client(HTTP_HOST=host)
+            client.force_login(user)
+            results.append(measure(f"{name}_wsgi_{count}", _sync_burst(client, reverse(route), params, count), repeat))
+        # AsyncClient always sends Host: testserver.
+        with override_settings(ROOT_URLCONF=RootURLConf(async_views=True), ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            aclient = AsyncClient()
+            aclient.force_login(user)
+            burst = _async_burst(aclient, reverse(route), params, count, concurrency)
+            results.append(measure(f"{name}_asgi_{count}x{concurrency}", burst, repeat))
+    return results
+
+
+def run_benchmarks(
+    *,
+    repeat: int = 5,
+    sizes=DEFAULT_SIZES,
+    host: str = "localhost",
+    asgi: bool = False,
+    burst: int = ASYNC_BURST,
+    concurrency: int = ASYNC_CONCURRENCY,
+) -> dict:
+    # Runs inside one transaction that is rolled back, so the database is left untouched.
+    busiest = (
+        ProductionEntry.objects.order_by()
+        .values("section_id")
+        .annotate(total=Count("id"), last=Max("entry_date"))
+        .order_by("-total")
+        .first()
+    )
+    section = Section.objects.get(pk=busiest["section_id"]) if busiest else Section.objects.filter(is_active=True).first()
+    if section is None:
+        raise RuntimeError("No sections to benchmark; run seed_production first")
+    entry_date = busiest["last"] if busiest else date.today()
+    workers = list(Worker.objects.filter(is_active=True).values_list("id", flat=True)[: max(sizes)])
+    # Explicit ordering: DISTINCT would otherwise also cover TargetRule's default ordering columns.
+    items = list(TargetRule.objects.filter(section=section).order_by("item_id").values_list("item_id", flat=True).distinct()[:50])
+    items = items or list(Item.objects.filter(is_active=True).values_list("id", flat=True)[:50])
+    if not workers or not items:
+        raise RuntimeError("Need active workers and items; run seed_production first")
+    # Distinct (worker, item) rows, so each POST really writes `size` rows instead of the formset
+    # rejecting or collapsing repeats.
+    pairs = list(itertools.islice(itertools.product(workers, items), max(sizes)))
+    if len(pairs) < max(sizes):
+        raise RuntimeError(f"Need {max(sizes)} distinct worker/item pairs, found {len(pairs)}; seed more workers")
+
+    results = []
+    with transaction.atomic():
+        user = get_user_model().objects.create(username=f"benchmark-{uuid4().hex[:8]}", is_superuser=True)
+        client = Client(HTTP_HOST=host)
+        client.force_login(user)
+
+        for size in sizes:
+            data = {
+                "entry_date": entry_date.isoformat(),
+                "section": section.id,
+                "form-TOTAL_FORMS": str(size),
+                "form-INITIAL_FORMS": "0",
+                "form-MIN_NUM_FORMS": "0",
+                "form-MAX_NUM_FORMS": "1000",
+            }
+            for index, (worker_id, item_id) in enumerate(pairs[:size]):
+                data[f"form-{index}-worker"] = worker_id
+                data[f"form-{index}-item"] = item_id
+                data[f"form-{index}-target_qty"] = "0"
+                data[f"form-{index}-actual_qty"] = "100"
+                data[f"form-{index}-shift_hours"] = "0"
+            post = _rolled_back(lambda data=data: _check(client.post(reverse("production:entry"), data), 302))
+            results.append(measure(f"production_entry_post_{size}", post, repeat))
+
+        list_params = {"date": entry_date.isoformat(), "section": section.id}
+        row_params = {"section": section.id, "entry_date": entry_date.isoformat(), "form_count": 1}
+        cached = entry_pages.enabled
+
+        def list_page():
+            return _check(client.get(reverse("production:entries"), list_params))
+
+        # production_entries times the rendered listing: after the first iteration a configured
+        # page cache would only be timing cache hits, which get their own scenario below.
+        with override_settings(PRODUCTION_PAGE_CACHE_ALIAS=None):
+            results.append(measure("production_entries", list_page, repeat))
+            results.append(measure("production_entry_row", lambda: _check(client.get(reverse("production:entry-row"), row_params)), repeat))
+            if asgi:
+                scenarios = [("production_entry_row", "production:entry-row", row_params), ("production_entries", "production:entries", list_params)]
+                results += compare_wsgi_asgi(user, host, scenarios, repeat, burst, concurrency)
+        if cached:
+            list_page()
+            results.append(measure("production_entries_cached", list_page, repeat))
+
+        lookups = list(
+            ProductionEntry.objects.filter(section=section).order_by("-entry_date").values_list("section_id", "item_id", "entry_date")[:1000]
+        ) or [(section.id, item_id, entry_date) for item_id in items]
+
+        def resolve_all():
+            for section_id, item_id, target_date in lookups:
+                target_resolver.resolve(section=section_id, item=item_id, target_date=target_date)
+
+        def resolve_cold():
+            target_resolver.clear()
+            resolve_all()
+
+        results.append(measure(f"target_resolution_cold_{len(lookups)}", resolve_cold, repeat))
+        results.append(measure(f"target_resolution_warm_{len(lookups)}", resolve_all, repeat))
+
+        samples = [(Decimal(90 + i % 60), Decimal("100"), Decimal("8")) for i in range(100000)]
+        results.append(
+            measure("compute_overtime_100000", lambda: [ProductionEntry.compute_overtime(*args) for args in samples], repeat)
+        )
+        transaction.set_rollback(True)
+
+    return {
+        "meta": {
+            "timestamp": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "entries": ProductionEntry.objects.count(),
+            "workers": Worker.objects.count(),
+            "section": section.code,
+            "entry_date": entry_date.isoformat(),
+        },
+        "results": results,
+    }
+
+
+def compare(previous: dict, current: dict, threshold: float = 0.2) -> list[str]:
+    # Flags scenarios whose median wall time or max query count grew by more than threshold.
+    before = {result["name"]: result for result in previous.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        old: Optional[dict] = before.get(result["name"])
+        if not old:
+            continue
+        old_ms, new_ms = old["wall_ms"]["median"], result["wall_ms"]["median"]
+        if old_ms and new_ms > old_ms * (1 + threshold):
+            regressions.append(f"{result['name']}: median {old_ms}ms -> {new_ms}ms")
+        if result["queries"]["max"] > old["queries"]["max"]:
+            regressions.append(f"{result['name']}: queries {old['queries']['max']} -> {result['queries']['max']}")
+    return regressions
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from datetime import date
+from uuid import uuid4
+
+from django import forms
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Exists, OuterRef, Q
+from django.forms.utils import flatatt
+from django.urls import reverse
+from django.utils.html import format_html
+
+from .models import Item, TargetRule, Worker
+
+VERSION_KEY = "production:master-data:version"
+FRAGMENT_TIMEOUT = 3600
+LOOKUP_LIMIT = 20
+LOOKUP_MAX = 50
+LOOKUP_MODELS = {"worker": (Worker, "employee_code"), "item": (Item, "sku")}
+
+
+def master_label(kind: str, obj) -> str:
+    return f"{obj.name} ({getattr(obj, LOOKUP_MODELS[kind][1])})"
+
+
+def lookup(kind: str, term: str, *, section_id: int, on: date, limit: int = LOOKUP_LIMIT) -> list[dict]:
+    # Code prefix or name substring over active rows, matching what the entry form accepts.
+    # Items with a target rule in the section on the entry date are listed first; the rest can
+    # still be picked and save with the "No target rule found" warning. Only PostgreSQL has
+    # indexes for these matches (trigram, migration 0008); elsewhere the lookup scans active rows.
+    if kind not in LOOKUP_MODELS:
+        raise ValueError(f"Unknown master data kind {kind!r}")
+    model, code = LOOKUP_MODELS[kind]
+    rows = model.objects.filter(is_active=True)
+    term = term.strip()
+    if term:
+        rows = rows.filter(Q(**{f"{code}__istartswith": term}) | Q(name__icontains=term))
+    order = ["name", "id"]
+    if kind == "item":
+        rules = TargetRule.objects.filter(section_id=section_id, item=OuterRef("pk"), start_date__lte=on).filter(
+            Q(end_date__isnull=True) | Q(end_date__gte=on)
+        )
+        rows = rows.annotate(has_rule=Exists(rules))
+        order.insert(0, "-has_rule")
+    rows = rows.order_by(*order).values_list("id", "name", code)[: max(1, min(limit, LOOKUP_MAX))]
+    return [{"id": pk, "text": f"{name} ({value})"} for pk, name, value in rows]
+
+
+class MasterDataFragments:
+    # Version token for fragments rendered from worker/item/section master data (the add-row
+    # fragment, the daily entries page). Worker/Item/Section saves bump the version. Like the
+    # page cache, this is off unless PRODUCTION_CHOICES_CACHE_ALIAS names a shared cache.
+
+    @property
+    def enabled(self) -> bool:
+        return bool(getattr(settings, "PRODUCTION_CHOICES_CACHE_ALIAS", None))
+
+    def _cache(self):
+        return caches[settings.PRODUCTION_CHOICES_CACHE_ALIAS]
+
+    def version(self) -> str:
+        cache = self._cache()
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    async def aversion(self) -> str:
+        cache = self._cache()
+        version = await cache.aget(VERSION_KEY)
+        if version is None:
+            await cache.aadd(VERSION_KEY, uuid4().hex, None)
+            version = await cache.aget(VERSION_KEY)
+        return version
+
+    def invalidate(self) -> None:
+        if self.enabled:
+            self._cache().set(VERSION_KEY, uuid4().hex, None)
+
+    def cached_fragment(self, name: str, *parts, build) -> str:
+        if not self.enabled:
+            return str(build())
+        cache = self._cache()
+        key = ":".join(["production:fragment", name, *(str(part) for part in parts), self.version()])
+        html = cache.get(key)
+        if html is None:
+            html = str(build())
+            cache.set(key, html, FRAGMENT_TIMEOUT)
+        return html
+
+    async def acached_fragment(self, name: str, *parts, build) -> str:
+        # build is an async callable, only awaited on a miss.
+        if not self.enabled:
+            return str(await build())
+        cache = self._cache()
+        key = ":".join(["production:fragment", name, *(str(part) for part in parts), await self.aversion()])
+        html = await cache.aget(key)
+        if html is None:
+            html = str(await build())
+            await cache.aset(key, html, FRAGMENT_TIMEOUT)
+        return html
+
+
+master_fragments = MasterDataFragments()
+
+
+class LookupInput(forms.Widget):
+    # Search box over the worker/item lookup endpoints. Only the selected row's label is
+    # rendered, so entry pages and add-row fragments stay the same size however much
+    # master data there is. Bound formsets pass their preloaded rows to avoid a query.
+    def __init__(self, kind: str, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+        self.preloaded: dict = {}
+
+    def _label(self, value: str) -> str:
+        if not value:
+            return ""
+        obj = self.preloaded.get(value)
+        if obj is None and value.isdigit():
+            obj = LOOKUP_MODELS[self.kind][0].objects.filter(pk=value).first()
+        return master_label(self.kind, obj) if obj is not None else ""
+
+    def render(self, name, value, attrs=None, renderer=None):
+        final_attrs = self.build_attrs(self.attrs, attrs)
+        input_id = final_attrs.pop("id", None)
+        value = "" if value is None else str(getattr(value, "pk", value))
+        return format_html(
+            '<span class="lookup" data-lookup-url="{}"{}>'
+            '<input type="search" id="{}" value="{}" placeholder="Code or name" autocomplete="off">'
+            '<input type="hidden" name="{}" value="{}"></span>',
+            reverse(f"production:{self.kind}-lookup"),
+            flatatt(final_attrs),
+            input_id or "",
+            self._label(value),
+            name,
+            value,
+        )
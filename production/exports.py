@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import csv
+import json
+from datetime import date
+from typing import Iterable, Iterator, Optional
+
+from .archive import entry_source
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = [
+    ("entry_date", "entry_date"),
+    ("section_code", "section__code"),
+    ("section", "section__name"),
+    ("employee_code", "worker__employee_code"),
+    ("worker", "worker__name"),
+    ("sku", "item__sku"),
+    ("item", "item__name"),
+    ("target_qty", "target_qty"),
+    ("actual_qty", "actual_qty"),
+    ("shift_hours", "shift_hours"),
+    ("overtime_hours", "overtime_hours"),
+    ("target_met", "target_met"),
+]
+
+
+class Echo:
+    # csv.writer needs a file-like object; hand each formatted line straight back.
+    def write(self, value: str) -> str:
+        return value
+
+
+def export_queryset(
+    *,
+    sections,
+    start: date,
+    end: date,
+    section_id: Optional[int] = None,
+    worker_id: Optional[int] = None,
+    item_id: Optional[int] = None,
+):
+    entries = entry_source(start, end).objects.filter(entry_date__range=(start, end), section__in=sections)
+    if section_id:
+        entries = entries.filter(section_id=section_id)
+    if worker_id:
+        entries = entries.filter(worker_id=worker_id)
+    if item_id:
+        entries = entries.filter(item_id=item_id)
+    return entries.order_by("entry_date", "section_id", "worker_id", "id").values_list(
+        *(lookup for _, lookup in EXPORT_COLUMNS)
+    )
+
+
+def iter_rows(queryset) -> Iterator[tuple]:
+    return queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def stream_csv(rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows: Iterable[tuple]) -> Iterator[str]:
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), default=str) + "\n"
@@ -4,37 +4,85 @@ from datetime import date
 from typing import Optional
 
 from django import forms
+from django.utils.functional import cached_property
 
-from .models import Item, ProductionEntry, Section, TargetRule, Worker
+from .archive import archived_months
+from .choices import LookupInput
+from .models import Item, ProductionEntry, Section, Worker
+from .resolver import target_resolver
+from .services import BatchLookups, load_batch
+
+
+class PreloadedModelChoiceField(forms.ModelChoiceField):
+    # When a formset preloads the submitted objects, resolve pks from that mapping
+    # instead of issuing one queryset.get() per form.
+    preloaded: Optional[dict] = None
+
+    def to_python(self, value):
+        if self.preloaded is None or value in self.empty_values or isinstance(value, self.queryset.model):
+            return super().to_python(value)
+        obj = self.preloaded.get(str(value))
+        if obj is None:
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return obj
 
 
 class ProductionEntryForm(forms.ModelForm):
-    def __init__(self, *args, section: Optional[Section] = None, entry_date: Optional[date] = None, **kwargs):
+    def __init__(
+        self,
+        *args,
+        section: Optional[Section] = None,
+        entry_date: Optional[date] = None,
+        lookups: Optional[BatchLookups] = None,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.section = section
         self.entry_date = entry_date
+        self.lookups = lookups
         self.fields["worker"].queryset = Worker.objects.filter(is_active=True)
         self.fields["item"].queryset = Item.objects.filter(is_active=True)
+        if lookups is not None:
+            self.fields["worker"].preloaded = self.fields["worker"].widget.preloaded = lookups.workers
+            self.fields["item"].preloaded = self.fields["item"].widget.preloaded = lookups.items
         if section:
             self.fields["worker"].label = f"Worker ({section})"
             self.fields["item"].label = f"Item ({section})"
+            self.fields["worker"].widget.attrs["data-section"] = self.fields["item"].widget.attrs["data-section"] = section.pk
 
     class Meta:
         model = ProductionEntry
         fields = ["worker", "item", "target_qty", "actual_qty", "shift_hours"]
+        field_classes = {
+            "worker": PreloadedModelChoiceField,
+            "item": PreloadedModelChoiceField,
+        }
         widgets = {
+            "worker": LookupInput("worker"),
+            "item": LookupInput("item"),
             "target_qty": forms.NumberInput(attrs={"readonly": True, "step": "0.01"}),
             "actual_qty": forms.NumberInput(attrs={"step": "0.01"}),
             "shift_hours": forms.NumberInput(attrs={"step": "0.25"}),
         }
 
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        if self.lookups is not None:
+            # Already checked against the batch-loaded active querysets; skip the per-row FK exists() query.
+            exclude.update({"worker", "item"})
+        return exclude
+
     def _hydrate_targets(self) -> None:
         if not self.section or not self.entry_date or not self.cleaned_data.get("item"):
             return
-        rule = (
-            TargetRule.objects.for_section_item_date(section=self.section, item=self.cleaned_data["item"], target_date=self.entry_date)
-            .first()
-        )
+        if self.lookups is not None:
+            rule = self.lookups.targets.get(self.cleaned_data["item"].pk)
+        else:
+            rule = target_resolver.resolve(section=self.section, item=self.cleaned_data["item"], target_date=self.entry_date)
         if rule:
             self.cleaned_data["target_qty"] = rule.target_qty
             self.cleaned_data["shift_hours"] = rule.shift_hours
@@ -49,4 +97,40 @@ class ProductionEntryForm(forms.ModelForm):
         return cleaned
 
 
-ProductionEntryFormSet = forms.formset_factory(ProductionEntryForm, extra=0, min_num=1, validate_min=True)
+class BaseProductionEntryFormSet(forms.BaseFormSet):
+    def _raw_values(self, field_name: str) -> list:
+        return [self.data.get(f"{self.add_prefix(i)}-{field_name}") for i in range(self.total_form_count())]
+
+    @cached_property
+    def lookups(self) -> BatchLookups:
+        return load_batch(
+            section=self.form_kwargs.get("section"),
+            entry_date=self.form_kwargs.get("entry_date"),
+            worker_ids=self._raw_values("worker"),
+            item_ids=self._raw_values("item"),
+        )
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        if self.is_bound:
+            kwargs["lookups"] = self.lookups
+        return kwargs
+
+    def clean(self):
+        entry_date = self.form_kwargs.get("entry_date")
+        if entry_date and archived_months([entry_date]):
+            raise forms.ValidationError(f"{entry_date:%Y-%m} is archived; restore it before changing its entries.", code="archived")
+        # Rows are upserted on (date, section, worker, item); a repeated pair would silently keep only the last.
+        seen = set()
+        for form in self.forms:
+            pair = (form.cleaned_data.get("worker"), form.cleaned_data.get("item"))
+            if None in pair:
+                continue
+            if pair in seen:
+                raise forms.ValidationError(f"{pair[0]} has more than one row for {pair[1]}.", code="duplicate")
+            seen.add(pair)
+
+
+ProductionEntryFormSet = forms.formset_factory(
+    ProductionEntryForm, formset=BaseProductionEntryFormSet, extra=0, min_num=1, validate_min=True
+)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import rollups
+from .models import ProductionEntry, Section
+from .resolver import target_resolver
+from .services import RowError, _row_decimal
+
+GRID_FIELDS = ["target_qty", "actual_qty", "shift_hours", "overtime_hours", "target_met", "updated_at"]
+EDITABLE_FIELDS = ("actual_qty", "shift_hours")
+
+
+def version(entry: ProductionEntry) -> str:
+    # Optimistic-concurrency token: every write path stamps updated_at.
+    return entry.updated_at.isoformat()
+
+
+def grid_row(entry: ProductionEntry) -> dict:
+    return {
+        "id": entry.id,
+        "version": version(entry),
+        "target_qty": str(entry.target_qty),
+        "actual_qty": str(entry.actual_qty),
+        "shift_hours": str(entry.shift_hours),
+        "overtime_hours": str(entry.overtime_hours),
+        "target_met": entry.target_met,
+    }
+
+
+@dataclass
+class GridResult:
+    updated: list[ProductionEntry] = field(default_factory=list)
+    # Rows whose version no longer matches (or that are gone), with their current values.
+    conflicts: list[dict] = field(default_factory=list)
+    # Per-cell rejections: {"id", "field", "error"}.
+    errors: list[dict] = field(default_factory=list)
+
+
+def _parse(edits: list) -> dict[int, dict]:
+    parsed: dict[int, dict] = {}
+    for edit in edits:
+        if not isinstance(edit, dict) or not str(edit.get("id", "")).isdigit() or not edit.get("version"):
+            raise RowError("each row needs an id and a version")
+        values = {name: _row_decimal(edit, name) for name in EDITABLE_FIELDS if name in edit}
+        parsed[int(edit["id"])] = {"version": str(edit["version"]), **values}
+    return parsed
+
+
+def apply_edits(*, section: Section, entry_date: date, edits: list) -> GridResult:
+    # All-or-nothing: one locking SELECT for the edited rows, then one bulk_update if every
+    # submitted version still matches. Targets are re-resolved like the entry formset does.
+    parsed = _parse(edits)
+    result = GridResult()
+    if not parsed:
+        return result
+    with transaction.atomic():
+        entries = {
+            entry.id: entry
+            for entry in ProductionEntry.objects.select_for_update().filter(section=section, entry_date=entry_date, id__in=list(parsed))
+        }
+        for entry_id, edit in parsed.items():
+            entry = entries.get(entry_id)
+            if entry is None:
+                result.conflicts.append({"id": entry_id, "deleted": True})
+            elif version(entry) != edit["version"]:
+                result.conflicts.append(grid_row(entry))
+        if result.conflicts:
+            return result
+
+        rules = target_resolver.resolve_many(section=section, items={entry.item_id for entry in entries.values()}, target_date=entry_date)
+        # A rule fixes the shift hours; an edit to them would be silently replaced, so refuse it.
+        for entry_id, edit in parsed.items():
+            rule = rules.get(entries[entry_id].item_id)
+            if rule and "shift_hours" in edit and edit["shift_hours"] != rule.shift_hours:
+                result.errors.append(
+                    {"id": entry_id, "field": "shift_hours", "error": f"Set by the target rule ({rule.shift_hours})"}
+                )
+        if result.errors:
+            return result
+
+        now = timezone.now()
+        changes = []
+        for entry_id, edit in parsed.items():
+            entry = entries[entry_id]
+            before = rollups.entry_values(entry)
+            for name in EDITABLE_FIELDS:
+                if name in edit:
+                    setattr(entry, name, edit[name])
+            rule = rules.get(entry.item_id)
+            if rule:
+                entry.target_qty, entry.shift_hours = rule.target_qty, rule.shift_hours
+            entry.set_outcomes()
+            entry.updated_at = now
+            result.updated.append(entry)
+            changes.append((before, rollups.entry_values(entry)))
+        ProductionEntry.objects.bulk_update(result.updated, GRID_FIELDS)
+        # bulk_update skips post_save, so the daily rollup is updated here in the same transaction.
+        rollups.record_changes(changes)
+    return result
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import os
+import time
+import traceback
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import exports, payroll, rollups
+from .archive import month_end, month_start
+from .models import Job, Section
+from .recompute import recompute_outcomes
+
+DEFAULT_STALE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RESULT_TTL_SECONDS = 7 * 24 * 3600
+PROGRESS_INTERVAL = 1.0
+EXPORT_PROGRESS_ROWS = 5000
+
+
+def results_dir() -> Path:
+    path = Path(getattr(settings, "PRODUCTION_JOB_RESULTS_DIR", Path(settings.BASE_DIR) / "job_results"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def result_path(job: Job) -> Optional[Path]:
+    return results_dir() / job.result_file if job.result_file else None
+
+
+def enqueue(kind: str, *, params: dict, user) -> Job:
+    return Job.objects.create(kind=kind, params=params, created_by=user)
+
+
+def claim(worker: str) -> Optional[Job]:
+    # The conditional UPDATE is the claim: of several workers racing for a row only one
+    # matches status=queued. Where supported, SKIP LOCKED spreads them over different rows.
+    # On SQLite the IMMEDIATE transaction mode serializes claims on the write lock.
+    with transaction.atomic():
+        queued = Job.objects.filter(status=Job.STATUS_QUEUED).order_by("id")
+        if connection.features.has_select_for_update_skip_locked:
+            queued = queued.select_for_update(skip_locked=True)
+        for job_id in queued.values_list("id", flat=True)[:10]:
+            now = timezone.now()
+            claimed = Job.objects.filter(id=job_id, status=Job.STATUS_QUEUED).update(
+                status=Job.STATUS_RUNNING,
+                worker=worker,
+                started_at=now,
+                heartbeat_at=now,
+                attempts=F("attempts") + 1,
+            )
+            if claimed:
+                return Job.objects.get(id=job_id)
+    return None
+
+
+def requeue_stale(*, stale_after: Optional[int] = None, max_attempts: Optional[int] = None) -> int:
+    # Running jobs whose worker stopped sending heartbeats (killed, host lost) go back to the
+    # queue, or fail once they have used up their attempts.
+    stale_after = stale_after or getattr(settings, "PRODUCTION_JOB_STALE_SECONDS", DEFAULT_STALE_SECONDS)
+    max_attempts = max_attempts or getattr(settings, "PRODUCTION_JOB_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, heartbeat_at__lt=timezone.now() - timedelta(seconds=stale_after))
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=Job.STATUS_FAILED, error="Worker stopped responding", finished_at=timezone.now()
+    )
+    return failed + stale.update(status=Job.STATUS_QUEUED, worker="")
+
+
+def purge_results(*, ttl: Optional[int] = None) -> int:
+    # Result files are kept PRODUCTION_JOB_RESULT_TTL_SECONDS after their job finished; partial
+    # files left by killed workers go once they are as old.
+    ttl = ttl or getattr(settings, "PRODUCTION_JOB_RESULT_TTL_SECONDS", DEFAULT_RESULT_TTL_SECONDS)
+    expired = Job.objects.filter(finished_at__lt=timezone.now() - timedelta(seconds=ttl)).exclude(result_file="")
+    purged = 0
+    for job_id, name in expired.values_list("id", "result_file"):
+        (results_dir() / name).unlink(missing_ok=True)
+        purged += Job.objects.filter(id=job_id, result_file=name).update(result_file="")
+    cutoff = time.time() - ttl
+    for partial in results_dir().glob("*.part"):
+        if partial.stat().st_mtime < cutoff:
+            partial.unlink(missing_ok=True)
+    return purged
+
+
+class JobLost(Exception):
+    # The job was requeued (or failed) by requeue_stale while this worker was still running it.
+    pass
+
+
+def _owned(job: Job):
+    return Job.objects.filter(id=job.id, worker=job.worker, status=Job.STATUS_RUNNING)
+
+
+class Progress:
+    # Handlers call this with their running count; writes (which double as heartbeats) are
+    # throttled to one per PROGRESS_INTERVAL. Handlers must call it outside long transactions,
+    # or requeue_stale cannot see the heartbeat.
+    def __init__(self, job: Job) -> None:
+        self.job = job
+        self.last = 0.0
+
+    def __call__(self, done: int, message: str = "", force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self.last < PROGRESS_INTERVAL:
+            return
+        self.last = now
+        if not _owned(self.job).update(progress=done, message=message[:255], heartbeat_at=timezone.now()):
+            raise JobLost(f"{self.job} is no longer owned by {self.job.worker}")
+
+
+def _dates(params: dict) -> tuple[date, date]:
+    return date.fromisoformat(params["start"]), date.fromisoformat(params["end"])
+
+
+def run_export(job: Job, progress: Progress) -> str:
+    params = job.params
+    start, end = _dates(params)
+    fmt = params.get("format", "csv")
+    queryset = exports.export_queryset(
+        sections=Section.objects.filter(id__in=params["section_ids"]),
+        start=start,
+        end=end,
+        section_id=params.get("section_id"),
+        worker_id=params.get("worker_id"),
+        item_id=params.get("item_id"),
+    )
+    lines = exports.stream_ndjson(exports.iter_rows(queryset)) if fmt == "ndjson" else exports.stream_csv(exports.iter_rows(queryset))
+    name = f"job-{job.id}-production-{start.isoformat()}-{end.isoformat()}.{fmt}"
+    # Per attempt, so a run that lost the job cannot interleave writes with its new owner.
+    partial = results_dir() / f"{name}.{job.attempts}.part"
+    rows = 0
+    try:
+        with open(partial, "w", newline="") as handle:
+            for line in lines:
+                handle.write(line)
+                rows += 1
+                if rows % EXPORT_PROGRESS_ROWS == 0:
+                    progress(rows, f"{rows} lines written")
+        # Renamed into place only once complete, so a result file is never half-written.
+        os.replace(partial, results_dir() / name)
+    finally:
+        partial.unlink(missing_ok=True)
+    progress(rows, f"{rows} lines written", force=True)
+    return name
+
+
+def run_recompute(job: Job, progress: Progress) -> str:
+    start, end = _dates(job.params)
+    scanned, updated = recompute_outcomes(
+        start=start,
+        end=end,
+        section_ids=job.params.get("section_ids"),
+        item_ids=job.params.get("item_ids"),
+        progress=lambda scanned, updated: progress(scanned, f"{scanned} scanned, {updated} updated"),
+    )
+    progress(scanned, f"{scanned} scanned, {updated} updated", force=True)
+    return ""
+
+
+def run_rebuild_rollups(job: Job, progress: Progress) -> str:
+    # One transaction per month keeps each short and lets the heartbeat through between them.
+    start, end = _dates(job.params)
+    created = 0
+    month = month_start(start)
+    while month <= end:
+        created += rollups.rebuild(start=max(start, month), end=min(end, month_end(month)), section_ids=job.params.get("section_ids"))
+        progress(created, f"{created} summary rows rebuilt through {month:%Y-%m}", force=True)
+        month = month_end(month) + timedelta(days=1)
+    return ""
+
+
+def run_payroll(job: Job, progress: Progress) -> str:
+    start, end = _dates(job.params)
+    result = payroll.run_payroll(
+        start=start, end=end, user=job.created_by, progress=lambda done: progress(done, f"{done} workers aggregated")
+    )
+    message = f"{result.created} added, {result.updated} updated, {result.deleted} removed, {result.unchanged} unchanged"
+    progress(result.run.worker_count, message, force=True)
+    return ""
+
+
+HANDLERS: dict[str, Callable[[Job, Progress], str]] = {
+    Job.KIND_EXPORT: run_export,
+    Job.KIND_RECOMPUTE: run_recompute,
+    Job.KIND_REBUILD_ROLLUPS: run_rebuild_rollups,
+    Job.KIND_PAYROLL: run_payroll,
+}
+
+
+def run(job: Job) -> Job:
+    # Final writes are conditional on still owning the job: once requeue_stale handed it to
+    # another worker, that worker's outcome is the one recorded.
+    try:
+        result_file = HANDLERS[job.kind](job, Progress(job))
+    except JobLost:
+        pass
+    except Exception:
+        _owned(job).update(status=Job.STATUS_FAILED, error=traceback.format_exc()[-4000:], finished_at=timezone.now())
+    else:
+        _owned(job).update(status=Job.STATUS_SUCCEEDED, result_file=result_file, finished_at=timezone.now())
+    job.refresh_from_db()
+    return job
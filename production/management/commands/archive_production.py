@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from production.archive import archive_before, default_cutoff, month_start, months_to_archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move ProductionEntry rows older than the hot horizon (PRODUCTION_ARCHIVE_HOT_MONTHS) into the "
+        "archive table, one month per transaction. Exports, reports and rollup rebuilds still read them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before", type=date.fromisoformat, help="Archive months before this date's month (defaults to the horizon)"
+        )
+        parser.add_argument("--dry-run", action="store_true", help="List the months that would be archived")
+
+    def handle(self, *args, **options):
+        cutoff = month_start(options["before"] or default_cutoff())
+        if options["dry_run"]:
+            months = months_to_archive(cutoff)
+            for month in months:
+                self.stdout.write(f"Would archive {month:%Y-%m}")
+            self.stdout.write(f"{len(months)} month(s) before {cutoff:%Y-%m}")
+            return
+
+        started = time.monotonic()
+        total = archive_before(cutoff, progress=lambda month, moved: self.stdout.write(f"{month:%Y-%m}: {moved} entries archived"))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} entries before {cutoff:%Y-%m} in {elapsed:.1f}s"))
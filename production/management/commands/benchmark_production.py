@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from production.benchmarks import ASYNC_BURST, ASYNC_CONCURRENCY, DEFAULT_SIZES, compare, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the production views, target resolution and compute_overtime against the current database "
+        "(all writes rolled back) and write wall time and query counts as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default="bench_output.json", help="JSON results file ('-' for stdout)")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated POST row counts")
+        parser.add_argument("--host", default="localhost", help="Host header for the test client (must be allowed)")
+        parser.add_argument("--asgi", action="store_true", help="Also compare the sync (WSGI) and async (ASGI) entry-row/listing views")
+        parser.add_argument("--burst", type=int, default=ASYNC_BURST, help="Requests per --asgi comparison run")
+        parser.add_argument("--concurrency", type=int, default=ASYNC_CONCURRENCY, help="In-flight requests on the ASGI side")
+        parser.add_argument("--compare", help="Previous results file; regressions are reported and fail the command")
+        parser.add_argument("--threshold", type=float, default=0.2, help="Allowed median slowdown ratio for --compare")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",") if size]
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers")
+        if min(options["burst"], options["concurrency"]) < 1:
+            raise CommandError("--burst and --concurrency must be positive")
+        if options["repeat"] < 1 or not sizes or min(sizes) < 1 or max(sizes) > 1000:
+            raise CommandError("--repeat must be positive and --sizes between 1 and 1000")
+        try:
+            report = run_benchmarks(
+                repeat=options["repeat"],
+                sizes=sizes,
+                host=options["host"],
+                asgi=options["asgi"],
+                burst=options["burst"],
+                concurrency=options["concurrency"],
+            )
+        except RuntimeError as exc:
+            raise CommandError(str(exc)) from exc
+
+        for result in report["results"]:
+            self.stdout.write(
+                f"{result['name']:<36} median {result['wall_ms']['median']:>10.2f} ms  "
+                f"queries {result['queries']['min']}-{result['queries']['max']}"
+            )
+        payload = json.dumps(report, indent=2)
+        if options["output"] == "-":
+            self.stdout.write(payload)
+        else:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as fh:
+                regressions = compare(json.load(fh), report, options["threshold"])
+            for line in regressions:
+                self.stderr.write(f"REGRESSION {line}")
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['compare']}")
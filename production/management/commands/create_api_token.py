@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from production.models import ApiToken
+
+
+class Command(BaseCommand):
+    help = "Issue an API token for the production ingestion endpoint. The key is printed once and stored hashed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Username the token acts as (needs ADMIN or SUPERVISOR)")
+        parser.add_argument("--name", required=True, help="Label for the device or client, e.g. 'Line 3 PLC'")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {options['user']!r}")
+        token, key = ApiToken.issue(user=user, name=options["name"])
+        self.stdout.write(f"Token {token.name!r} for {user.username}: {key}")
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import sys
+import time
+from typing import Iterator
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from production.models import ProductionEntry
+from production.services import EntryRowBuilder, RowError, upsert_entries
+
+REQUIRED_COLUMNS = ("entry_date", "section_code", "employee_code", "sku", "actual_qty")
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream historical production entries from CSV or NDJSON. Columns: entry_date, section_code, "
+        "employee_code, sku, actual_qty and optionally target_qty/shift_hours (used only when no target rule applies)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or NDJSON file, or '-' for stdin")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension (csv otherwise)")
+        parser.add_argument("--created-by", required=True, help="Username recorded as created_by on every entry")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--rejects", help="Write rejected rows (line, reason, row) to this CSV file")
+        parser.add_argument("--progress-every", type=int, default=50000, help="Rows between progress lines (0 disables)")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            created_by = User.objects.get(username=options["created_by"])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {options['created_by']!r}")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        # Historical data may reference workers and items that have since been deactivated.
+        builder = EntryRowBuilder.preload(created_by_id=created_by.pk)
+
+        path = options["path"]
+        fmt = options["format"] or ("ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv")
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8") if path == "-" else open(path, newline="", encoding="utf-8")
+        rejects_file = open(options["rejects"], "w", newline="", encoding="utf-8") if options["rejects"] else None
+        rejects = csv.writer(rejects_file) if rejects_file else None
+        if rejects:
+            rejects.writerow(["line", "reason", "row"])
+
+        batch: list[ProductionEntry] = []
+        processed = inserted = updated = rejected = 0
+        started = time.monotonic()
+        try:
+            for line_no, row in self._rows(stream, fmt):
+                processed += 1
+                try:
+                    if "_raw" in row:
+                        raise RowError("unparseable row")
+                    batch.append(builder.build(row))
+                except RowError as exc:
+                    rejected += 1
+                    if rejects:
+                        rejects.writerow([line_no, str(exc), json.dumps(row, default=str)])
+                if len(batch) >= options["batch_size"]:
+                    inserted, updated = self._flush(batch, processed, inserted, updated)
+                if options["progress_every"] and processed % options["progress_every"] == 0:
+                    self._progress(processed, inserted, updated, rejected, started)
+            inserted, updated = self._flush(batch, processed, inserted, updated)
+        finally:
+            if path != "-":
+                stream.close()
+            if rejects_file:
+                rejects_file.close()
+
+        self._progress(processed, inserted, updated, rejected, started)
+        self.stdout.write(self.style.SUCCESS(f"Imported {inserted} entries, updated {updated}, rejected {rejected}"))
+
+    def _rows(self, stream, fmt: str) -> Iterator[tuple[int, dict]]:
+        if fmt == "ndjson":
+            for line_no, line in enumerate(stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = {"_raw": line.rstrip("\n")}
+                yield line_no, row if isinstance(row, dict) else {"_raw": line.rstrip("\n")}
+            return
+        reader = csv.DictReader(stream)
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise CommandError(f"Missing CSV columns: {', '.join(missing)}")
+        for row in reader:
+            yield reader.line_num, row
+
+    def _flush(self, batch: list[ProductionEntry], row_no: int, inserted: int, updated: int) -> tuple[int, int]:
+        if not batch:
+            return inserted, updated
+        try:
+            result = upsert_entries(batch)
+        except DatabaseError as exc:
+            raise CommandError(f"Batch ending at row {row_no} failed: {exc}") from exc
+        # Rows overwriting a stored entry, or an earlier row of the same batch, count as updates.
+        created = len(result.entries) - len(result.updated)
+        inserted, updated = inserted + created, updated + len(batch) - created
+        batch.clear()
+        return inserted, updated
+
+    def _progress(self, processed: int, inserted: int, updated: int, rejected: int, started: float) -> None:
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(
+            f"{processed} rows, {inserted} inserted, {updated} updated, {rejected} rejected, {processed / elapsed:.0f} rows/s"
+        )
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from production import rollups
+from production.models import ProductionEntryHistory, Section
+
+
+class Command(BaseCommand):
+    help = "Recompute DailyProductionSummary rows for a date range from ProductionEntry (and archived months) in one aggregate pass."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="First date (defaults to the earliest entry)")
+        parser.add_argument("--end", type=date.fromisoformat, help="Last date (defaults to the latest entry)")
+        parser.add_argument("--section", action="append", dest="sections", help="Section code; repeat for several")
+
+    def handle(self, *args, **options):
+        bounds = ProductionEntryHistory.objects.aggregate(first=Min("entry_date"), last=Max("entry_date"))
+        start = options["start"] or bounds["first"]
+        end = options["end"] or bounds["last"]
+        if start is None or end is None:
+            self.stdout.write("No production entries to roll up")
+            return
+        if end < start:
+            raise CommandError("--end cannot be earlier than --start")
+
+        section_ids = None
+        if options["sections"]:
+            section_ids = list(Section.objects.filter(code__in=options["sections"]).values_list("id", flat=True))
+            if len(section_ids) != len(set(options["sections"])):
+                raise CommandError("Unknown section code in --section")
+
+        created = rollups.rebuild(start=start, end=end, section_ids=section_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} summary rows for {start} to {end}"))
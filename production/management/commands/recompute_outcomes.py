@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from production.models import Item, ProductionEntry, Section
+from production.recompute import RECOMPUTE_CHUNK_SIZE, recompute_outcomes
+
+
+class Command(BaseCommand):
+    help = "Re-resolve target rules for existing entries and rewrite target_qty, target_met and overtime_hours."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="First date (defaults to the earliest entry)")
+        parser.add_argument("--end", type=date.fromisoformat, help="Last date (defaults to the latest entry)")
+        parser.add_argument("--section", action="append", dest="sections", help="Section code; repeat for several")
+        parser.add_argument("--item", action="append", dest="items", help="Item SKU; repeat for several")
+        parser.add_argument("--chunk-size", type=int, default=RECOMPUTE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        bounds = ProductionEntry.objects.aggregate(first=Min("entry_date"), last=Max("entry_date"))
+        start = options["start"] or bounds["first"]
+        end = options["end"] or bounds["last"]
+        if start is None or end is None:
+            self.stdout.write("No production entries to recompute")
+            return
+        if end < start:
+            raise CommandError("--end cannot be earlier than --start")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        section_ids = item_ids = None
+        if options["sections"]:
+            section_ids = list(Section.objects.filter(code__in=options["sections"]).values_list("id", flat=True))
+            if len(section_ids) != len(set(options["sections"])):
+                raise CommandError("Unknown section code in --section")
+        if options["items"]:
+            item_ids = list(Item.objects.filter(sku__in=options["items"]).values_list("id", flat=True))
+            if len(item_ids) != len(set(options["items"])):
+                raise CommandError("Unknown SKU in --item")
+
+        started = time.monotonic()
+        scanned, updated = recompute_outcomes(
+            start=start,
+            end=end,
+            section_ids=section_ids,
+            item_ids=item_ids,
+            chunk_size=options["chunk_size"],
+            progress=lambda scanned, updated: self.stdout.write(f"{scanned} scanned, {updated} updated"),
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Recomputed {start} to {end}: {scanned} scanned, {updated} updated in {elapsed:.1f}s"))
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from production.archive import restore_month
+from production.models import ProductionArchive
+
+
+def _month(value: str):
+    try:
+        return datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise CommandError(f"Invalid month {value!r}; use YYYY-MM") from None
+
+
+class Command(BaseCommand):
+    help = "Move archived months back into ProductionEntry, keeping ids and timestamps."
+
+    def add_arguments(self, parser):
+        parser.add_argument("months", nargs="*", help="Months to restore as YYYY-MM")
+        parser.add_argument("--all", action="store_true", help="Restore every archived month")
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            months = list(ProductionArchive.objects.order_by("month").values_list("month", flat=True))
+        elif options["months"]:
+            months = [_month(value) for value in options["months"]]
+        else:
+            raise CommandError("Give one or more YYYY-MM months or --all")
+
+        total = 0
+        for month in months:
+            moved = restore_month(month)
+            total += moved
+            self.stdout.write(f"{month:%Y-%m}: {moved} entries restored")
+        self.stdout.write(self.style.SUCCESS(f"Restored {total} entries"))
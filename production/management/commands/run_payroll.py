@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from production import payroll
+from production.archive import month_end, month_start
+
+
+class Command(BaseCommand):
+    help = "Compute (or incrementally refresh) the daily-wage payroll run for a period."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", type=date.fromisoformat, help="Any date in the month to run (defaults to last month)")
+        parser.add_argument("--start", type=date.fromisoformat, help="First date of a custom period")
+        parser.add_argument("--end", type=date.fromisoformat, help="Last date of a custom period")
+
+    def handle(self, *args, **options):
+        if options["start"] or options["end"]:
+            if not (options["start"] and options["end"]):
+                raise CommandError("--start and --end go together")
+            start, end = options["start"], options["end"]
+        else:
+            month = options["month"] or month_start(date.today()) - timedelta(days=1)
+            start, end = month_start(month), month_end(month)
+        try:
+            result = payroll.run_payroll(start=start, end=end)
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Payroll {start} to {end}: {result.run.worker_count} workers "
+                f"({result.created} added, {result.updated} updated, {result.deleted} removed, {result.unchanged} unchanged)"
+            )
+        )
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from production import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued production jobs (exports, recomputes, rollup rebuilds, payroll runs). Start several processes to run jobs in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty instead of polling")
+        parser.add_argument("--max-jobs", type=int, default=0, help="Exit after this many jobs (0 = no limit)")
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds to wait between polls of an empty queue")
+        parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}")
+
+    def handle(self, *args, **options):
+        worker = options["worker_id"]
+        done = 0
+        self.stdout.write(f"Worker {worker} started")
+        try:
+            while not options["max_jobs"] or done < options["max_jobs"]:
+                # Long-lived process: drop connections the database may have closed meanwhile.
+                close_old_connections()
+                requeued = jobs.requeue_stale()
+                if requeued:
+                    self.stdout.write(f"Requeued or failed {requeued} stale jobs")
+                purged = jobs.purge_results()
+                if purged:
+                    self.stdout.write(f"Removed {purged} expired result files")
+                job = jobs.claim(worker)
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+                    continue
+                self.stdout.write(f"Running {job}")
+                started = time.monotonic()
+                job = jobs.run(job)
+                done += 1
+                if job.status in (job.STATUS_QUEUED, job.STATUS_RUNNING):
+                    self.stdout.write(self.style.WARNING(f"{job} was requeued while running here; its outcome was discarded"))
+                    continue
+                style = self.style.SUCCESS if job.status == job.STATUS_SUCCEEDED else self.style.ERROR
+                self.stdout.write(style(f"{job} finished in {time.monotonic() - started:.1f}s"))
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted; a job left running is requeued once its heartbeat goes stale")
+        self.stdout.write(f"Worker {worker} stopped after {done} jobs")
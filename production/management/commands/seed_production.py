@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from production import rollups
+from production.models import Item, ProductionEntry, Section, TargetRule, Worker
+from production.resolver import target_resolver
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic sections, workers, items, overlapping target rules and production entries "
+        "for load testing. Codes use --prefix so runs can be told apart from real master data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sections", type=int, default=5)
+        parser.add_argument("--workers", type=int, default=2000)
+        parser.add_argument("--items", type=int, default=50)
+        parser.add_argument("--days", type=int, default=30, help="Days of entries ending at --end")
+        parser.add_argument("--end", type=date.fromisoformat, default=None, help="Last entry date (default today)")
+        parser.add_argument("--entries-per-worker-day", type=float, default=1.0, help="Average entries per worker per day")
+        parser.add_argument("--prefix", default="SEED", help="Code prefix for generated master data")
+        parser.add_argument("--user", default="seed", help="Username recorded as created_by (created if missing)")
+        parser.add_argument("--random-seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if min(options["sections"], options["workers"], options["items"], options["days"]) < 1:
+            raise CommandError("--sections, --workers, --items and --days must be positive")
+        rng = random.Random(options["random_seed"])
+        prefix = options["prefix"]
+        end = options["end"] or date.today()
+        start = end - timedelta(days=options["days"] - 1)
+        started = time.monotonic()
+
+        user, _ = get_user_model().objects.get_or_create(username=options["user"])
+        with transaction.atomic():
+            sections = self._master(
+                Section,
+                "code",
+                [Section(name=f"{prefix} Section {i}", code=f"{prefix}-S{i:03d}") for i in range(options["sections"])],
+            )
+            workers = self._master(
+                Worker,
+                "employee_code",
+                [
+                    Worker(name=f"{prefix} Worker {i}", employee_code=f"{prefix}-W{i:06d}", is_daily_wage=rng.random() < 0.4)
+                    for i in range(options["workers"])
+                ],
+            )
+            items = self._master(
+                Item,
+                "sku",
+                [Item(name=f"{prefix} Item {i}", sku=f"{prefix}-I{i:04d}") for i in range(options["items"])],
+            )
+            rules = self._rules(rng, sections, items, start, end)
+        self.stdout.write(f"Master data: {len(sections)} sections, {len(workers)} workers, {len(items)} items, {rules} rules")
+
+        total = self._entries(rng, options, sections, workers, items, start, end, user.pk)
+        rollups.rebuild(start=start, end=end, section_ids=sections)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Generated {total} entries (existing keys skipped) for {start} to {end} in {elapsed:.1f}s"))
+
+    def _master(self, model, code_field: str, objects: list) -> list[int]:
+        model.objects.bulk_create(objects, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        codes = [getattr(obj, code_field) for obj in objects]
+        ids = []
+        for index in range(0, len(codes), BATCH_SIZE):
+            ids += model.objects.filter(**{f"{code_field}__in": codes[index : index + BATCH_SIZE]}).values_list("id", flat=True)
+        return sorted(ids)
+
+    def _rules(self, rng: random.Random, sections: list[int], items: list[int], start: date, end: date) -> int:
+        TargetRule.objects.filter(section_id__in=sections, item_id__in=items).delete()
+        span = max((end - start).days, 1)
+        rules = []
+        for section_id in sections:
+            for item_id in items:
+                target = Decimal(rng.randrange(50, 500))
+                shift = Decimal(rng.choice(["8", "8", "10", "12"]))
+                # An open-ended base rule plus a revision that overlaps part of the range.
+                rules.append(TargetRule(section_id=section_id, item_id=item_id, target_qty=target, shift_hours=shift, start_date=start - timedelta(days=365)))
+                revision_start = start + timedelta(days=rng.randrange(span))
+                rules.append(
+                    TargetRule(
+                        section_id=section_id,
+                        item_id=item_id,
+                        target_qty=(target * Decimal("1.1")).quantize(Decimal("1")),
+                        shift_hours=shift,
+                        start_date=revision_start,
+                        end_date=revision_start + timedelta(days=rng.randrange(1, span + 1)),
+                    )
+                )
+        TargetRule.objects.bulk_create(rules, batch_size=BATCH_SIZE)
+        # bulk_create sends no post_save, so drop cached rules explicitly.
+        target_resolver.invalidate()
+        return len(rules)
+
+    def _entries(self, rng, options, sections, workers, items, start, end, user_id) -> int:
+        worker_section = {worker_id: rng.choice(sections) for worker_id in workers}
+        rule_index = {}
+        for rule in TargetRule.objects.filter(section_id__in=sections, item_id__in=items).order_by("start_date"):
+            rule_index.setdefault((rule.section_id, rule.item_id), []).append(rule)
+
+        per_day = options["entries_per_worker_day"]
+        total = 0
+        batch: list[ProductionEntry] = []
+        day = start
+        while day <= end:
+            for worker_id in workers:
+                count = int(per_day) + (1 if rng.random() < per_day - int(per_day) else 0)
+                section_id = worker_section[worker_id]
+                for item_id in rng.sample(items, min(count, len(items))):
+                    rule = next(
+                        (r for r in reversed(rule_index[(section_id, item_id)]) if r.start_date <= day and (r.end_date is None or r.end_date >= day)),
+                        None,
+                    )
+                    target = rule.target_qty if rule else Decimal("0")
+                    entry = ProductionEntry(
+                        entry_date=day,
+                        section_id=section_id,
+                        worker_id=worker_id,
+                        item_id=item_id,
+                        target_qty=target,
+                        actual_qty=(target * Decimal(rng.uniform(0.6, 1.5))).quantize(Decimal("0.01")),
+                        shift_hours=rule.shift_hours if rule else Decimal("0"),
+                        created_by_id=user_id,
+                    )
+                    entry.set_outcomes()
+                    batch.append(entry)
+                    if len(batch) >= BATCH_SIZE:
+                        # Rows of an earlier run with the same seed keep their natural key; skip them.
+                        ProductionEntry.objects.bulk_create(batch, ignore_conflicts=True)
+                        total += len(batch)
+                        batch = []
+            self.stdout.write(f"{day}: {total} entries")
+            day += timedelta(days=1)
+        ProductionEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        return total + len(batch)
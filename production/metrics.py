@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from typing import Optional
+
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+TOP_QUERIES = 5
+
+
+class RequestStats:
+    # Per-request counters filled by the DB execute wrapper and the template backend.
+    __slots__ = ("queries", "db_seconds", "template_seconds", "template_depth", "slowest")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.slowest: list[tuple[float, str]] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_seconds += elapsed
+            # Min-heap of the slowest statements; only the SQL text is kept, never the params.
+            if len(self.slowest) < TOP_QUERIES:
+                heapq.heappush(self.slowest, (elapsed, sql))
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (elapsed, sql))
+
+    def top_queries(self) -> list[tuple[float, str]]:
+        return sorted(self.slowest, reverse=True)
+
+    def watch(self, connections) -> ExitStack:
+        stack = ExitStack()
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(self))
+        return stack
+
+
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar("production_request_stats", default=None)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class ViewMetrics:
+    __slots__ = ("latency", "queries", "db_seconds", "template_seconds", "responses")
+
+    def __init__(self) -> None:
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.responses: dict[int, int] = {}
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    # Process-local; every worker process exposes its own series, which Prometheus
+    # aggregates per scrape target.
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._views: dict[tuple[str, str], ViewMetrics] = {}
+
+    def observe(self, view: str, method: str, status: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            metrics = self._views.get((view, method))
+            if metrics is None:
+                metrics = self._views[(view, method)] = ViewMetrics()
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(stats.queries)
+            metrics.db_seconds += stats.db_seconds
+            metrics.template_seconds += stats.template_seconds
+            metrics.responses[status] = metrics.responses.get(status, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+    def _histogram(self, lines: list[str], name: str, labels: str, histogram: Histogram) -> None:
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+    def render(self, extra: Optional[dict[str, float]] = None) -> str:
+        with self._lock:
+            views = sorted(self._views.items())
+            latency, queries, db, template, responses = [], [], [], [], []
+            for (view, method), metrics in views:
+                labels = f'view="{_label(view)}",method="{_label(method)}"'
+                self._histogram(latency, "production_request_duration_seconds", labels, metrics.latency)
+                self._histogram(queries, "production_request_db_queries", labels, metrics.queries)
+                db.append(f"production_request_db_seconds_total{{{labels}}} {metrics.db_seconds:.6f}")
+                template.append(f"production_request_template_seconds_total{{{labels}}} {metrics.template_seconds:.6f}")
+                for status, count in sorted(metrics.responses.items()):
+                    responses.append(f'production_responses_total{{{labels},status="{status}"}} {count}')
+
+        lines = [
+            "# HELP production_request_duration_seconds Request latency by resolved URL name.",
+            "# TYPE production_request_duration_seconds histogram",
+            *latency,
+            "# HELP production_request_db_queries SQL statements issued per request.",
+            "# TYPE production_request_db_queries histogram",
+            *queries,
+            "# HELP production_request_db_seconds_total Time spent executing SQL.",
+            "# TYPE production_request_db_seconds_total counter",
+            *db,
+            "# HELP production_request_template_seconds_total Time spent rendering templates.",
+            "# TYPE production_request_template_seconds_total counter",
+            *template,
+            "# HELP production_responses_total Responses by status code.",
+            "# TYPE production_responses_total counter",
+            *responses,
+        ]
+        for name, value in (extra or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = current_stats.get()
+        if stats is None:
+            return super().render(context, request)
+        # Only the outermost render is timed so nested render_to_string calls are not double counted.
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_depth -= 1
+            if stats.template_depth == 0:
+                stats.template_seconds += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    # DjangoTemplates backend whose templates report render time to the current request's stats.
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
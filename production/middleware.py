@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+
+from .metrics import RequestStats, current_stats, registry
+from .permissions import get_scope
+from .routers import PIN_COOKIE, SAFE_METHODS, replica_aliases, track_writes
+
+slow_logger = logging.getLogger("production.slow_requests")
+
+
+class HybridMiddleware:
+    # Runs natively under both WSGI and ASGI, so async views are never adapted to sync.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class AccessScopeMiddleware(HybridMiddleware):
+    # Sync code reads request.access_scope; async views call permissions.aget_scope instead.
+    def handle(self, request):
+        request.access_scope = SimpleLazyObject(lambda: get_scope(request.user))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.access_scope = SimpleLazyObject(lambda: get_scope(request.user))
+        return await self.get_response(request)
+
+
+class RequestMetricsMiddleware(HybridMiddleware):
+    # Records latency, SQL count/time and template time per resolved URL name for the
+    # /metrics endpoint, and logs requests slower than PRODUCTION_SLOW_REQUEST_MS.
+    def __init__(self, get_response):
+        if not getattr(settings, "PRODUCTION_METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            with stats.watch(connections):
+                response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self._record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        # Async ORM calls run in the request's thread-sensitive worker thread, so the
+        # execute wrappers are installed on that thread's connections.
+        watch = await sync_to_async(stats.watch)(connections)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(watch.close)()
+            current_stats.reset(token)
+        self._record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    def _record(self, request, response, elapsed: float, stats: RequestStats) -> None:
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        registry.observe(view, request.method, response.status_code, elapsed, stats)
+
+        threshold = getattr(settings, "PRODUCTION_SLOW_REQUEST_MS", 0)
+        if threshold and elapsed * 1000 >= threshold:
+            top = "; ".join(f"{seconds * 1000:.1f}ms {sql[:300]}" for seconds, sql in stats.top_queries())
+            slow_logger.warning(
+                "slow request %s %s view=%s status=%s total=%.1fms queries=%d db=%.1fms template=%.1fms top=[%s]",
+                request.method,
+                request.path,
+                view,
+                response.status_code,
+                elapsed * 1000,
+                stats.queries,
+                stats.db_seconds * 1000,
+                stats.template_seconds * 1000,
+                top,
+            )
+
+
+class PrimaryPinMiddleware(HybridMiddleware):
+    # After a request writes (or uses an unsafe method), pin the client to the primary for
+    # PRODUCTION_REPLICA_PIN_SECONDS so it reads its own writes despite replica lag.
+    def handle(self, request):
+        with track_writes() as state:
+            response = self.get_response(request)
+        return self._pin(request, response, state)
+
+    async def __acall__(self, request):
+        with track_writes() as state:
+            response = await self.get_response(request)
+        return self._pin(request, response, state)
+
+    def _pin(self, request, response, state):
+        if replica_aliases() and (state.wrote or request.method not in SAFE_METHODS):
+            max_age = getattr(settings, "PRODUCTION_REPLICA_PIN_SECONDS", 5)
+            response.set_cookie(PIN_COOKIE, "1", max_age=max_age, httponly=True, samesite="Lax")
+        return response
@@ -19,6 +19,7 @@ class Migration(migrations.Migration):
                 ("code", models.CharField(max_length=50, unique=True)),
                 ("is_active", models.BooleanField(default=True)),
             ],
+            options={"ordering": ["name"]},
         ),
         migrations.CreateModel(
             name="Worker",
@@ -29,6 +30,7 @@ class Migration(migrations.Migration):
                 ("is_daily_wage", models.BooleanField(default=False)),
                 ("is_active", models.BooleanField(default=True)),
             ],
+            options={"ordering": ["name"]},
         ),
         migrations.CreateModel(
             name="Item",
@@ -39,6 +41,7 @@ class Migration(migrations.Migration):
                 ("unit", models.CharField(choices=[("KG", "Kg"), ("PCS", "Pieces"), ("OTHER", "Other")], default="PCS", max_length=10)),
                 ("is_active", models.BooleanField(default=True)),
             ],
+            options={"ordering": ["name"]},
         ),
         migrations.CreateModel(
             name="TargetRule",
@@ -82,7 +85,7 @@ class Migration(migrations.Migration):
         migrations.AddField(
             model_name="section",
             name="supervisors",
-            field=migrations.ManyToManyField(blank=True, related_name="sections", to=settings.AUTH_USER_MODEL),
+            field=models.ManyToManyField(blank=True, related_name="sections", to=settings.AUTH_USER_MODEL),
         ),
         migrations.AddIndex(
             model_name="productionentry",
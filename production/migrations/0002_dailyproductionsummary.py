@@ -0,0 +1,34 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("production", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyProductionSummary",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("entry_date", models.DateField()),
+                ("actual_qty", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=16)),
+                ("target_qty", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=16)),
+                ("overtime_hours", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=12)),
+                ("entry_count", models.IntegerField(default=0)),
+                ("target_met_count", models.IntegerField(default=0)),
+                ("item", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="production.item")),
+                ("section", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="production.section")),
+            ],
+            options={
+                "verbose_name_plural": "daily production summaries",
+                "ordering": ["-entry_date", "section__name", "item__name"],
+                "constraints": [
+                    models.UniqueConstraint(fields=("entry_date", "section", "item"), name="production_daily_summary_key")
+                ],
+            },
+        ),
+    ]
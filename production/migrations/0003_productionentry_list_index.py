@@ -0,0 +1,14 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("production", "0002_dailyproductionsummary"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="productionentry",
+            index=models.Index(fields=["entry_date", "section", "worker", "id"], name="production_entry_list_idx"),
+        ),
+    ]
@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+HISTORY_COLUMNS = (
+    "id, entry_date, section_id, worker_id, item_id, target_qty, actual_qty, shift_hours, "
+    "overtime_hours, target_met, created_by_id, created_at, updated_at"
+)
+
+CREATE_HISTORY_VIEW = (
+    f"CREATE VIEW production_entry_history AS "
+    f"SELECT {HISTORY_COLUMNS} FROM production_productionentry "
+    f"UNION ALL SELECT {HISTORY_COLUMNS} FROM production_archivedproductionentry"
+)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("production", "0004_ingestion_api"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductionArchive",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("month", models.DateField(unique=True)),
+                ("entry_count", models.PositiveIntegerField(default=0)),
+                ("archived_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={"ordering": ["-month"]},
+        ),
+        migrations.CreateModel(
+            name="ArchivedProductionEntry",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("entry_date", models.DateField()),
+                ("target_qty", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("actual_qty", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("shift_hours", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("overtime_hours", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=7)),
+                ("target_met", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name="+", to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+                ("item", models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name="+", to="production.item")),
+                ("section", models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name="+", to="production.section")),
+                ("worker", models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name="+", to="production.worker")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["entry_date", "section"], name="production_archive_date_idx")],
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductionEntryHistory",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("entry_date", models.DateField()),
+                ("target_qty", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("actual_qty", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("shift_hours", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("overtime_hours", models.DecimalField(decimal_places=2, max_digits=7)),
+                ("target_met", models.BooleanField()),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name_plural": "production entry history",
+                "db_table": "production_entry_history",
+                "managed": False,
+            },
+        ),
+        migrations.RunSQL(CREATE_HISTORY_VIEW, "DROP VIEW production_entry_history"),
+    ]
@@ -0,0 +1,14 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("production", "0005_archive"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="productionentry",
+            index=models.Index(fields=["entry_date", "id"], name="production_entry_date_idx"),
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations, models
+from django.db.models import Count, F, Max
+
+HISTORY_COLUMNS = (
+    "id, entry_date, section_id, worker_id, item_id, target_qty, actual_qty, shift_hours, "
+    "overtime_hours, target_met, created_by_id, created_at, updated_at"
+)
+
+CREATE_HISTORY_VIEW = (
+    f"CREATE VIEW production_entry_history AS "
+    f"SELECT {HISTORY_COLUMNS} FROM production_productionentry "
+    f"UNION ALL SELECT {HISTORY_COLUMNS} FROM production_archivedproductionentry"
+)
+
+NATURAL_KEY = ("entry_date", "section_id", "worker_id", "item_id")
+SUMMARY_FIELDS = ("actual_qty", "target_qty", "overtime_hours")
+
+
+def merge_duplicates(apps, schema_editor):
+    # Duplicates come from re-submitted formsets: keep the newest row of each natural key and
+    # take the others back out of the daily rollups (historical models send no signals).
+    ProductionEntry = apps.get_model("production", "ProductionEntry")
+    DailyProductionSummary = apps.get_model("production", "DailyProductionSummary")
+    groups = (
+        ProductionEntry.objects.values(*NATURAL_KEY)
+        .annotate(copies=Count("id"), keep=Max("id"))
+        .filter(copies__gt=1)
+        .order_by()
+    )
+    for group in groups.iterator():
+        key = {name: group[name] for name in NATURAL_KEY}
+        extra = ProductionEntry.objects.filter(**key).exclude(id=group["keep"])
+        for row in extra.values("entry_date", "section_id", "item_id", "target_met", *SUMMARY_FIELDS):
+            summary = DailyProductionSummary.objects.filter(
+                entry_date=row["entry_date"], section_id=row["section_id"], item_id=row["item_id"]
+            )
+            summary.update(
+                entry_count=F("entry_count") - 1,
+                target_met_count=F("target_met_count") - (1 if row["target_met"] else 0),
+                **{name: F(name) - row[name] for name in SUMMARY_FIELDS},
+            )
+            summary.filter(entry_count__lte=0).delete()
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("production", "0006_productionentry_date_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        # SQLite adds the constraint by rebuilding the table, which a view over it would block.
+        migrations.RunSQL("DROP VIEW production_entry_history", CREATE_HISTORY_VIEW),
+        migrations.AddConstraint(
+            model_name="productionentry",
+            constraint=models.UniqueConstraint(
+                fields=["entry_date", "section", "worker", "item"], name="production_entry_natural_key"
+            ),
+        ),
+        migrations.RunSQL(CREATE_HISTORY_VIEW, "DROP VIEW production_entry_history"),
+    ]
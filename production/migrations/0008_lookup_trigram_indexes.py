@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Trigram GIN indexes serve both the code-prefix and the name-substring ILIKE of the
+# worker/item lookups. PostgreSQL only: other backends have no index for a substring match,
+# so their lookups scan the active rows.
+TRIGRAM_INDEXES = (
+    ("production_worker_name_trgm", "production_worker", "name"),
+    ("production_worker_code_trgm", "production_worker", "employee_code"),
+    ("production_item_name_trgm", "production_item", "name"),
+    ("production_item_sku_trgm", "production_item", "sku"),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}) gin_trgm_ops)")
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("production", "0007_productionentry_natural_key"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("production", "0009_job"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="job",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("export", "Entries export"),
+                    ("recompute", "Recompute outcomes"),
+                    ("rebuild_rollups", "Rebuild daily rollups"),
+                    ("payroll", "Payroll run"),
+                ],
+                max_length=30,
+            ),
+        ),
+        migrations.CreateModel(
+            name="PayrollRun",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("period_start", models.DateField()),
+                ("period_end", models.DateField()),
+                ("computed_at", models.DateTimeField(blank=True, null=True)),
+                ("finalized_at", models.DateTimeField(blank=True, null=True)),
+                ("worker_count", models.PositiveIntegerField(default=0)),
+                (
+                    "computed_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="production_payroll_runs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-period_start", "-period_end"],
+                "constraints": [
+                    models.UniqueConstraint(fields=["period_start", "period_end"], name="production_payroll_run_period")
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="PayrollLine",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("days_worked", models.PositiveIntegerField(default=0)),
+                ("days_target_met", models.PositiveIntegerField(default=0)),
+                ("overtime_hours", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=10)),
+                ("entry_count", models.PositiveIntegerField(default=0)),
+                ("last_updated", models.DateTimeField(blank=True, null=True)),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="lines", to="production.payrollrun"
+                    ),
+                ),
+                (
+                    "worker",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT, related_name="+", to="production.worker"
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["run", "worker__name"],
+                "constraints": [models.UniqueConstraint(fields=["run", "worker"], name="production_payroll_line_worker")],
+            },
+        ),
+    ]
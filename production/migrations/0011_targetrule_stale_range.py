@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("production", "0010_payroll"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="targetrule",
+            name="stale_start",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="targetrule",
+            name="stale_end",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+    ]
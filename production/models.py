@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import hashlib
+import secrets
 from datetime import date
 from decimal import Decimal
 
@@ -77,6 +79,10 @@ class TargetRule(models.Model):
     shift_hours = models.DecimalField(max_digits=5, decimal_places=2)
     start_date = models.DateField()
     end_date = models.DateField(null=True, blank=True)
+    # Dates this rule covered before its range was last edited and that no recompute has
+    # visited since; the admin recompute action includes them and then clears them.
+    stale_start = models.DateField(null=True, blank=True, editable=False)
+    stale_end = models.DateField(null=True, blank=True, editable=False)
 
     objects = TargetRuleQuerySet.as_manager()
 
@@ -111,7 +117,15 @@ class ProductionEntry(models.Model):
     class Meta:
         ordering = ["-entry_date", "section__name", "worker__name"]
         indexes = [
-            models.Index(fields=["entry_date", "section", "item"]),
+            models.Index(fields=["entry_date", "section", "item"], name="production_entry_idx"),
+            # Backs the daily listing: filter on entry_date (and section), keyset order on (section, worker, id).
+            models.Index(fields=["entry_date", "section", "worker", "id"], name="production_entry_list_idx"),
+            # Backs the admin changelist: date hierarchy ranges and (-entry_date, -id) ordering.
+            models.Index(fields=["entry_date", "id"], name="production_entry_date_idx"),
+        ]
+        constraints = [
+            # Natural key: one row per worker, item, section and day; writers upsert on it.
+            models.UniqueConstraint(fields=["entry_date", "section", "worker", "item"], name="production_entry_natural_key"),
         ]
 
     def __str__(self) -> str:  # pragma: no cover - repr helper
@@ -127,10 +141,242 @@ class ProductionEntry(models.Model):
         return (ratio * shift_hours).quantize(Decimal("0.01"))
 
     def clean(self) -> None:
-        if self.entry_date and self.entry_date < date.today():
-            # Hook for future immutability rules; raising validation for new entries could block.
-            return
+        # Archived months are read-only (see production.archive.archived_months).
+        if self.entry_date and ProductionArchive.objects.filter(month=self.entry_date.replace(day=1)).exists():
+            raise ValidationError({"entry_date": f"{self.entry_date:%Y-%m} is archived; restore it before changing its entries."})
 
     def set_outcomes(self) -> None:
         self.target_met = self.actual_qty >= self.target_qty if self.target_qty is not None else False
         self.overtime_hours = self.compute_overtime(self.actual_qty, self.target_qty, self.shift_hours)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so incremental rollups can subtract the old contribution.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class ArchivedProductionEntry(models.Model):
+    # Cold copy of ProductionEntry rows for archived months (see production.archive). Ids are
+    # kept so a restore puts rows back unchanged; only one index, no per-FK indexes.
+    id = models.BigIntegerField(primary_key=True)
+    entry_date = models.DateField()
+    section = models.ForeignKey(Section, on_delete=models.PROTECT, related_name="+", db_index=False)
+    worker = models.ForeignKey(Worker, on_delete=models.PROTECT, related_name="+", db_index=False)
+    item = models.ForeignKey(Item, on_delete=models.PROTECT, related_name="+", db_index=False)
+
+    target_qty = models.DecimalField(max_digits=12, decimal_places=2)
+    actual_qty = models.DecimalField(max_digits=12, decimal_places=2)
+    shift_hours = models.DecimalField(max_digits=5, decimal_places=2)
+    overtime_hours = models.DecimalField(max_digits=7, decimal_places=2, default=Decimal("0.00"))
+    target_met = models.BooleanField(default=False)
+
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name="+", db_index=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["entry_date", "section"], name="production_archive_date_idx"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - repr helper
+        return f"{self.entry_date} - {self.section_id} - {self.worker_id} (archived)"
+
+
+class ProductionEntryHistory(models.Model):
+    # Read-only UNION ALL view over ProductionEntry and ArchivedProductionEntry, used by
+    # exports, reports and rollup rebuilds whenever a date range reaches archived months.
+    entry_date = models.DateField()
+    section = models.ForeignKey(Section, on_delete=models.DO_NOTHING, related_name="+")
+    worker = models.ForeignKey(Worker, on_delete=models.DO_NOTHING, related_name="+")
+    item = models.ForeignKey(Item, on_delete=models.DO_NOTHING, related_name="+")
+
+    target_qty = models.DecimalField(max_digits=12, decimal_places=2)
+    actual_qty = models.DecimalField(max_digits=12, decimal_places=2)
+    shift_hours = models.DecimalField(max_digits=5, decimal_places=2)
+    overtime_hours = models.DecimalField(max_digits=7, decimal_places=2)
+    target_met = models.BooleanField()
+
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name="+")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = "production_entry_history"
+        verbose_name_plural = "production entry history"
+
+
+class ProductionArchive(models.Model):
+    # Catalog of archived months; a range only reads through the history view if it overlaps one.
+    month = models.DateField(unique=True)
+    entry_count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-month"]
+
+    def __str__(self) -> str:  # pragma: no cover - repr helper
+        return self.month.strftime("%Y-%m")
+
+
+class DailyProductionSummary(models.Model):
+    entry_date = models.DateField()
+    section = models.ForeignKey(Section, on_delete=models.CASCADE)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE)
+
+    actual_qty = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    target_qty = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    overtime_hours = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    entry_count = models.IntegerField(default=0)
+    target_met_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["-entry_date", "section__name", "item__name"]
+        constraints = [
+            models.UniqueConstraint(fields=["entry_date", "section", "item"], name="production_daily_summary_key"),
+        ]
+        verbose_name_plural = "daily production summaries"
+
+    def __str__(self) -> str:  # pragma: no cover - repr helper
+        return f"{self.entry_date} - {self.section} - {self.item}"
+
+
+class ApiTokenQuerySet(models.QuerySet):
+    def for_key(self, key: str):
+        return self.select_related("user").filter(key_hash=ApiToken.hash_key(key), is_active=True).first()
+
+
+class ApiToken(models.Model):
+    name = models.CharField(max_length=100)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="production_api_tokens")
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ApiTokenQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self) -> str:  # pragma: no cover - repr helper
+        return f"{self.name} ({self.user})"
+
+    @staticmethod
+    def hash_key(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, *, user, name: str) -> tuple["ApiToken", str]:
+        key = secrets.token_urlsafe(32)
+        return cls.objects.create(user=user, name=name, key_hash=cls.hash_key(key)), key
+
+
+class IngestionBatch(models.Model):
+    token = models.ForeignKey(ApiToken, on_delete=models.CASCADE, related_name="batches")
+    idempotency_key = models.CharField(max_length=255)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["token", "idempotency_key"], name="production_ingestion_idempotency_key"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - repr helper
+        return f"{self.token} - {self.idempotency_key}"
+
+
+class Job(models.Model):
+    # Background task run by `manage.py run_production_worker`; results land on local disk.
+    KIND_EXPORT = "export"
+    KIND_RECOMPUTE = "recompute"
+    KIND_REBUILD_ROLLUPS = "rebuild_rollups"
+    KIND_PAYROLL = "payroll"
+    KIND_CHOICES = [
+        (KIND_EXPORT, "Entries export"),
+        (KIND_RECOMPUTE, "Recompute outcomes"),
+        (KIND_REBUILD_ROLLUPS, "Rebuild daily rollups"),
+        (KIND_PAYROLL, "Payroll run"),
+    ]
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    progress = models.PositiveBigIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    result_file = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="production_jobs")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # Workers claim the oldest queued job and sweep running ones for stale heartbeats.
+            models.Index(fields=["status", "id"], name="production_job_claim_idx"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - repr helper
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+
+class PayrollRun(models.Model):
+    # Frozen daily-wage payroll totals for one period (see production.payroll). Reruns refresh
+    # the lines of workers whose entries changed; a finalized run is never recomputed.
+    period_start = models.DateField()
+    period_end = models.DateField()
+    computed_at = models.DateTimeField(null=True, blank=True)
+    computed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="production_payroll_runs"
+    )
+    finalized_at = models.DateTimeField(null=True, blank=True)
+    worker_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-period_start", "-period_end"]
+        constraints = [
+            models.UniqueConstraint(fields=["period_start", "period_end"], name="production_payroll_run_period"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - repr helper
+        return f"Payroll {self.period_start} to {self.period_end}"
+
+
+class PayrollLine(models.Model):
+    run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name="lines")
+    worker = models.ForeignKey(Worker, on_delete=models.PROTECT, related_name="+")
+    days_worked = models.PositiveIntegerField(default=0)
+    days_target_met = models.PositiveIntegerField(default=0)
+    overtime_hours = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
+    # Fingerprint of the worker's entries when the line was computed; reruns skip matching workers.
+    entry_count = models.PositiveIntegerField(default=0)
+    last_updated = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["run", "worker__name"]
+        constraints = [
+            models.UniqueConstraint(fields=["run", "worker"], name="production_payroll_line_worker"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - repr helper
+        return f"{self.run} - {self.worker_id}"
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import date
+from typing import Iterable, Optional
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_PREFIX = "production:entries:version"
+PAGE_PREFIX = "production:entries:page"
+
+
+def _version_key(entry_date: date, section_id: int) -> str:
+    return f"{VERSION_PREFIX}:{entry_date.isoformat()}:{section_id}"
+
+
+class EntryPageCache:
+    # Rendered daily-entries pages keyed by (date, sections, access scope, query) plus a
+    # version token per (date, section). Every ProductionEntry write path goes through
+    # rollups.record_changes/refresh, which touch the versions of the rows' pairs,
+    # so a cached page (and its ETag) is dropped exactly when its data changes. The tokens
+    # only work if every process sees them, so nothing is cached unless
+    # PRODUCTION_PAGE_CACHE_ALIAS names a shared cache.
+
+    @property
+    def enabled(self) -> bool:
+        return bool(getattr(settings, "PRODUCTION_PAGE_CACHE_ALIAS", None))
+
+    def _cache(self):
+        return caches[settings.PRODUCTION_PAGE_CACHE_ALIAS]
+
+    def timeout(self) -> int:
+        return getattr(settings, "PRODUCTION_ENTRIES_CACHE_TIMEOUT", 600)
+
+    def _fill(self, keys: list[str], found: dict) -> tuple[list[str], dict]:
+        missing = {key: uuid4().hex for key in keys if key not in found}
+        return [found.get(key) or missing[key] for key in keys], missing
+
+    def versions(self, entry_date: date, section_ids: Iterable[int]) -> list[str]:
+        keys = [_version_key(entry_date, section_id) for section_id in section_ids]
+        cache = self._cache()
+        tokens, missing = self._fill(keys, cache.get_many(keys))
+        if missing:
+            cache.set_many(missing, None)
+        return tokens
+
+    async def aversions(self, entry_date: date, section_ids: Iterable[int]) -> list[str]:
+        keys = [_version_key(entry_date, section_id) for section_id in section_ids]
+        cache = self._cache()
+        tokens, missing = self._fill(keys, await cache.aget_many(keys))
+        if missing:
+            await cache.aset_many(missing, None)
+        return tokens
+
+    def touch(self, pairs: Iterable[tuple[date, int]]) -> None:
+        if not self.enabled:
+            return
+        keys = {_version_key(entry_date, section_id) for entry_date, section_id in pairs}
+        if not keys:
+            return
+
+        def bump():
+            self._cache().set_many({key: uuid4().hex for key in keys}, None)
+
+        # Bump now and again after commit, so a reader between the two cannot cache pre-commit rows.
+        bump()
+        transaction.on_commit(bump)
+
+    def page_key(self, *, entry_date: date, section_id: Optional[int], scope: str, versions: list[str], extra: str, query: str) -> str:
+        raw = "|".join([entry_date.isoformat(), str(section_id or "*"), scope, ",".join(versions), extra, query])
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache().get(f"{PAGE_PREFIX}:{key}")
+
+    async def aget(self, key: str) -> Optional[str]:
+        return await self._cache().aget(f"{PAGE_PREFIX}:{key}")
+
+    def set(self, key: str, content: str) -> None:
+        self._cache().set(f"{PAGE_PREFIX}:{key}", content, self.timeout())
+
+    async def aset(self, key: str, content: str) -> None:
+        await self._cache().aset(f"{PAGE_PREFIX}:{key}", content, self.timeout())
+
+
+entry_pages = EntryPageCache()
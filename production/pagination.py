@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import base64
+import json
+from functools import reduce
+from operator import or_
+from typing import Any, Optional, Sequence
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def page_size(value: Optional[str], default: int = DEFAULT_PAGE_SIZE) -> int:
+    if not value:
+        return default
+    return max(1, min(int(value), MAX_PAGE_SIZE))
+
+
+def keyset_filter(ordering: Sequence[str], values: Sequence[Any]) -> Q:
+    # Row-value comparison (a, b, c) > (x, y, z) spelled out so every backend can use the index.
+    clauses = []
+    for index, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        equal = {ordering[prev].lstrip("-"): values[prev] for prev in range(index)}
+        clauses.append(Q(**equal, **{f"{name}__{lookup}": values[index]}))
+    return reduce(or_, clauses)
+
+
+def _sort_value(row, field: str):
+    name = field.lstrip("-")
+    if isinstance(row, dict):
+        return row[name]
+    value = row
+    for part in name.split("__"):
+        value = getattr(value, part)
+    return value
+
+
+def _page(rows: list, ordering: Sequence[str], limit: int) -> tuple[list, Optional[str]]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([_sort_value(rows[-1], field) for field in ordering])
+
+
+def paginate(queryset, ordering: Sequence[str], cursor: Optional[str], limit: int) -> tuple[list, Optional[str]]:
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, len(ordering))))
+    return _page(list(queryset.order_by(*ordering)[: limit + 1]), ordering, limit)
+
+
+async def apaginate(queryset, ordering: Sequence[str], cursor: Optional[str], limit: int) -> tuple[list, Optional[str]]:
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, len(ordering))))
+    return _page([row async for row in queryset.order_by(*ordering)[: limit + 1]], ordering, limit)
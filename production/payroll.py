@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .archive import entry_source
+from .models import PayrollLine, PayrollRun
+
+LINE_FIELDS = ["days_worked", "days_target_met", "overtime_hours", "entry_count", "last_updated"]
+WORKER_CHUNK = 500
+WRITE_BATCH = 1000
+
+
+@dataclass
+class PayrollResult:
+    run: PayrollRun
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+
+def _entries(start: date, end: date):
+    return (
+        entry_source(start, end)
+        .objects.filter(entry_date__range=(start, end), worker__is_daily_wage=True)
+        .order_by()
+        .values("worker_id")
+    )
+
+
+def _fingerprints(start: date, end: date) -> dict[int, tuple[int, object]]:
+    # Every write path stamps updated_at, so (entry count, newest updated_at) changes whenever a
+    # worker's entries are created, edited or deleted within the period.
+    rows = _entries(start, end).annotate(entry_count=Count("id"), last_updated=Max("updated_at"))
+    return {row["worker_id"]: (row["entry_count"], row["last_updated"]) for row in rows.iterator()}
+
+
+def _totals(start: date, end: date, worker_ids: Optional[list[int]] = None) -> Iterable[dict]:
+    # One GROUP BY per chunk of workers (or one for the whole period on a first run).
+    chunks = [None] if worker_ids is None else [worker_ids[i : i + WORKER_CHUNK] for i in range(0, len(worker_ids), WORKER_CHUNK)]
+    for chunk in chunks:
+        entries = _entries(start, end)
+        if chunk is not None:
+            entries = entries.filter(worker_id__in=chunk)
+        yield from entries.annotate(
+            days_worked=Count("entry_date", distinct=True),
+            days_target_met=Count("entry_date", distinct=True, filter=Q(target_met=True)),
+            overtime_hours=Sum("overtime_hours"),
+            entry_count=Count("id"),
+            last_updated=Max("updated_at"),
+        ).iterator()
+
+
+def _line_values(row: dict) -> dict:
+    return {
+        "days_worked": row["days_worked"],
+        "days_target_met": row["days_target_met"],
+        "overtime_hours": row["overtime_hours"] or Decimal("0"),
+        "entry_count": row["entry_count"],
+        "last_updated": row["last_updated"],
+    }
+
+
+def run_payroll(*, start: date, end: date, user=None, progress: Optional[Callable[[int], None]] = None) -> PayrollResult:
+    # Days worked, target-met days and overtime per daily-wage worker, frozen into PayrollLine.
+    # A rerun compares per-worker fingerprints with the stored lines and only aggregates and
+    # rewrites the workers that differ. The aggregates run outside any transaction, so the
+    # progress callback (a job heartbeat) is visible while they do; the writes then go in one
+    # short transaction holding the run's row lock.
+    if end < start:
+        raise ValueError("End date cannot be earlier than start date")
+    progress = progress or (lambda done: None)
+    run, _ = PayrollRun.objects.get_or_create(period_start=start, period_end=end)
+    if run.finalized_at is not None:
+        raise ValueError(f"Payroll for {start} to {end} is final")
+    stored = {
+        worker_id: (entry_count, last_updated)
+        for worker_id, entry_count, last_updated in run.lines.values_list("worker_id", "entry_count", "last_updated")
+    }
+
+    progress(0)
+    if stored:
+        current = _fingerprints(start, end)
+        changed = sorted(worker_id for worker_id, fingerprint in current.items() if stored.get(worker_id) != fingerprint)
+        gone = [worker_id for worker_id in stored if worker_id not in current]
+        unchanged = len(current) - len(changed)
+        rows = _totals(start, end, changed) if changed else []
+    else:
+        gone, unchanged = [], 0
+        rows = _totals(start, end)
+    lines: list[PayrollLine] = []
+    for row in rows:
+        lines.append(PayrollLine(worker_id=row["worker_id"], **_line_values(row)))
+        progress(len(lines))
+
+    with transaction.atomic():
+        run = PayrollRun.objects.select_for_update().get(pk=run.pk)
+        if run.finalized_at is not None:
+            raise ValueError(f"Payroll for {start} to {end} is final")
+        for line in lines:
+            line.run = run
+        # Upserted: a concurrent rerun of the period may have written some of these workers meanwhile.
+        PayrollLine.objects.bulk_create(
+            lines, batch_size=WRITE_BATCH, update_conflicts=True, unique_fields=["run", "worker"], update_fields=LINE_FIELDS
+        )
+        if gone:
+            PayrollLine.objects.filter(run=run, worker_id__in=gone).delete()
+        run.computed_at = timezone.now()
+        run.computed_by = user
+        run.worker_count = run.lines.count()
+        run.save(update_fields=["computed_at", "computed_by", "worker_count"])
+    created = sum(1 for line in lines if line.worker_id not in stored)
+    return PayrollResult(run=run, created=created, updated=len(lines) - created, deleted=len(gone), unchanged=unchanged)
+
+
+def finalize(run: PayrollRun) -> bool:
+    return bool(PayrollRun.objects.filter(pk=run.pk, finalized_at__isnull=True).update(finalized_at=timezone.now()))
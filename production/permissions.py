@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+
+SCOPE_ATTR = "_production_access_scope"
+VERSION_KEY = "production:access:version"
+
+
+@dataclass(frozen=True)
+class AccessScope:
+    groups: frozenset[str]
+    section_ids: frozenset[int]
+
+    def has_group(self, name: str) -> bool:
+        return name in self.groups
+
+    def supervises(self, section_id: int) -> bool:
+        return section_id in self.section_ids
+
+
+EMPTY_SCOPE = AccessScope(groups=frozenset(), section_ids=frozenset())
+
+
+def _shared_cache():
+    timeout = getattr(settings, "PRODUCTION_ACCESS_CACHE_TIMEOUT", 0)
+    if not timeout:
+        return None, 0
+    return caches[getattr(settings, "PRODUCTION_ACCESS_CACHE_ALIAS", "default")], timeout
+
+
+def _load(user) -> AccessScope:
+    return AccessScope(
+        groups=frozenset(user.groups.values_list("name", flat=True)),
+        section_ids=frozenset(user.sections.values_list("id", flat=True)),
+    )
+
+
+async def _aload(user) -> AccessScope:
+    return AccessScope(
+        groups=frozenset([name async for name in user.groups.values_list("name", flat=True)]),
+        section_ids=frozenset([pk async for pk in user.sections.values_list("id", flat=True)]),
+    )
+
+
+def _cache_key(version: str, user) -> str:
+    return f"production:access:{version}:{user.pk}"
+
+
+def _pack(scope: AccessScope) -> tuple[list, list]:
+    return sorted(scope.groups), sorted(scope.section_ids)
+
+
+def _unpack(cached) -> AccessScope:
+    return AccessScope(groups=frozenset(cached[0]), section_ids=frozenset(cached[1]))
+
+
+def get_scope(user) -> AccessScope:
+    # Memoized on the user object, which the auth middleware loads once per request.
+    if not getattr(user, "is_authenticated", False):
+        return EMPTY_SCOPE
+    scope = getattr(user, SCOPE_ATTR, None)
+    if scope is not None:
+        return scope
+    cache, timeout = _shared_cache()
+    if cache is None:
+        scope = _load(user)
+    else:
+        key = _cache_key(cache.get(VERSION_KEY) or "", user)
+        cached = cache.get(key)
+        if cached is None:
+            scope = _load(user)
+            cache.set(key, _pack(scope), timeout)
+        else:
+            scope = _unpack(cached)
+    setattr(user, SCOPE_ATTR, scope)
+    return scope
+
+
+async def aget_scope(user) -> AccessScope:
+    # Async twin of get_scope for ASGI views; same memo attribute and cache entries.
+    if not getattr(user, "is_authenticated", False):
+        return EMPTY_SCOPE
+    scope = getattr(user, SCOPE_ATTR, None)
+    if scope is not None:
+        return scope
+    cache, timeout = _shared_cache()
+    if cache is None:
+        scope = await _aload(user)
+    else:
+        key = _cache_key(await cache.aget(VERSION_KEY) or "", user)
+        cached = await cache.aget(key)
+        if cached is None:
+            scope = await _aload(user)
+            await cache.aset(key, _pack(scope), timeout)
+        else:
+            scope = _unpack(cached)
+    setattr(user, SCOPE_ATTR, scope)
+    return scope
+
+
+def invalidate_scopes() -> None:
+    cache, _ = _shared_cache()
+    if cache is not None:
+        # Changing the version orphans every cached scope; they expire on their own TTL.
+        cache.set(VERSION_KEY, uuid4().hex, None)
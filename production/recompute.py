@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Callable, Iterable, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import rollups
+from .models import ProductionEntry
+from .resolver import target_resolver
+
+RECOMPUTE_CHUNK_SIZE = 2000
+RECOMPUTE_FIELDS = ["target_qty", "shift_hours", "target_met", "overtime_hours", "updated_at"]
+LOAD_FIELDS = ["id", "entry_date", "section_id", "item_id", "actual_qty", "target_qty", "shift_hours", "overtime_hours", "target_met"]
+
+
+def recompute_outcomes(
+    *,
+    start: date,
+    end: date,
+    section_ids: Optional[Iterable[int]] = None,
+    item_ids: Optional[Iterable[int]] = None,
+    chunk_size: int = RECOMPUTE_CHUNK_SIZE,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> tuple[int, int]:
+    # Entries whose (section, item, date) has no rule keep their stored target and shift
+    # hours; their outcomes are still recomputed. Returns (scanned, updated).
+    entries = ProductionEntry.objects.filter(entry_date__range=(start, end))
+    if section_ids is not None:
+        entries = entries.filter(section_id__in=list(section_ids))
+    if item_ids is not None:
+        entries = entries.filter(item_id__in=list(item_ids))
+    entries = entries.only(*LOAD_FIELDS).order_by("id")
+
+    scanned = updated = 0
+    last_id = 0
+    while True:
+        # Keyset over id keeps exactly one chunk in memory and each chunk query index-backed. The
+        # chunk's rows stay locked until they are written back, so an edit landing in between
+        # waits instead of being overwritten (and the rollup deltas start from current values).
+        with transaction.atomic():
+            chunk = list(entries.select_for_update().filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            scanned += len(chunk)
+            target_resolver.prime({(entry.section_id, entry.item_id) for entry in chunk})
+
+            now = timezone.now()
+            changed, changes = [], []
+            for entry in chunk:
+                before = rollups.entry_values(entry)
+                before_shift = entry.shift_hours
+                rule = target_resolver.resolve(section=entry.section_id, item=entry.item_id, target_date=entry.entry_date)
+                if rule:
+                    entry.target_qty, entry.shift_hours = rule.target_qty, rule.shift_hours
+                entry.set_outcomes()
+                after = rollups.entry_values(entry)
+                if after != before or entry.shift_hours != before_shift:
+                    entry.updated_at = now
+                    changed.append(entry)
+                    changes.append((before, after))
+
+            if changed:
+                ProductionEntry.objects.bulk_update(changed, RECOMPUTE_FIELDS)
+                rollups.record_changes(changes)
+                updated += len(changed)
+        if progress:
+            progress(scanned, updated)
+    return scanned, updated
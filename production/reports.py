@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Optional
+
+from django.db.models import Count, FloatField, Q, Sum
+from django.db.models.functions import Cast, NullIf
+
+from .archive import entry_source
+
+WORKER_ORDERING = ["worker__name", "worker_id"]
+WORKER_ITEM_ORDERING = ["worker__name", "worker_id", "item__name", "item_id"]
+
+
+def worker_performance(
+    *,
+    sections,
+    start: date,
+    end: date,
+    section_id: Optional[int] = None,
+    daily_wage: Optional[bool] = None,
+    by_item: bool = False,
+):
+    entries = entry_source(start, end).objects.filter(entry_date__range=(start, end), section__in=sections)
+    if section_id:
+        entries = entries.filter(section_id=section_id)
+    if daily_wage is not None:
+        entries = entries.filter(worker__is_daily_wage=daily_wage)
+    group_by = ["worker_id", "worker__name", "worker__employee_code", "worker__is_daily_wage"]
+    if by_item:
+        group_by += ["item_id", "item__name", "item__sku"]
+    return (
+        entries.order_by()
+        .values(*group_by)
+        .annotate(
+            total_actual=Sum("actual_qty"),
+            total_target=Sum("target_qty"),
+            # Cast so SQLite does not fall back to integer division on whole-number quantities.
+            efficiency=Cast(Sum("actual_qty"), FloatField()) / NullIf(Cast(Sum("target_qty"), FloatField()), 0.0),
+            days_worked=Count("entry_date", distinct=True),
+            days_target_met=Count("entry_date", distinct=True, filter=Q(target_met=True)),
+            total_overtime=Sum("overtime_hours"),
+        )
+    )
+
+
+def worker_performance_row(row: dict) -> dict:
+    result = {
+        "worker_id": row["worker_id"],
+        "employee_code": row["worker__employee_code"],
+        "worker": row["worker__name"],
+        "is_daily_wage": row["worker__is_daily_wage"],
+    }
+    if "item_id" in row:
+        result.update({"item_id": row["item_id"], "sku": row["item__sku"], "item": row["item__name"]})
+    result.update(
+        {
+            "total_actual": str(row["total_actual"]),
+            "total_target": str(row["total_target"]),
+            "efficiency": round(row["efficiency"], 4) if row["efficiency"] is not None else None,
+            "days_worked": row["days_worked"],
+            "days_target_met": row["days_target_met"],
+            "total_overtime": str(row["total_overtime"]),
+        }
+    )
+    return result
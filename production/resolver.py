@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_right
+from datetime import date
+from typing import Iterable, Optional
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import TargetRule
+
+VERSION_KEY = "production:target-rules:version"
+
+
+class TargetRuleResolver:
+    # Process-local index of target rules. Each (section, item) pair keeps its rules
+    # sorted by start_date so "active rule on date D" is a bisect plus a short walk
+    # back over overlapping intervals. Any TargetRule change clears the index; when
+    # PRODUCTION_TARGET_CACHE_ALIAS is set, a version token in that cache tells the
+    # other worker processes to drop theirs too.
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._intervals: dict[tuple[int, int], tuple[list[date], list[TargetRule]]] = {}
+        self._version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _shared_cache(self):
+        alias = getattr(settings, "PRODUCTION_TARGET_CACHE_ALIAS", None)
+        return caches[alias] if alias else None
+
+    def _sync_version(self) -> None:
+        shared = self._shared_cache()
+        if shared is None:
+            return
+        version = shared.get(VERSION_KEY)
+        if version is None:
+            # Never set or evicted: publish a fresh token so every process resyncs.
+            shared.add(VERSION_KEY, uuid4().hex, None)
+            version = shared.get(VERSION_KEY)
+        if version != self._version:
+            with self._lock:
+                self._intervals.clear()
+                self._version = version
+
+    def _load(self, section_ids: list[int], item_ids: list[int]) -> None:
+        # One query covers the whole section x item cross product, so every pair in it becomes complete.
+        loaded: dict[tuple[int, int], list[TargetRule]] = {
+            (section_id, item_id): [] for section_id in section_ids for item_id in item_ids
+        }
+        rules = TargetRule.objects.filter(section_id__in=section_ids, item_id__in=item_ids).order_by("start_date", "id")
+        for rule in rules:
+            loaded[(rule.section_id, rule.item_id)].append(rule)
+        with self._lock:
+            for pair, pair_rules in loaded.items():
+                self._intervals[pair] = ([rule.start_date for rule in pair_rules], pair_rules)
+
+    def prime(self, pairs: Iterable[tuple[int, int]]) -> None:
+        self._sync_version()
+        missing = {pair for pair in pairs if pair not in self._intervals}
+        if missing:
+            self._load(sorted({pair[0] for pair in missing}), sorted({pair[1] for pair in missing}))
+
+    @staticmethod
+    def _pick(starts: list[date], rules: list[TargetRule], target_date: date) -> Optional[TargetRule]:
+        index = bisect_right(starts, target_date)
+        while index > 0:
+            index -= 1
+            rule = rules[index]
+            if rule.end_date is None or rule.end_date >= target_date:
+                return rule
+        return None
+
+    def resolve_many(self, *, section, items: Iterable, target_date: date) -> dict[int, TargetRule]:
+        self._sync_version()
+        section_id = getattr(section, "pk", section)
+        item_ids = list(dict.fromkeys(getattr(item, "pk", item) for item in items))
+        missing = [item_id for item_id in item_ids if (section_id, item_id) not in self._intervals]
+        self.hits += len(item_ids) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            self._load([section_id], missing)
+        resolved: dict[int, TargetRule] = {}
+        for item_id in item_ids:
+            starts, rules = self._intervals.get((section_id, item_id), ([], []))
+            rule = self._pick(starts, rules, target_date)
+            if rule is not None:
+                resolved[item_id] = rule
+        return resolved
+
+    def resolve(self, *, section, item, target_date: date) -> Optional[TargetRule]:
+        return self.resolve_many(section=section, items=[item], target_date=target_date).get(getattr(item, "pk", item))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._intervals.clear()
+            self.invalidations += 1
+        shared = self._shared_cache()
+        if shared is not None:
+            self._version = uuid4().hex
+            shared.set(VERSION_KEY, self._version, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._intervals.clear()
+            self._version = None
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "pairs": len(self._intervals),
+        }
+
+
+target_resolver = TargetRuleResolver()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+
+from .archive import entry_source
+from .models import DailyProductionSummary, ProductionEntry
+from .pagecache import entry_pages
+
+ROLLUP_FIELDS = ("entry_date", "section_id", "item_id", "actual_qty", "target_qty", "overtime_hours", "target_met")
+DELTA_FIELDS = ("actual_qty", "target_qty", "overtime_hours", "entry_count", "target_met_count")
+KEY_CHUNK = 100
+REBUILD_BATCH = 2000
+
+
+def entry_values(entry: ProductionEntry) -> dict:
+    return {name: getattr(entry, name) for name in ROLLUP_FIELDS}
+
+
+def _collect(deltas: dict, values: dict, sign: int) -> None:
+    key = (values["entry_date"], values["section_id"], values["item_id"])
+    delta = deltas.setdefault(key, [Decimal("0"), Decimal("0"), Decimal("0"), 0, 0])
+    delta[0] += sign * Decimal(values["actual_qty"] or 0)
+    delta[1] += sign * Decimal(values["target_qty"] or 0)
+    delta[2] += sign * Decimal(values["overtime_hours"] or 0)
+    delta[3] += sign
+    delta[4] += sign if values["target_met"] else 0
+
+
+def apply_deltas(deltas: dict) -> None:
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    keys = list(deltas)
+    outputs = [DailyProductionSummary._meta.get_field(name) for name in DELTA_FIELDS]
+    with transaction.atomic():
+        DailyProductionSummary.objects.bulk_create(
+            [DailyProductionSummary(entry_date=key[0], section_id=key[1], item_id=key[2]) for key in keys],
+            ignore_conflicts=True,
+        )
+        for start in range(0, len(keys), KEY_CHUNK):
+            chunk = [(Q(entry_date=key[0], section_id=key[1], item_id=key[2]), deltas[key]) for key in keys[start : start + KEY_CHUNK]]
+            match = reduce(or_, (condition for condition, _ in chunk))
+            # One UPDATE per chunk of keys: each column adds its per-key delta via CASE.
+            updates = {
+                name: F(name)
+                + Case(
+                    *(When(condition, then=Value(delta[index], output_field=output)) for condition, delta in chunk),
+                    default=Value(0, output_field=output),
+                    output_field=output,
+                )
+                for index, (name, output) in enumerate(zip(DELTA_FIELDS, outputs))
+            }
+            DailyProductionSummary.objects.filter(match).update(**updates)
+            if any(delta[3] < 0 for _, delta in chunk):
+                DailyProductionSummary.objects.filter(match, entry_count__lte=0).delete()
+
+
+def record_changes(changes: Iterable[tuple[Optional[dict], Optional[dict]]]) -> None:
+    # Each change is (values before, values after); None means created or deleted.
+    deltas: dict = {}
+    touched = set()
+    for before, after in changes:
+        for values, sign in ((before, -1), (after, 1)):
+            if values is not None:
+                _collect(deltas, values, sign)
+                touched.add((values["entry_date"], values["section_id"]))
+    apply_deltas(deltas)
+    # Touch every changed row's page, including edits (e.g. worker) that leave the rollup unchanged.
+    entry_pages.touch(touched)
+
+
+def refresh(keys: Iterable[tuple[date, int, int]]) -> None:
+    # Recompute the summary rows of (entry_date, section_id, item_id) keys from the entries, for
+    # writers that cannot know the rows' previous values (an upsert may race another insert of
+    # the same key). Locking the summary rows first makes concurrent refreshes of a key queue
+    # up, and each aggregates only after the previous one has committed.
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    with transaction.atomic():
+        DailyProductionSummary.objects.bulk_create(
+            [DailyProductionSummary(entry_date=key[0], section_id=key[1], item_id=key[2]) for key in keys],
+            ignore_conflicts=True,
+        )
+        for start in range(0, len(keys), KEY_CHUNK):
+            match = reduce(or_, (Q(entry_date=key[0], section_id=key[1], item_id=key[2]) for key in keys[start : start + KEY_CHUNK]))
+            summaries = {
+                (summary.entry_date, summary.section_id, summary.item_id): summary
+                for summary in DailyProductionSummary.objects.select_for_update().filter(match).order_by("id")
+            }
+            totals = (
+                ProductionEntry.objects.filter(match)
+                .order_by()
+                .values("entry_date", "section_id", "item_id")
+                .annotate(
+                    total_actual=Sum("actual_qty"),
+                    total_target=Sum("target_qty"),
+                    total_overtime=Sum("overtime_hours"),
+                    total_entries=Count("id"),
+                    total_met=Count("id", filter=Q(target_met=True)),
+                )
+            )
+            refreshed = []
+            for row in totals:
+                summary = summaries.pop((row["entry_date"], row["section_id"], row["item_id"]))
+                summary.actual_qty = row["total_actual"] or 0
+                summary.target_qty = row["total_target"] or 0
+                summary.overtime_hours = row["total_overtime"] or 0
+                summary.entry_count = row["total_entries"]
+                summary.target_met_count = row["total_met"]
+                refreshed.append(summary)
+            DailyProductionSummary.objects.bulk_update(refreshed, DELTA_FIELDS)
+            # Keys left over have no entries any more.
+            if summaries:
+                DailyProductionSummary.objects.filter(id__in=[summary.id for summary in summaries.values()]).delete()
+    entry_pages.touch((entry_date, section_id) for entry_date, section_id, _ in keys)
+
+
+def rebuild(*, start: date, end: date, section_ids: Optional[Iterable[int]] = None) -> int:
+    summaries = DailyProductionSummary.objects.filter(entry_date__range=(start, end))
+    entries = entry_source(start, end).objects.filter(entry_date__range=(start, end))
+    if section_ids is not None:
+        summaries = summaries.filter(section_id__in=section_ids)
+        entries = entries.filter(section_id__in=section_ids)
+    totals = (
+        entries.order_by()
+        .values("entry_date", "section_id", "item_id")
+        .annotate(
+            total_actual=Sum("actual_qty"),
+            total_target=Sum("target_qty"),
+            total_overtime=Sum("overtime_hours"),
+            total_entries=Count("id"),
+            total_met=Count("id", filter=Q(target_met=True)),
+        )
+    )
+    created = 0
+    with transaction.atomic():
+        summaries.delete()
+        batch: list[DailyProductionSummary] = []
+        for row in totals.iterator(chunk_size=REBUILD_BATCH):
+            batch.append(
+                DailyProductionSummary(
+                    entry_date=row["entry_date"],
+                    section_id=row["section_id"],
+                    item_id=row["item_id"],
+                    actual_qty=row["total_actual"] or 0,
+                    target_qty=row["total_target"] or 0,
+                    overtime_hours=row["total_overtime"] or 0,
+                    entry_count=row["total_entries"],
+                    target_met_count=row["total_met"],
+                )
+            )
+            if len(batch) >= REBUILD_BATCH:
+                DailyProductionSummary.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        DailyProductionSummary.objects.bulk_create(batch)
+        created += len(batch)
+    return created
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = "production_primary_pin"
+REPLICA_APP_LABELS = {"production"}
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class RoutingState:
+    __slots__ = ("read_alias", "wrote")
+
+    def __init__(self, read_alias: Optional[str] = None) -> None:
+        self.read_alias = read_alias
+        self.wrote = False
+
+
+_state: ContextVar[Optional[RoutingState]] = ContextVar("production_db_routing", default=None)
+
+
+def replica_aliases() -> list[str]:
+    return list(getattr(settings, "PRODUCTION_READ_REPLICAS", []))
+
+
+@contextmanager
+def track_writes():
+    # Request scope: reads default to the primary; any write pins the rest of the request there.
+    state = RoutingState()
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def use_replica(alias: Optional[str] = None):
+    replicas = replica_aliases()
+    outer = _state.get()
+    state = RoutingState(alias or (random.choice(replicas) if replicas else None))
+    state.wrote = bool(outer and outer.wrote)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+        if outer and state.wrote:
+            outer.wrote = True
+
+
+def reading_replica() -> bool:
+    # True when this context's production reads currently go to a replica (which may lag).
+    state = _state.get()
+    return state is not None and state.read_alias is not None and not state.wrote
+
+
+def _stream_on(alias: Optional[str], content):
+    with use_replica(alias):
+        yield from content
+
+
+def _wants_replica(request) -> bool:
+    return request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES and bool(replica_aliases())
+
+
+def replica_reads(view):
+    # For read-only views: safe requests read production data from one replica for the whole
+    # request, unless the client wrote recently (pin cookie). Lazy TemplateResponses are
+    # rendered and streaming bodies consumed under the same routing.
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def awrapped(request, *args, **kwargs):
+            if not _wants_replica(request):
+                return await view(request, *args, **kwargs)
+            with use_replica():
+                return await view(request, *args, **kwargs)
+
+        return awrapped
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not _wants_replica(request):
+            return view(request, *args, **kwargs)
+        with use_replica() as state:
+            response = view(request, *args, **kwargs)
+            if callable(getattr(response, "render", None)):
+                response.render()
+        if getattr(response, "streaming", False):
+            response.streaming_content = _stream_on(state.read_alias, response.streaming_content)
+        return response
+
+    return wrapped
+
+
+class PrimaryReplicaRouter:
+    # Writes always go to the primary. Reads of production models go to a replica only inside
+    # replica_reads/use_replica, and fall back to the primary once this request has written
+    # or while a transaction is open on it.
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.read_alias is None:
+            return None
+        if state.wrote or model._meta.app_label not in REPLICA_APP_LABELS or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.read_alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
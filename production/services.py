@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from django.core.exceptions import ValidationError
+from django.core.validators import DecimalValidator
+from django.db import transaction
+
+from . import rollups
+from .archive import archived_months, month_start
+from .models import Item, ProductionArchive, ProductionEntry, Section, TargetRule, Worker
+from .resolver import target_resolver
+
+
+@dataclass
+class BatchLookups:
+    workers: dict[str, Worker] = field(default_factory=dict)
+    items: dict[str, Item] = field(default_factory=dict)
+    targets: dict[int, TargetRule] = field(default_factory=dict)
+
+
+def resolve_targets(*, section: Section, item_ids: Iterable[int], target_date: date) -> dict[int, TargetRule]:
+    return target_resolver.resolve_many(section=section, items=item_ids, target_date=target_date)
+
+
+def load_batch(
+    *,
+    section: Optional[Section],
+    entry_date: Optional[date],
+    worker_ids: Iterable[str],
+    item_ids: Iterable[str],
+) -> BatchLookups:
+    worker_ids = {pk for pk in worker_ids if pk and str(pk).isdigit()}
+    item_ids = {pk for pk in item_ids if pk and str(pk).isdigit()}
+    workers = {str(w.pk): w for w in Worker.objects.filter(is_active=True, pk__in=worker_ids)} if worker_ids else {}
+    items = {str(i.pk): i for i in Item.objects.filter(is_active=True, pk__in=item_ids)} if item_ids else {}
+    targets: dict[int, TargetRule] = {}
+    if section and entry_date and items:
+        targets = resolve_targets(section=section, item_ids=[i.pk for i in items.values()], target_date=entry_date)
+    return BatchLookups(workers=workers, items=items, targets=targets)
+
+
+def build_entry(*, entry_date: date, section: Section, row: dict, created_by) -> ProductionEntry:
+    entry = ProductionEntry(
+        entry_date=entry_date,
+        section=section,
+        worker=row["worker"],
+        item=row["item"],
+        target_qty=Decimal(row.get("target_qty") or 0),
+        actual_qty=Decimal(row.get("actual_qty") or 0),
+        shift_hours=Decimal(row.get("shift_hours") or 0),
+        created_by=created_by,
+    )
+    entry.set_outcomes()
+    return entry
+
+
+def save_entries(*, entry_date: date, section: Section, rows: Iterable[dict], created_by) -> list[ProductionEntry]:
+    entries = [build_entry(entry_date=entry_date, section=section, row=row, created_by=created_by) for row in rows]
+    return upsert_entries(entries).entries
+
+
+NATURAL_KEY = ("entry_date", "section_id", "worker_id", "item_id")
+UPSERT_FIELDS = ("target_qty", "actual_qty", "shift_hours", "overtime_hours", "target_met", "updated_at")
+
+
+def natural_key(entry: ProductionEntry) -> tuple:
+    return tuple(getattr(entry, name) for name in NATURAL_KEY)
+
+
+@dataclass
+class UpsertResult:
+    entries: list[ProductionEntry]
+    # Natural keys that already had a row, which the upsert overwrote.
+    updated: set[tuple] = field(default_factory=set)
+
+
+def upsert_entries(entries: list[ProductionEntry], *, batch_size: Optional[int] = None) -> UpsertResult:
+    # Single write path for every bulk producer (formset, importer, APIs): one INSERT ... ON CONFLICT
+    # on the natural key, so a re-submitted batch overwrites its rows instead of doubling them.
+    # Rows repeating a key within the batch collapse to the last one.
+    entries = list({natural_key(entry): entry for entry in entries}.values())
+    if not entries:
+        return UpsertResult(entries=[])
+    archived = archived_months({entry.entry_date for entry in entries})
+    if archived:
+        raise RowError(f"month archived: {', '.join(sorted(f'{month:%Y-%m}' for month in archived))}")
+    with transaction.atomic():
+        ProductionEntry.objects.bulk_create(
+            entries,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["entry_date", "section", "worker", "item"],
+            update_fields=UPSERT_FIELDS,
+        )
+        # Only the statement itself knows which keys already existed (a concurrent insert of the
+        # same key may have landed meanwhile). The update leaves created_at alone, so rows whose
+        # stored created_at differs from the one stamped on this batch's object were overwritten.
+        stamped = {entry.pk: entry.created_at for entry in entries}
+        stored = ProductionEntry.objects.filter(pk__in=list(stamped)).values_list("pk", "created_at")
+        overwritten = {pk for pk, created_at in stored if created_at != stamped[pk]}
+        # bulk_create skips post_save; the touched rollup keys are re-aggregated in the same transaction.
+        rollups.refresh((entry.entry_date, entry.section_id, entry.item_id) for entry in entries)
+    return UpsertResult(entries=entries, updated={natural_key(entry) for entry in entries if entry.pk in overwritten})
+
+
+class RowError(ValueError):
+    pass
+
+
+def _check_decimal(column: str, value: Decimal, raw) -> Decimal:
+    # NaN, Infinity and values wider than the column would only fail later, in set_outcomes()
+    # or the INSERT, and take the whole batch down with them.
+    field = ProductionEntry._meta.get_field(column)
+    try:
+        DecimalValidator(field.max_digits, field.decimal_places)(value)
+    except ValidationError:
+        raise RowError(f"invalid {column}: {raw!r}") from None
+    return value
+
+
+def _row_decimal(row: dict, column: str, required: bool = True) -> Optional[Decimal]:
+    value = row.get(column)
+    if value in (None, ""):
+        if required:
+            raise RowError(f"missing {column}")
+        return None
+    try:
+        return _check_decimal(column, Decimal(str(value)), value)
+    except InvalidOperation:
+        raise RowError(f"invalid {column}: {value!r}") from None
+
+
+def _code(row: dict, column: str) -> str:
+    # JSON sources may send numeric codes (employee_code: 123); the lookup maps are keyed by text.
+    value = row.get(column)
+    return "" if value is None else str(value)
+
+
+class EntryRowBuilder:
+    # Turns code-keyed rows (entry_date, section_code, employee_code, sku, actual_qty and
+    # optional target_qty/shift_hours) into unsaved entries using preloaded code -> id maps.
+
+    def __init__(
+        self,
+        *,
+        sections: dict[str, int],
+        workers: dict[str, int],
+        items: dict[str, int],
+        created_by_id: int,
+        allowed_section_ids: Optional[set[int]] = None,
+        archived: frozenset[date] = frozenset(),
+    ):
+        self.sections = sections
+        self.workers = workers
+        self.items = items
+        self.created_by_id = created_by_id
+        self.allowed_section_ids = allowed_section_ids
+        self.archived = archived
+        self.rule_for = lru_cache(maxsize=65536)(
+            lambda section_id, item_id, entry_date: target_resolver.resolve(section=section_id, item=item_id, target_date=entry_date)
+        )
+
+    @classmethod
+    def preload(cls, *, created_by_id: int, rows: Optional[list[dict]] = None, active_only: bool = False, **kwargs):
+        sections, workers, items = Section.objects.all(), Worker.objects.all(), Item.objects.all()
+        if active_only:
+            sections, workers, items = sections.filter(is_active=True), workers.filter(is_active=True), items.filter(is_active=True)
+        if rows is not None:
+            # Only fetch the codes this batch actually references.
+            sections = sections.filter(code__in={_code(row, "section_code") for row in rows})
+            workers = workers.filter(employee_code__in={_code(row, "employee_code") for row in rows})
+            items = items.filter(sku__in={_code(row, "sku") for row in rows})
+        return cls(
+            sections=dict(sections.values_list("code", "id")),
+            workers=dict(workers.values_list("employee_code", "id")),
+            items=dict(items.values_list("sku", "id")),
+            created_by_id=created_by_id,
+            archived=frozenset(ProductionArchive.objects.values_list("month", flat=True)),
+            **kwargs,
+        )
+
+    def prime_targets(self, rows: Iterable[dict]) -> None:
+        pairs = {(self.sections.get(_code(row, "section_code")), self.items.get(_code(row, "sku"))) for row in rows}
+        target_resolver.prime(pair for pair in pairs if None not in pair)
+
+    def build(self, row: dict) -> ProductionEntry:
+        try:
+            entry_date = date.fromisoformat(str(row.get("entry_date") or ""))
+        except ValueError:
+            raise RowError(f"invalid entry_date: {row.get('entry_date')!r}") from None
+        if month_start(entry_date) in self.archived:
+            raise RowError(f"month archived: {entry_date:%Y-%m}")
+        section_id = self.sections.get(_code(row, "section_code"))
+        if section_id is None:
+            raise RowError(f"unknown section_code: {row.get('section_code')!r}")
+        if self.allowed_section_ids is not None and section_id not in self.allowed_section_ids:
+            raise RowError(f"section not allowed: {row.get('section_code')!r}")
+        worker_id = self.workers.get(_code(row, "employee_code"))
+        if worker_id is None:
+            raise RowError(f"unknown employee_code: {row.get('employee_code')!r}")
+        item_id = self.items.get(_code(row, "sku"))
+        if item_id is None:
+            raise RowError(f"unknown sku: {row.get('sku')!r}")
+        actual_qty = _row_decimal(row, "actual_qty")
+
+        rule = self.rule_for(section_id, item_id, entry_date)
+        if rule:
+            target_qty, shift_hours = rule.target_qty, rule.shift_hours
+        else:
+            target_qty = _row_decimal(row, "target_qty", required=False) or Decimal("0")
+            shift_hours = _row_decimal(row, "shift_hours", required=False) or Decimal("0")
+
+        entry = ProductionEntry(
+            entry_date=entry_date,
+            section_id=section_id,
+            worker_id=worker_id,
+            item_id=item_id,
+            target_qty=target_qty,
+            actual_qty=actual_qty,
+            shift_hours=shift_hours,
+            created_by_id=self.created_by_id,
+        )
+        entry.set_outcomes()
+        _check_decimal("overtime_hours", entry.overtime_hours, str(entry.overtime_hours))
+        return entry
+
+
+def ingest_rows(*, rows: list, created_by_id: int, allowed_section_ids: Optional[set[int]] = None) -> list[dict]:
+    # Validate a whole API batch against preloaded maps, insert the valid rows together and
+    # report one result per submitted row. Rows are dicts shaped like import_production rows.
+    objects = [row for row in rows if isinstance(row, dict)]
+    builder = EntryRowBuilder.preload(
+        created_by_id=created_by_id, rows=objects, active_only=True, allowed_section_ids=allowed_section_ids
+    )
+    builder.prime_targets(objects)
+    results: list[dict] = []
+    accepted: list[tuple[dict, ProductionEntry]] = []
+    for index, row in enumerate(rows):
+        result: dict = {"index": index}
+        results.append(result)
+        if not isinstance(row, dict):
+            result.update(status="rejected", error="entry must be an object")
+            continue
+        try:
+            entry = builder.build(row)
+        except RowError as exc:
+            result.update(status="rejected", error=str(exc))
+            continue
+        accepted.append((result, entry))
+    upserted = upsert_entries([entry for _, entry in accepted])
+    winners = {natural_key(entry): entry for entry in upserted.entries}
+    for result, entry in accepted:
+        key = natural_key(entry)
+        entry = winners[key]
+        result.update(
+            status="updated" if key in upserted.updated else "created",
+            id=entry.pk,
+            target_qty=str(entry.target_qty),
+            target_met=entry.target_met,
+        )
+    return results
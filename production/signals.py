@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from datetime import date
+
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import rollups
+from .choices import master_fragments
+from .models import Item, ProductionEntry, Section, TargetRule, Worker
+from .permissions import invalidate_scopes
+from .resolver import target_resolver
+
+
+@receiver(post_save, sender=TargetRule)
+@receiver(post_delete, sender=TargetRule)
+def invalidate_target_rules(sender, **kwargs) -> None:
+    # Drop now for this process, and again after commit so no reader can cache
+    # the pre-commit state in between. QuerySet.update() bypasses this signal.
+    target_resolver.invalidate()
+    transaction.on_commit(target_resolver.invalidate)
+
+
+@receiver(pre_save, sender=TargetRule)
+def remember_rule_range_before_save(sender, instance, raw=False, **kwargs) -> None:
+    # Entries in a range the rule no longer covers keep the targets it gave them until a
+    # recompute visits them, so widen the rule's stale range to the range being replaced.
+    if raw or instance.pk is None:
+        return
+    stored = TargetRule.objects.filter(pk=instance.pk).values("start_date", "end_date", "stale_start", "stale_end").first()
+    if stored is None or (stored["start_date"], stored["end_date"]) == (instance.start_date, instance.end_date):
+        return
+    starts = [day for day in (stored["stale_start"], stored["start_date"]) if day]
+    ends = [day for day in (stored["stale_end"], stored["end_date"] or date.today()) if day]
+    instance.stale_start, instance.stale_end = min(starts), max(ends)
+    # Written directly too, so a save(update_fields=[...]) that leaves these out still records them.
+    TargetRule.objects.filter(pk=instance.pk).update(stale_start=instance.stale_start, stale_end=instance.stale_end)
+
+
+@receiver(pre_save, sender=ProductionEntry)
+def remember_entry_before_save(sender, instance, raw=False, **kwargs) -> None:
+    if raw or instance.pk is None:
+        return
+    loaded = getattr(instance, "_loaded_values", None) or {}
+    if not set(rollups.ROLLUP_FIELDS) <= loaded.keys():
+        # Built by hand or loaded with only()/defer(): read the stored row so the rollup delta is exact.
+        instance._loaded_values = ProductionEntry.objects.filter(pk=instance.pk).values(*rollups.ROLLUP_FIELDS).first()
+
+
+@receiver(post_save, sender=ProductionEntry)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs) -> None:
+    if raw:
+        return
+    before = None if created else getattr(instance, "_loaded_values", None)
+    after = rollups.entry_values(instance)
+    rollups.record_changes([(before, after)])
+    instance._loaded_values = after
+
+
+@receiver(post_delete, sender=ProductionEntry)
+def update_rollup_on_delete(sender, instance, **kwargs) -> None:
+    loaded = getattr(instance, "_loaded_values", None) or {}
+    before = loaded if set(rollups.ROLLUP_FIELDS) <= loaded.keys() else rollups.entry_values(instance)
+    rollups.record_changes([(before, None)])
+
+
+@receiver(m2m_changed, sender=Section.supervisors.through)
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def invalidate_access_scopes(sender, action, **kwargs) -> None:
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_scopes()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_access_scopes_on_group_change(sender, **kwargs) -> None:
+    invalidate_scopes()
+
+
+@receiver(post_save, sender=Worker)
+@receiver(post_delete, sender=Worker)
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+def invalidate_master_fragments(sender, **kwargs) -> None:
+    master_fragments.invalidate()
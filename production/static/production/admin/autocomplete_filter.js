@@ -0,0 +1,15 @@
+'use strict';
+{
+    // Autocomplete list filters: picking a value reloads the changelist filtered on it.
+    const $ = django.jQuery;
+    $(document).on('change', 'select[data-filter-param]', function() {
+        const params = new URLSearchParams(window.location.search);
+        if (this.value) {
+            params.set(this.dataset.filterParam, this.value);
+        } else {
+            params.delete(this.dataset.filterParam);
+        }
+        params.delete('p');
+        window.location.search = params.toString();
+    });
+}
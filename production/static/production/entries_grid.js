@@ -0,0 +1,82 @@
+'use strict';
+{
+    // Sends only the edited rows, each with the version it was loaded at, in one request.
+    // A 409 marks the rows someone else changed and shows their current values.
+    const form = document.getElementById('entries-grid');
+    const status = document.getElementById('grid-status');
+    const inputs = (row) => row.querySelectorAll('input[data-original]');
+
+    function isChanged(row) {
+        return Array.from(inputs(row)).some((input) => input.value !== input.dataset.original);
+    }
+
+    function show(row, data) {
+        row.dataset.version = data.version;
+        row.querySelector('[data-field="target_qty"]').textContent = data.target_qty;
+        row.querySelector('[data-field="overtime_hours"]').textContent = data.overtime_hours;
+        row.querySelector('[data-field="target_met"]').innerHTML = data.target_met
+            ? '<span class="status-met">Met</span>'
+            : '<span class="status-missed">Missed</span>';
+        inputs(row).forEach((input) => {
+            input.value = input.dataset.original = data[input.name];
+            input.classList.remove('invalid');
+        });
+        row.classList.remove('changed');
+    }
+
+    form.addEventListener('input', (event) => {
+        const row = event.target.closest('tr[data-id]');
+        if (row) {
+            row.classList.toggle('changed', isChanged(row));
+        }
+    });
+
+    form.addEventListener('submit', async (event) => {
+        event.preventDefault();
+        const changed = Array.from(form.querySelectorAll('tr[data-id]')).filter(isChanged);
+        if (!changed.length) {
+            status.textContent = 'Nothing to save.';
+            return;
+        }
+        const rows = changed.map((row) => {
+            const edit = {id: Number(row.dataset.id), version: row.dataset.version};
+            inputs(row).forEach((input) => {
+                edit[input.name] = input.value;
+            });
+            return edit;
+        });
+        const response = await fetch(form.action, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json', 'X-CSRFToken': form.elements.csrfmiddlewaretoken.value},
+            credentials: 'same-origin',
+            body: JSON.stringify({rows}),
+        });
+        const body = await response.json();
+        if (response.status === 409) {
+            body.conflicts.forEach((conflict) => {
+                const row = form.querySelector(`tr[data-id="${conflict.id}"]`);
+                row.classList.add('conflict');
+                if (!conflict.deleted) {
+                    show(row, conflict);
+                }
+            });
+            status.textContent = 'Some rows were changed by someone else and now show their current values. Nothing was saved; re-apply your edits and save again.';
+            return;
+        }
+        if (!response.ok) {
+            (body.errors || []).forEach((error) => {
+                const input = form.querySelector(`tr[data-id="${error.id}"] input[name="${error.field}"]`);
+                input.classList.add('invalid');
+                input.title = error.error;
+            });
+            status.textContent = body.error;
+            return;
+        }
+        body.updated.forEach((data) => {
+            const row = form.querySelector(`tr[data-id="${data.id}"]`);
+            row.classList.remove('conflict');
+            show(row, data);
+        });
+        status.textContent = `Saved ${body.updated.length} rows.`;
+    });
+}
@@ -0,0 +1,69 @@
+'use strict';
+{
+    // Fills target/shift fields from the prefetched targets and previews overtime with the same
+    // formula as ProductionEntry.compute_overtime. The server still resolves targets on submit.
+    let targets = JSON.parse(document.getElementById('entry-targets').textContent || 'null');
+    const form = document.getElementById('entry-form');
+
+    function field(row, name) {
+        return row.querySelector(`[name$="-${name}"]`);
+    }
+
+    function overtime(actual, target, shift) {
+        if (!(target > 0) || !(shift > 0)) {
+            return 0;
+        }
+        const ratio = actual / target - 1;
+        return ratio > 0 ? ratio * shift : 0;
+    }
+
+    function fill(row) {
+        const item = field(row, 'item');
+        if (!item) {
+            return;
+        }
+        const rule = targets && targets.targets[item.value];
+        if (rule) {
+            field(row, 'target_qty').value = rule[0];
+            field(row, 'shift_hours').value = rule[1];
+        } else if (item.value) {
+            field(row, 'target_qty').value = '0';
+        }
+        const predicted = overtime(
+            parseFloat(field(row, 'actual_qty').value) || 0,
+            parseFloat(field(row, 'target_qty').value) || 0,
+            parseFloat(field(row, 'shift_hours').value) || 0
+        );
+        row.querySelector('.predicted-overtime').textContent = item.value ? predicted.toFixed(2) : '';
+    }
+
+    function fillAll() {
+        form.querySelectorAll('#entry-rows tr').forEach(fill);
+    }
+
+    async function reload() {
+        const params = new URLSearchParams({
+            section: form.elements.section.value,
+            entry_date: form.elements.entry_date.value,
+        });
+        const response = await fetch(`${form.dataset.targetsUrl}?${params}`, {credentials: 'same-origin'});
+        targets = response.ok ? await response.json() : null;
+        fillAll();
+    }
+
+    form.addEventListener('change', (event) => {
+        if (event.target.name === 'section' || event.target.name === 'entry_date') {
+            reload();
+        } else if (event.target.closest('#entry-rows tr')) {
+            fill(event.target.closest('tr'));
+        }
+    });
+    form.addEventListener('input', (event) => {
+        const row = event.target.closest('#entry-rows tr');
+        if (row) {
+            fill(row);
+        }
+    });
+    document.body.addEventListener('htmx:afterSwap', fillAll);
+    fillAll();
+}
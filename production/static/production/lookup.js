@@ -0,0 +1,63 @@
+'use strict';
+{
+    // Worker/item search boxes rendered by LookupInput: suggestions come from the lookup
+    // endpoints, and picking one stores its id in the hidden form field.
+    const DELAY = 200;
+    let listCount = 0;
+
+    function suggestions(box) {
+        if (!box.list) {
+            const list = document.createElement('datalist');
+            list.id = `lookup-list-${++listCount}`;
+            box.after(list);
+            box.setAttribute('list', list.id);
+        }
+        return box.list;
+    }
+
+    function pick(box) {
+        const holder = box.closest('.lookup');
+        const hidden = holder.querySelector('input[type="hidden"]');
+        const value = (holder.lookupResults || {})[box.value] || '';
+        if (value !== hidden.value) {
+            hidden.value = value;
+            hidden.dispatchEvent(new Event('change', {bubbles: true}));
+        }
+    }
+
+    async function search(box) {
+        const holder = box.closest('.lookup');
+        const params = new URLSearchParams({q: box.value, section: holder.dataset.section || ''});
+        const entryDate = box.form && box.form.elements.namedItem('entry_date');
+        if (entryDate && entryDate.value) {
+            params.set('entry_date', entryDate.value);
+        }
+        const response = await fetch(`${holder.dataset.lookupUrl}?${params}`, {credentials: 'same-origin'});
+        if (!response.ok) {
+            return;
+        }
+        const {results} = await response.json();
+        holder.lookupResults = Object.fromEntries(results.map((row) => [row.text, String(row.id)]));
+        suggestions(box).replaceChildren(...results.map((row) => new Option(row.text, row.text)));
+        pick(box);
+    }
+
+    document.addEventListener('input', (event) => {
+        const box = event.target;
+        if (!box.matches('.lookup input[type="search"]')) {
+            return;
+        }
+        const holder = box.closest('.lookup');
+        if (box.value in (holder.lookupResults || {})) {
+            pick(box);
+            return;
+        }
+        clearTimeout(holder.lookupTimer);
+        holder.lookupTimer = setTimeout(() => search(box), DELAY);
+    });
+    document.addEventListener('change', (event) => {
+        if (event.target.matches('.lookup input[type="search"]')) {
+            pick(event.target);
+        }
+    });
+}
@@ -1,3 +1,5 @@
+import io
+import json
 from datetime import date, timedelta
 from decimal import Decimal
 
@@ -5,6 +7,7 @@ import pytest
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.core.exceptions import PermissionDenied
+from django.db.models import Count
 from django.urls import reverse
 
 from .models import Item, ProductionEntry, Section, TargetRule, Worker
@@ -12,6 +15,19 @@ from .models import Item, ProductionEntry, Section, TargetRule, Worker
 pytestmark = pytest.mark.django_db
 
 
+@pytest.fixture(autouse=True)
+def _reset_caches():
+    from django.core.cache import cache
+
+    from .resolver import target_resolver
+
+    target_resolver.clear()
+    cache.clear()
+    yield
+    target_resolver.clear()
+    cache.clear()
+
+
 @pytest.fixture
 def admin_user(db):
     User = get_user_model()
@@ -103,3 +119,1160 @@ def test_permissions_enforced(supervisor_user, section, worker, item, client):
     )
     assert response.status_code == 403
     assert ProductionEntry.objects.count() == 0
+
+
+def _formset_post_data(section, rows, entry_date=None):
+    data = {
+        "entry_date": (entry_date or date.today()).isoformat(),
+        "section": section.id,
+        "form-TOTAL_FORMS": str(len(rows)),
+        "form-INITIAL_FORMS": "0",
+        "form-MIN_NUM_FORMS": "0",
+        "form-MAX_NUM_FORMS": "1000",
+    }
+    for index, (worker, item, actual_qty) in enumerate(rows):
+        data[f"form-{index}-worker"] = worker.id
+        data[f"form-{index}-item"] = item.id
+        data[f"form-{index}-target_qty"] = "0"
+        data[f"form-{index}-actual_qty"] = str(actual_qty)
+        data[f"form-{index}-shift_hours"] = "0"
+    return data
+
+
+def _count_queries(callback):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as ctx:
+        callback()
+    return len(ctx.captured_queries)
+
+
+def test_batched_save_query_count_is_constant(admin_user, section, item, target_rule, client):
+    client.force_login(admin_user)
+    workers = [Worker.objects.create(name=f"W{i}", employee_code=f"B{i:03d}") for i in range(30)]
+    other_item = Item.objects.create(name="Gadget", sku="ITM-002")
+    TargetRule.objects.create(section=section, item=other_item, target_qty=Decimal("50"), shift_hours=Decimal("8"), start_date=date.today())
+
+    single = _count_queries(lambda: client.post(reverse("production:entry"), data=_formset_post_data(section, [(workers[0], item, 120)])))
+    rows = [(w, item if i % 2 else other_item, 60 + i) for i, w in enumerate(workers)]
+    many = _count_queries(lambda: client.post(reverse("production:entry"), data=_formset_post_data(section, rows)))
+
+    assert many == single
+    assert ProductionEntry.objects.count() == 31
+    entry = ProductionEntry.objects.get(worker=workers[1])
+    assert entry.target_qty == Decimal("100")
+    assert entry.target_met is False
+    entry = ProductionEntry.objects.get(worker=workers[20])
+    assert entry.target_qty == Decimal("50")
+    assert entry.overtime_hours == Decimal("4.80")
+
+
+def test_batched_save_is_all_or_nothing(admin_user, section, worker, item):
+    from django.db import IntegrityError
+
+    from .services import save_entries
+
+    rows = [
+        {"worker": worker, "item": item, "target_qty": 100, "actual_qty": 10, "shift_hours": 8},
+        {"worker": worker, "item": None, "target_qty": 100, "actual_qty": 10, "shift_hours": 8},
+    ]
+    with pytest.raises(IntegrityError):
+        save_entries(entry_date=date.today(), section=section, rows=rows, created_by=admin_user)
+    assert ProductionEntry.objects.count() == 0
+
+
+def test_batched_formset_rejects_inactive_worker(admin_user, section, worker, item, client):
+    worker.is_active = False
+    worker.save()
+    client.force_login(admin_user)
+    resp = client.post(reverse("production:entry"), data=_formset_post_data(section, [(worker, item, 10)]))
+    assert resp.status_code == 200
+    assert ProductionEntry.objects.count() == 0
+    assert resp.context["formset"].forms[0].errors["worker"]
+
+
+def test_target_resolver_picks_latest_active_interval(section, item):
+    from .resolver import target_resolver
+
+    today = date.today()
+    TargetRule.objects.create(section=section, item=item, target_qty=Decimal("80"), shift_hours=Decimal("8"), start_date=today - timedelta(days=30))
+    TargetRule.objects.create(
+        section=section,
+        item=item,
+        target_qty=Decimal("90"),
+        shift_hours=Decimal("8"),
+        start_date=today - timedelta(days=10),
+        end_date=today - timedelta(days=5),
+    )
+    for offset in (-40, -30, -10, -5, -4, 0, 30):
+        target_date = today + timedelta(days=offset)
+        expected = TargetRule.objects.for_section_item_date(section=section, item=item, target_date=target_date).first()
+        assert target_resolver.resolve(section=section, item=item, target_date=target_date) == expected
+
+
+def test_target_resolver_caches_and_invalidates_on_save(section, item, target_rule, django_assert_num_queries):
+    from .resolver import target_resolver
+
+    today = date.today()
+    with django_assert_num_queries(1):
+        assert target_resolver.resolve(section=section, item=item, target_date=today) == target_rule
+    with django_assert_num_queries(0):
+        assert target_resolver.resolve(section=section, item=item, target_date=today) == target_rule
+    assert target_resolver.stats()["hits"] == 1
+    assert target_resolver.stats()["misses"] == 1
+
+    target_rule.target_qty = Decimal("150")
+    target_rule.save()
+    assert target_resolver.resolve(section=section, item=item, target_date=today).target_qty == Decimal("150")
+    target_rule.delete()
+    assert target_resolver.resolve(section=section, item=item, target_date=today) is None
+
+
+def test_target_resolver_shared_version_resyncs_other_processes(section, item, target_rule, settings):
+    from .resolver import TargetRuleResolver
+
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "resolver-test"}}
+    settings.PRODUCTION_TARGET_CACHE_ALIAS = "default"
+    worker_a, worker_b = TargetRuleResolver(), TargetRuleResolver()
+    today = date.today()
+    assert worker_a.resolve(section=section, item=item, target_date=today) == target_rule
+    assert worker_b.resolve(section=section, item=item, target_date=today) == target_rule
+
+    TargetRule.objects.filter(pk=target_rule.pk).update(target_qty=Decimal("70"))
+    worker_a.invalidate()
+    assert worker_b.resolve(section=section, item=item, target_date=today).target_qty == Decimal("70")
+    assert worker_b.stats()["misses"] == 2
+
+
+def test_import_production_streams_batches_and_reports_rejects(admin_user, section, worker, item, target_rule, tmp_path):
+    from django.core.management import call_command
+
+    source = tmp_path / "entries.csv"
+    source.write_text(
+        "entry_date,section_code,employee_code,sku,actual_qty,target_qty,shift_hours\n"
+        f"{date.today().isoformat()},ASM,W001,ITM-001,90,,\n"
+        f"{date.today().isoformat()},ASM,W001,ITM-001,120,,\n"
+        f"{(date.today() - timedelta(days=1)).isoformat()},ASM,W001,ITM-001,40,50,4\n"
+        f"{date.today().isoformat()},ASM,NOPE,ITM-001,10,,\n"
+        "not-a-date,ASM,W001,ITM-001,10,,\n"
+        f"{date.today().isoformat()},ASM,W001,ITM-001,NaN,,\n"
+    )
+    rejects = tmp_path / "rejects.csv"
+    out = io.StringIO()
+    call_command("import_production", str(source), created_by="admin", batch_size=2, rejects=str(rejects), stdout=out)
+
+    # The repeated (date, section, worker, item) row updates the first instead of adding a second.
+    assert ProductionEntry.objects.count() == 2
+    met = ProductionEntry.objects.get(actual_qty=Decimal("120"))
+    assert (met.target_qty, met.target_met, met.overtime_hours) == (Decimal("100"), True, Decimal("1.60"))
+    fallback = ProductionEntry.objects.get(actual_qty=Decimal("40"))
+    assert (fallback.target_qty, fallback.shift_hours, fallback.target_met) == (Decimal("50"), Decimal("4"), False)
+    report = rejects.read_text().splitlines()
+    assert len(report) == 4
+    assert "unknown employee_code" in report[1]
+    assert "invalid entry_date" in report[2]
+    assert "invalid actual_qty" in report[3]
+    assert "Imported 2 entries, updated 1, rejected 3" in out.getvalue()
+
+
+def test_import_production_ndjson(admin_user, section, worker, item, tmp_path):
+    from django.core.management import call_command
+
+    source = tmp_path / "entries.ndjson"
+    source.write_text(
+        json.dumps({"entry_date": date.today().isoformat(), "section_code": "ASM", "employee_code": "W001", "sku": "ITM-001", "actual_qty": 5})
+        + "\n{broken\n"
+        # Numeric codes from JSON match the text codes stored on the master data.
+        + json.dumps({"entry_date": date.today().isoformat(), "section_code": "ASM", "employee_code": 123, "sku": "ITM-001", "actual_qty": 7})
+        + "\n"
+    )
+    Worker.objects.create(name="Numbered", employee_code="123")
+    out = io.StringIO()
+    call_command("import_production", str(source), created_by="admin", stdout=out)
+    assert ProductionEntry.objects.count() == 2
+    assert "Imported 2 entries, updated 0, rejected 1" in out.getvalue()
+
+
+def _make_entry(section, worker, item, user, entry_date=None, actual_qty="100", target_qty="100", shift_hours="8"):
+    entry = ProductionEntry(
+        entry_date=entry_date or date.today(),
+        section=section,
+        worker=worker,
+        item=item,
+        target_qty=Decimal(target_qty),
+        actual_qty=Decimal(actual_qty),
+        shift_hours=Decimal(shift_hours),
+        created_by=user,
+    )
+    entry.set_outcomes()
+    entry.save()
+    return entry
+
+
+def test_export_streams_scoped_rows(supervisor_user, section, worker, item, client):
+    other_section = Section.objects.create(name="Packaging", code="PKG")
+    today = date.today()
+    _make_entry(section, worker, item, supervisor_user, entry_date=today - timedelta(days=2), actual_qty="120")
+    _make_entry(section, worker, item, supervisor_user, entry_date=today)
+    _make_entry(section, worker, item, supervisor_user, entry_date=today - timedelta(days=10))
+    _make_entry(other_section, worker, item, supervisor_user, entry_date=today)
+    client.force_login(supervisor_user)
+
+    url = reverse("production:entries-export")
+    resp = client.get(url, {"start": (today - timedelta(days=5)).isoformat(), "end": today.isoformat()})
+    assert resp.status_code == 200
+    assert resp.streaming
+    lines = b"".join(resp.streaming_content).decode().splitlines()
+    assert lines[0].startswith("entry_date,section_code,section")
+    assert len(lines) == 3
+    assert ",ASM," in lines[1] and ",120.00," in lines[1]
+
+    resp = client.get(url, {"format": "ndjson"})
+    rows = [json.loads(line) for line in b"".join(resp.streaming_content).decode().splitlines()]
+    assert [row["section_code"] for row in rows] == ["ASM"]
+
+    assert client.get(url, {"section": other_section.id}).status_code == 403
+    assert client.get(url, {"start": "garbage"}).status_code == 400
+
+
+def _summary_tuple(section, item, entry_date=None):
+    from .models import DailyProductionSummary
+
+    summary = DailyProductionSummary.objects.get(entry_date=entry_date or date.today(), section=section, item=item)
+    return (summary.actual_qty, summary.target_qty, summary.overtime_hours, summary.entry_count, summary.target_met_count)
+
+
+def test_rollup_tracks_bulk_create_update_and_delete(admin_user, section, worker, item, target_rule, client):
+    from .models import DailyProductionSummary
+
+    other = Worker.objects.create(name="Asha", employee_code="W002")
+    client.force_login(admin_user)
+    client.post(reverse("production:entry"), data=_formset_post_data(section, [(worker, item, 120), (other, item, 80)]))
+    assert _summary_tuple(section, item) == (Decimal("200"), Decimal("200"), Decimal("1.60"), 2, 1)
+
+    entry = ProductionEntry.objects.get(actual_qty=Decimal("80"))
+    entry.actual_qty = Decimal("150")
+    entry.set_outcomes()
+    entry.save()
+    assert _summary_tuple(section, item) == (Decimal("270"), Decimal("200"), Decimal("5.60"), 2, 2)
+
+    moved = ProductionEntry.objects.only("id").get(pk=entry.pk)
+    moved.entry_date = date.today() - timedelta(days=1)
+    moved.save(update_fields=["entry_date"])
+    assert _summary_tuple(section, item) == (Decimal("120"), Decimal("100"), Decimal("1.60"), 1, 1)
+    assert _summary_tuple(section, item, moved.entry_date)[3] == 1
+
+    ProductionEntry.objects.filter(entry_date=date.today()).delete()
+    assert not DailyProductionSummary.objects.filter(entry_date=date.today()).exists()
+
+
+def test_rebuild_rollups_matches_incremental(admin_user, section, worker, item):
+    from django.core.management import call_command
+
+    from .models import DailyProductionSummary
+
+    other = Worker.objects.create(name="Asha", employee_code="W002")
+    for person, offset, qty in ((worker, 0, "120"), (other, 0, "90"), (worker, 1, "100")):
+        _make_entry(section, person, item, admin_user, entry_date=date.today() - timedelta(days=offset), actual_qty=qty)
+    incremental = sorted(DailyProductionSummary.objects.values_list("entry_date", "actual_qty", "entry_count", "target_met_count"))
+    DailyProductionSummary.objects.all().update(actual_qty=0, entry_count=99)
+
+    call_command("rebuild_rollups", stdout=io.StringIO())
+    assert sorted(DailyProductionSummary.objects.values_list("entry_date", "actual_qty", "entry_count", "target_met_count")) == incremental
+    assert incremental[1][1:] == (Decimal("210"), 2, 1)
+
+
+def test_worker_report_aggregates_and_paginates(admin_user, section, worker, item, client):
+    daily = Worker.objects.create(name="Asha", employee_code="W002", is_daily_wage=True)
+    today = date.today()
+    _make_entry(section, worker, item, admin_user, entry_date=today, actual_qty="120")
+    _make_entry(section, worker, item, admin_user, entry_date=today - timedelta(days=1), actual_qty="80")
+    _make_entry(section, daily, item, admin_user, entry_date=today, actual_qty="100")
+    client.force_login(admin_user)
+    url = reverse("production:worker-report-api")
+    params = {"start": (today - timedelta(days=7)).isoformat(), "end": today.isoformat(), "limit": "1"}
+
+    first = client.get(url, params).json()
+    assert [row["employee_code"] for row in first["rows"]] == ["W002"]
+    assert first["next_cursor"]
+    second = client.get(url, {**params, "cursor": first["next_cursor"]}).json()
+    assert second["next_cursor"] is None
+    row = second["rows"][0]
+    assert row["employee_code"] == "W001"
+    assert Decimal(row["total_actual"]) == Decimal("200")
+    assert Decimal(row["total_target"]) == Decimal("200")
+    assert row["efficiency"] == 1.0
+    assert (row["days_worked"], row["days_target_met"]) == (2, 1)
+    assert Decimal(row["total_overtime"]) == Decimal("1.60")
+
+    daily_only = client.get(url, {**params, "daily_wage": "1", "limit": "10"}).json()
+    assert [row["employee_code"] for row in daily_only["rows"]] == ["W002"]
+    by_item = client.get(url, {**params, "by_item": "1"}).json()
+    assert by_item["rows"][0]["sku"] == "ITM-001"
+
+    assert client.get(url, {"cursor": "bogus"}).status_code == 400
+    resp = client.get(reverse("production:worker-report"), params)
+    assert resp.status_code == 200
+    assert b"Asha" in resp.content
+
+
+def test_entries_listing_keyset_pages(admin_user, section, item, client):
+    workers = [Worker.objects.create(name=f"Worker {i}", employee_code=f"K{i:03d}") for i in range(5)]
+    for worker in workers:
+        _make_entry(section, worker, item, admin_user)
+    client.force_login(admin_user)
+    url = reverse("production:entries-api")
+
+    seen, cursor, page_queries = [], None, []
+    while True:
+        params = {"limit": "2", **({"cursor": cursor} if cursor else {})}
+        responses = []
+        page_queries.append(_count_queries(lambda: responses.append(client.get(url, params))))
+        payload = responses[0].json()
+        seen += [row["worker_id"] for row in payload["results"]]
+        cursor = payload["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [worker.id for worker in workers]
+    assert len(set(page_queries)) == 1
+
+    resp = client.get(reverse("production:entries"), {"limit": "2"})
+    assert resp.status_code == 200
+    assert len(resp.context["entries"]) == 2
+    assert resp.context["next_cursor"]
+
+
+def test_entries_listing_query_uses_list_index(admin_user, section):
+    from django.db import connection
+
+    if connection.vendor != "sqlite":
+        pytest.skip("EXPLAIN output checked for SQLite only")
+    entries = ProductionEntry.objects.filter(entry_date=date.today(), section=section).order_by("section_id", "worker_id", "id")
+    plan = entries.explain()
+    assert "production_entry_list_idx" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_access_scope_is_loaded_once_per_user(supervisor_user, section, django_assert_num_queries):
+    from .views import _available_sections, _ensure_permission, _user_has_role
+
+    other_section = Section.objects.create(name="Packaging", code="PKG")
+    user = get_user_model().objects.get(pk=supervisor_user.pk)
+    with django_assert_num_queries(2):
+        assert _user_has_role(user, "SUPERVISOR")
+        assert not _user_has_role(user, "ADMIN")
+        assert _ensure_permission(user, section)
+        assert not _ensure_permission(user, other_section)
+        _available_sections(user)
+    assert list(_available_sections(user)) == [section]
+
+
+def test_access_scope_cross_request_cache_invalidated_on_membership_change(supervisor_user, section, settings, django_assert_num_queries):
+    from .permissions import get_scope
+
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "scope-test"}}
+    settings.PRODUCTION_ACCESS_CACHE_TIMEOUT = 60
+    User = get_user_model()
+    assert get_scope(User.objects.get(pk=supervisor_user.pk)).section_ids == {section.id}
+    fresh = User.objects.get(pk=supervisor_user.pk)
+    with django_assert_num_queries(0):
+        assert get_scope(fresh).supervises(section.id)
+
+    other_section = Section.objects.create(name="Packaging", code="PKG")
+    other_section.supervisors.add(supervisor_user)
+    assert get_scope(User.objects.get(pk=supervisor_user.pk)).section_ids == {section.id, other_section.id}
+    supervisor_user.groups.clear()
+    assert not get_scope(User.objects.get(pk=supervisor_user.pk)).has_group("SUPERVISOR")
+
+
+def test_access_scope_exposed_on_request(supervisor_user, section, client):
+    client.force_login(supervisor_user)
+    resp = client.get(reverse("production:entries"))
+    assert resp.wsgi_request.access_scope.section_ids == {section.id}
+
+
+def test_entry_rows_render_lookup_widgets_not_option_lists(admin_user, section, worker, item, client, django_assert_num_queries):
+    from .forms import ProductionEntryFormSet
+
+    Worker.objects.bulk_create([Worker(name=f"Extra {i}", employee_code=f"X{i:04d}") for i in range(200)])
+    formset = ProductionEntryFormSet(prefix="form", initial=[{}] * 20, form_kwargs={"section": section, "entry_date": date.today()})
+    with django_assert_num_queries(0):
+        html = "".join(str(form["worker"]) + str(form["item"]) for form in formset.forms)
+    assert "Extra" not in html and "<option" not in html
+    assert html.count(f'data-section="{section.id}"') == 40
+
+    bound = ProductionEntryFormSet(_formset_post_data(section, [(worker, item, 5)]), prefix="form", form_kwargs={"section": section, "entry_date": date.today()})
+    bound.is_valid()
+    with django_assert_num_queries(0):
+        rendered = str(bound.forms[0]["worker"])
+    assert 'value="John (W001)"' in rendered and f'name="form-0-worker" value="{worker.id}"' in rendered
+
+
+def test_worker_and_item_lookups_search_codes_and_names_ranking_section_rules_first(supervisor_user, section, worker, item, target_rule, client):
+    Worker.objects.create(name="Johanna", employee_code="Q100")
+    Worker.objects.create(name="Retired John", employee_code="W002", is_active=False)
+    pro = Item.objects.create(name="Widget Pro", sku="ITM-002")  # no target rule in this section
+    lapsed = Item.objects.create(name="Widget Classic", sku="ITM-003")
+    TargetRule.objects.create(
+        section=section, item=lapsed, target_qty=50, shift_hours=8, start_date=date(2020, 1, 1), end_date=date(2020, 12, 31)
+    )
+    client.force_login(supervisor_user)
+
+    def search(name, **params):
+        return client.get(reverse(f"production:{name}-lookup"), {"section": section.id, **params})
+
+    assert [row["text"] for row in search("worker", q="joh").json()["results"]] == ["Johanna (Q100)", "John (W001)"]
+    assert [row["id"] for row in search("worker", q="w00").json()["results"]] == [worker.id]
+    assert len(search("worker", q="", limit="1").json()["results"]) == 1
+    # Items without a current rule stay selectable, ranked after the rule-backed ones.
+    assert [row["id"] for row in search("item", q="widget").json()["results"]] == [item.id, lapsed.id, pro.id]
+    assert [row["id"] for row in search("item", q="widget", entry_date="2020-06-01").json()["results"]] == [lapsed.id, item.id, pro.id]
+    assert search("item", q="ITM-002").json()["results"] == [{"id": pro.id, "text": "Widget Pro (ITM-002)"}]
+    assert search("item", q="", entry_date="bad").status_code == 400
+    other = Section.objects.create(name="Paint", code="PNT")
+    assert client.get(reverse("production:worker-lookup"), {"section": other.id}).status_code == 403
+
+
+def test_entry_row_fragment_cached_per_master_data_version(admin_user, section, worker, item, client, settings):
+    from .choices import master_fragments
+
+    # Without a shared alias nothing is cached, so no process can hold a stale version token.
+    assert not master_fragments.enabled
+    settings.PRODUCTION_CHOICES_CACHE_ALIAS = "default"
+    client.force_login(admin_user)
+    url = reverse("production:entry-row")
+    params = {"section": section.id, "entry_date": date.today().isoformat(), "form_count": 3}
+    first = client.get(url, params).content.decode()
+    assert 'name="form-3-worker"' in first
+    assert 'name="form-TOTAL_FORMS" id="id_form-TOTAL_FORMS" value="4"' in first
+
+    queries = _count_queries(lambda: client.get(url, {**params, "form_count": 4}))
+    assert 'name="form-4-item"' in client.get(url, {**params, "form_count": 4}).content.decode()
+
+    # The fragment carries no worker/item options, so new master data leaves its content unchanged.
+    Worker.objects.create(name="Newcomer", employee_code="W777")
+    refreshed = client.get(url, params).content.decode()
+    assert refreshed == first and "Newcomer" not in refreshed
+    assert _count_queries(lambda: client.get(url, params)) == queries
+
+
+def _ingest(client, key, rows, idempotency_key=None):
+    headers = {"HTTP_AUTHORIZATION": f"Token {key}"}
+    if idempotency_key:
+        headers["HTTP_IDEMPOTENCY_KEY"] = idempotency_key
+    return client.post(reverse("production:entries-ingest"), data=json.dumps({"entries": rows}), content_type="application/json", **headers)
+
+
+def test_ingest_api_validates_rows_and_replays_idempotent_requests(supervisor_user, section, worker, item, target_rule, client):
+    from .models import ApiToken, IngestionBatch
+
+    Section.objects.create(name="Packaging", code="PKG")
+    _, key = ApiToken.issue(user=supervisor_user, name="Line 1 PLC")
+    today = date.today().isoformat()
+    rows = [
+        {"entry_date": today, "section_code": "ASM", "employee_code": "W001", "sku": "ITM-001", "actual_qty": "120"},
+        {"entry_date": today, "section_code": "ASM", "employee_code": "NOPE", "sku": "ITM-001", "actual_qty": "1"},
+        {"entry_date": today, "section_code": "PKG", "employee_code": "W001", "sku": "ITM-001", "actual_qty": "1"},
+        "garbage",
+    ]
+    resp = _ingest(client, key, rows, idempotency_key="shift-1")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert (body["created"], body["rejected"]) == (1, 3)
+    assert body["results"][0]["status"] == "created"
+    assert body["results"][0]["target_qty"] == "100.00"
+    assert "unknown employee_code" in body["results"][1]["error"]
+    assert "section not allowed" in body["results"][2]["error"]
+    assert body["results"][3]["status"] == "rejected"
+    entry = ProductionEntry.objects.get(pk=body["results"][0]["id"])
+    assert (entry.overtime_hours, entry.created_by) == (Decimal("1.60"), supervisor_user)
+
+    replay = _ingest(client, key, rows, idempotency_key="shift-1")
+    assert replay["Idempotent-Replayed"] == "true"
+    assert replay.json() == body
+    assert ProductionEntry.objects.count() == 1
+    assert IngestionBatch.objects.count() == 1
+
+    assert _ingest(client, "wrong", rows).status_code == 401
+
+
+def test_ingest_api_rejects_non_finite_and_oversized_quantities(admin_user, section, worker, item, target_rule, client):
+    from .models import ApiToken
+
+    _, key = ApiToken.issue(user=admin_user, name="Tablet")
+    row = {"entry_date": date.today().isoformat(), "section_code": "ASM", "employee_code": "W001", "sku": "ITM-001"}
+    rows = [{**row, "actual_qty": value} for value in ("NaN", "Infinity", "1e30", "120")]
+    resp = _ingest(client, key, rows)
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [result["status"] for result in results] == ["rejected", "rejected", "rejected", "created"]
+    assert results[0]["error"] == "invalid actual_qty: 'NaN'"
+    assert results[2]["error"] == "invalid actual_qty: '1e30'"
+    assert ProductionEntry.objects.get().actual_qty == Decimal("120")
+
+
+def test_ingest_api_query_count_is_constant(admin_user, section, worker, item, target_rule, client):
+    from .models import ApiToken
+
+    _, key = ApiToken.issue(user=admin_user, name="Tablet")
+    row = {"entry_date": date.today().isoformat(), "section_code": "ASM", "employee_code": "W001", "sku": "ITM-001", "actual_qty": "90"}
+    codes = [f"W{i:03d}" for i in range(100, 180)]
+    Worker.objects.bulk_create([Worker(name=code, employee_code=code) for code in codes])
+    target_rule.save()  # start each measurement with a cold resolver
+    single = _count_queries(lambda: _ingest(client, key, [row], idempotency_key="a"))
+    target_rule.save()
+    # Stay under one SQLite bulk INSERT (999 bound parameters); larger batches add one INSERT per ~83 rows there.
+    many = _count_queries(lambda: _ingest(client, key, [{**row, "employee_code": code} for code in codes], idempotency_key="b"))
+    assert many == single
+    assert ProductionEntry.objects.count() == 81
+
+
+def test_recompute_outcomes_after_retroactive_rule_change(admin_user, section, worker, item, target_rule, django_assert_max_num_queries):
+    from django.core.management import call_command
+
+    other_item = Item.objects.create(name="Gadget", sku="ITM-002")
+    workers = [worker] + [Worker.objects.create(name=f"Worker {i}", employee_code=f"R{i:03d}") for i in range(2)]
+    entries = [_make_entry(section, person, item, admin_user, actual_qty=str(qty)) for person, qty in zip(workers, (90, 120, 150))]
+    untouched = _make_entry(section, worker, other_item, admin_user, actual_qty="10", target_qty="5", shift_hours="8")
+    TargetRule.objects.filter(pk=target_rule.pk).update(target_qty=Decimal("80"))
+    target_rule.save(update_fields=[])  # signal-driven cache invalidation
+
+    # A handful of statements per chunk (select, bulk_update, rollup upsert) rather than per row.
+    with django_assert_max_num_queries(24):
+        call_command("recompute_outcomes", chunk_size=2, stdout=io.StringIO())
+
+    refreshed = {entry.pk: entry for entry in ProductionEntry.objects.all()}
+    assert [refreshed[e.pk].target_qty for e in entries] == [Decimal("80")] * 3
+    assert [refreshed[e.pk].target_met for e in entries] == [True, True, True]
+    assert refreshed[entries[1].pk].overtime_hours == Decimal("4.00")
+    assert refreshed[untouched.pk].target_qty == Decimal("5")
+    assert _summary_tuple(section, item) == (Decimal("360"), Decimal("240"), Decimal("12.00"), 3, 3)
+
+
+def test_target_rule_admin_recompute_action(admin_user, section, worker, item, target_rule, client, settings, tmp_path):
+    from django.core.management import call_command
+
+    settings.PRODUCTION_JOB_RESULTS_DIR = tmp_path
+    entry = _make_entry(section, worker, item, admin_user, actual_qty="90", target_qty="0")
+    admin_user.is_staff = True
+    admin_user.save()
+    client.force_login(admin_user)
+    resp = client.post(
+        reverse("admin:production_targetrule_changelist"),
+        {"action": "recompute_entries", "_selected_action": [target_rule.pk]},
+        follow=True,
+    )
+    assert resp.status_code == 200
+    # The action only queues the work; the worker runs it.
+    entry.refresh_from_db()
+    assert entry.target_qty == Decimal("0")
+    call_command("run_production_worker", once=True, stdout=io.StringIO())
+    entry.refresh_from_db()
+    assert (entry.target_qty, entry.target_met) == (Decimal("100"), False)
+
+
+def test_target_rule_recompute_covers_ranges_dropped_by_edits_and_deletes(admin_user, section, worker, item, client, settings, tmp_path):
+    from django.core.management import call_command
+
+    from .models import Job
+
+    settings.PRODUCTION_JOB_RESULTS_DIR = tmp_path
+    today = date.today()
+    TargetRule.objects.create(section=section, item=item, target_qty=Decimal("80"), shift_hours=Decimal("8"), start_date=today - timedelta(days=30))
+    rule = TargetRule.objects.create(section=section, item=item, target_qty=Decimal("100"), shift_hours=Decimal("8"), start_date=today - timedelta(days=20))
+    entry = _make_entry(section, worker, item, admin_user, entry_date=today - timedelta(days=10), actual_qty="90")
+    # Corrected retroactively: the entry now falls under the older rule.
+    rule.start_date = today
+    rule.save()
+    rule.refresh_from_db()
+    assert (rule.stale_start, rule.stale_end) == (today - timedelta(days=20), today)
+
+    admin_user.is_staff = True
+    admin_user.save()
+    client.force_login(admin_user)
+    changelist = reverse("admin:production_targetrule_changelist")
+    client.post(changelist, {"action": "recompute_entries", "_selected_action": [rule.pk]})
+    call_command("run_production_worker", once=True, stdout=io.StringIO())
+    entry.refresh_from_db()
+    assert (entry.target_qty, entry.target_met) == (Decimal("80"), True)
+    rule.refresh_from_db()
+    assert (rule.stale_start, rule.stale_end) == (None, None)
+
+    # Deleting a rule queues a recompute over the range it covered.
+    Job.objects.all().delete()
+    client.post(changelist, {"action": "delete_selected", "_selected_action": [rule.pk], "post": "yes"})
+    assert not TargetRule.objects.filter(pk=rule.pk).exists()
+    assert Job.objects.get().params == {"start": today.isoformat(), "end": today.isoformat(), "section_ids": [section.id], "item_ids": [item.id]}
+
+
+def test_seed_and_benchmark_commands(tmp_path):
+    from django.core.management import call_command
+
+    call_command(
+        "seed_production", sections=2, workers=6, items=3, days=2, end=date(2026, 1, 31), entries_per_worker_day=1.5, stdout=io.StringIO()
+    )
+    assert Section.objects.filter(code__startswith="SEED-").count() == 2
+    assert TargetRule.objects.count() == 12
+    seeded = ProductionEntry.objects.count()
+    assert seeded >= 12
+    assert not ProductionEntry.objects.values("entry_date", "worker", "item").annotate(n=Count("id")).filter(n__gt=1).exists()
+    # A second run with the same seed skips the keys it already wrote.
+    call_command(
+        "seed_production", sections=2, workers=6, items=3, days=2, end=date(2026, 1, 31), entries_per_worker_day=1.5, stdout=io.StringIO()
+    )
+    assert ProductionEntry.objects.count() == seeded
+
+    output = tmp_path / "bench.json"
+    call_command(
+        "benchmark_production", output=str(output), repeat=2, sizes="1,4", host="testserver", asgi=True, burst=3, concurrency=2, stdout=io.StringIO()
+    )
+    report = json.loads(output.read_text())
+    names = [result["name"] for result in report["results"]]
+    assert names[:4] == ["production_entry_post_1", "production_entry_post_4", "production_entries", "production_entry_row"]
+    assert all(set(result["wall_ms"]) == {"min", "median", "max"} for result in report["results"])
+    assert {"production_entry_row_wsgi_3", "production_entry_row_asgi_3x2", "production_entries_asgi_3x2"} <= set(names)
+    assert report["meta"]["entries"] == seeded
+    assert ProductionEntry.objects.count() == seeded
+    assert not get_user_model().objects.filter(username__startswith="benchmark-").exists()
+
+    from .benchmarks import compare
+
+    slower = json.loads(output.read_text())
+    slower["results"][0]["wall_ms"]["median"] *= 10
+    slower["results"][1]["queries"]["max"] += 5
+    assert len(compare(report, slower)) == 2
+
+
+def test_request_metrics_exposed_per_view(admin_user, section, worker, item, client):
+    from .metrics import registry
+
+    registry.clear()
+    _make_entry(section, worker, item, admin_user)
+    client.force_login(admin_user)
+    assert client.get(reverse("production:entries"), {"section": section.id}).status_code == 200
+    resp = client.get("/metrics")
+    assert resp["Content-Type"].startswith("text/plain")
+    body = resp.content.decode()
+    labels = 'view="production:entries",method="GET"'
+    assert f'production_request_duration_seconds_count{{{labels}}} 1' in body
+    assert f'production_responses_total{{{labels},status="200"}} 1' in body
+    queries = next(line for line in body.splitlines() if line.startswith(f"production_request_db_queries_sum{{{labels}}}"))
+    assert float(queries.rsplit(" ", 1)[1]) > 0
+    template = next(line for line in body.splitlines() if line.startswith(f"production_request_template_seconds_total{{{labels}}}"))
+    assert float(template.rsplit(" ", 1)[1]) > 0
+    assert "production_target_resolver_hits" in body
+
+
+def test_slow_requests_logged_with_top_queries(admin_user, section, client, settings, caplog):
+    settings.PRODUCTION_SLOW_REQUEST_MS = 0.001
+    settings.PRODUCTION_METRICS_TOKEN = "scrape-me"
+    client.force_login(admin_user)
+    with caplog.at_level("WARNING", logger="production.slow_requests"):
+        client.get(reverse("production:entries"), {"section": section.id})
+    record = next(r for r in caplog.records if "view=production:entries" in r.getMessage())
+    assert "SELECT" in record.getMessage()
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-me").status_code == 200
+
+
+def test_archive_moves_old_months_and_reads_stay_transparent(admin_user, section, worker, item, client):
+    from django.core.management import call_command
+
+    from .models import ArchivedProductionEntry, ProductionArchive
+
+    old_day, recent_day = date(2024, 3, 15), date.today()
+    old = _make_entry(section, worker, item, admin_user, entry_date=old_day, actual_qty="80")
+    _make_entry(section, worker, item, admin_user, entry_date=recent_day, actual_qty="120")
+    summary_before = _summary_tuple(section, item, old_day)
+
+    call_command("archive_production", before=date(2024, 4, 1), stdout=io.StringIO())
+    assert list(ProductionEntry.objects.values_list("entry_date", flat=True)) == [recent_day]
+    assert ArchivedProductionEntry.objects.get().pk == old.pk
+    assert ProductionArchive.objects.get().entry_count == 1
+    call_command("rebuild_rollups", stdout=io.StringIO())
+    assert _summary_tuple(section, item, old_day) == summary_before
+
+    client.force_login(admin_user)
+    resp = client.get(reverse("production:entries-export"), {"start": "2024-01-01", "end": recent_day.isoformat()})
+    lines = b"".join(resp.streaming_content).decode().splitlines()
+    assert [line.split(",")[0] for line in lines[1:]] == [old_day.isoformat(), recent_day.isoformat()]
+    report = client.get(reverse("production:worker-report-api"), {"start": "2024-01-01", "end": recent_day.isoformat()}).json()
+    assert (Decimal(report["rows"][0]["total_actual"]), report["rows"][0]["days_worked"]) == (Decimal("200"), 2)
+
+    call_command("restore_production", "2024-03", stdout=io.StringIO())
+    restored = ProductionEntry.objects.get(entry_date=old_day)
+    assert (restored.pk, restored.created_at) == (old.pk, old.created_at)
+    assert not ArchivedProductionEntry.objects.exists() and not ProductionArchive.objects.exists()
+
+
+def test_backfill_into_archived_month_is_rejected_and_restore_still_works(admin_user, section, worker, item, client):
+    from django.core.management import call_command
+
+    from .models import ApiToken
+    from .services import RowError, build_entry, upsert_entries
+
+    old_day = date(2024, 3, 15)
+    _make_entry(section, worker, item, admin_user, entry_date=old_day, actual_qty="80")
+    call_command("archive_production", before=date(2024, 4, 1), stdout=io.StringIO())
+
+    _, key = ApiToken.issue(user=admin_user, name="Backfill")
+    row = {"entry_date": old_day.isoformat(), "section_code": "ASM", "employee_code": "W001", "sku": "ITM-001", "actual_qty": "95"}
+    result = _ingest(client, key, [row]).json()["results"][0]
+    assert (result["status"], result["error"]) == ("rejected", "month archived: 2024-03")
+    backfill = build_entry(entry_date=old_day, section=section, row={"worker": worker, "item": item, "actual_qty": "95"}, created_by=admin_user)
+    with pytest.raises(RowError):
+        upsert_entries([backfill])
+    client.force_login(admin_user)
+    resp = client.post(reverse("production:entry"), data=_formset_post_data(section, [(worker, item, 95)], entry_date=old_day))
+    assert "2024-03 is archived; restore it before changing its entries." in resp.content.decode()
+    assert not ProductionEntry.objects.exists()
+
+    call_command("restore_production", "2024-03", stdout=io.StringIO())
+    assert ProductionEntry.objects.get().actual_qty == Decimal("80")
+    # Hot again, so the backfill now overwrites the restored row.
+    assert upsert_entries([backfill]).updated
+    assert _summary_tuple(section, item, old_day)[3] == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replica_router_routes_reads_until_a_write(settings):
+    from django.db import transaction
+
+    from .routers import PrimaryReplicaRouter, use_replica
+
+    settings.PRODUCTION_READ_REPLICAS = ["replica"]
+    router = PrimaryReplicaRouter()
+    User = get_user_model()
+    assert router.db_for_read(ProductionEntry) is None
+    with use_replica() as state:
+        assert state.read_alias == "replica"
+        assert router.db_for_read(ProductionEntry) == "replica"
+        assert router.db_for_read(User) == "default"
+        with transaction.atomic():
+            assert router.db_for_read(ProductionEntry) == "default"
+        assert router.db_for_write(ProductionEntry) == "default"
+        assert router.db_for_read(ProductionEntry) == "default"
+
+
+def test_writes_pin_client_to_primary(admin_user, section, worker, item, target_rule, client, settings):
+    from .routers import PIN_COOKIE
+
+    settings.PRODUCTION_READ_REPLICAS = ["replica"]
+    client.force_login(admin_user)
+    resp = client.post(reverse("production:entry"), _formset_post_data(section, [(worker, item, "100")]))
+    assert resp.status_code == 302
+    assert resp.cookies[PIN_COOKIE]["max-age"] == settings.PRODUCTION_REPLICA_PIN_SECONDS
+    # Pinned: the listing reads from the primary even though "replica" is not a configured alias.
+    resp = client.get(reverse("production:entries"), {"section": section.id})
+    assert resp.status_code == 200
+    assert PIN_COOKIE not in resp.cookies
+
+
+CONCURRENT_POSTS_SCRIPT = """
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import django
+
+django.setup()
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from production.models import Item, ProductionEntry, Section, TargetRule, Worker
+
+call_command("migrate", verbosity=0)
+user = get_user_model().objects.create(username="admin", is_superuser=True)
+section = Section.objects.create(name="Assembly", code="ASM")
+item = Item.objects.create(name="Widget", sku="ITM-001")
+TargetRule.objects.create(section=section, item=item, target_qty=100, shift_hours=8, start_date=date(2020, 1, 1))
+workers = Worker.objects.bulk_create([Worker(name=f"W{i}", employee_code=f"W{i:03d}") for i in range(240)])
+
+
+def submit(index):
+    client = Client()
+    client.force_login(user)
+    data = {"entry_date": date.today().isoformat(), "section": section.id, "form-TOTAL_FORMS": "10", "form-INITIAL_FORMS": "0"}
+    for row in range(10):
+        data.update({f"form-{row}-worker": workers[index * 10 + row].id, f"form-{row}-item": item.id, f"form-{row}-actual_qty": "110"})
+        data.update({f"form-{row}-target_qty": "0", f"form-{row}-shift_hours": "0"})
+    try:
+        return client.post(reverse("production:entry"), data).status_code
+    except Exception as exc:
+        return repr(exc)
+    finally:
+        connection.close()
+
+
+with ThreadPoolExecutor(max_workers=12) as pool:
+    results = list(pool.map(submit, range(24)))
+journal_mode = connection.cursor().execute("PRAGMA journal_mode").fetchone()[0]
+print(json.dumps({"results": results, "entries": ProductionEntry.objects.count(), "journal_mode": journal_mode}))
+"""
+
+
+def test_sqlite_production_mode_survives_concurrent_formset_posts(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    from django.conf import settings as django_settings
+
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "config.settings",
+        "DJANGO_DB_ENGINE": "django.db.backends.sqlite3",
+        "DJANGO_DB_NAME": str(tmp_path / "plant.sqlite3"),
+        "DJANGO_ALLOWED_HOSTS": "testserver",
+        "PRODUCTION_SLOW_REQUEST_MS": "0",
+        "PYTHONPATH": str(django_settings.BASE_DIR),
+    }
+    proc = subprocess.run([sys.executable, "-c", CONCURRENT_POSTS_SCRIPT], env=env, capture_output=True, text=True, timeout=300)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    outcome = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert outcome["results"] == [302] * 24
+    assert outcome["entries"] == 240
+    assert outcome["journal_mode"] == "wal"
+
+
+def test_async_views_match_sync_views(supervisor_user, section, worker, item, settings):
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient
+
+    from .benchmarks import RootURLConf
+
+    _make_entry(section, worker, item, supervisor_user)
+    other = Section.objects.create(name="Paint", code="PNT")
+    settings.ROOT_URLCONF = RootURLConf(async_views=True)
+    client = AsyncClient()
+    client.force_login(supervisor_user)
+
+    resp = async_to_sync(client.get)(reverse("production:entries"), {"section": section.id})
+    assert resp.status_code == 200
+    assert [entry.worker_id for entry in resp.context["entries"]] == [worker.id]
+    assert [s.id for s in resp.context["sections"]] == [section.id]
+    assert async_to_sync(client.get)(reverse("production:entries"), {"section": other.id}).status_code == 403
+
+    params = {"section": section.id, "entry_date": date.today().isoformat(), "form_count": 2}
+    resp = async_to_sync(client.get)(reverse("production:entry-row"), params)
+    assert resp.status_code == 200
+    assert 'name="form-2-worker"' in resp.content.decode()
+    assert 'value="3"' in resp.content.decode()
+    assert async_to_sync(client.get)(reverse("production:entry-row"), {**params, "section": other.id}).status_code == 403
+
+
+def test_entries_page_cached_and_revalidated_until_entries_change(admin_user, section, worker, item, client, settings, django_assert_num_queries):
+    # Off by default: without a shared alias every request renders and sends no ETag.
+    client.force_login(admin_user)
+    assert "ETag" not in client.get(reverse("production:entries")).headers
+    settings.PRODUCTION_PAGE_CACHE_ALIAS = settings.PRODUCTION_CHOICES_CACHE_ALIAS = "default"
+    _make_entry(section, worker, item, admin_user)
+    url = reverse("production:entries")
+    params = {"section": section.id}
+
+    first = client.get(url, params)
+    etag = first.headers["ETag"]
+    assert "private" in first.headers["Cache-Control"] and "no-cache" in first.headers["Cache-Control"]
+    # Session, user, access scope and section lookups only: no entry query on a cache hit.
+    with django_assert_num_queries(5):
+        second = client.get(url, params)
+    assert second.content == first.content and second.headers["ETag"] == etag
+    assert client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    other = Worker.objects.create(name="Other", employee_code="O001")
+    _make_entry(section, other, item, admin_user)
+    third = client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+    assert third.status_code == 200 and third.headers["ETag"] != etag
+    assert "Other" in third.content.decode()
+
+
+def test_entry_admin_changelist_has_fixed_query_budget(admin_user, section, item, client, settings):
+    settings.PRODUCTION_ADMIN_COUNT_LIMIT = 4
+    admin_user.is_staff = True
+    admin_user.save()
+    client.force_login(admin_user)
+    url = reverse("admin:production_productionentry_changelist")
+
+    def load(**params):
+        responses = []
+        queries = _count_queries(lambda: responses.append(client.get(url, params)))
+        assert responses[0].status_code == 200
+        return responses[0], queries
+
+    workers = [Worker.objects.create(name=f"Worker {i}", employee_code=f"A{i:03d}") for i in range(3)]
+    for worker in workers:
+        _make_entry(section, worker, item, admin_user)
+    _, few = load()
+    for i in range(3, 8):
+        _make_entry(section, Worker.objects.create(name=f"Worker {i}", employee_code=f"A{i:03d}"), item, admin_user)
+    resp, many = load()
+    assert few == many
+    # Counted up to the limit only, and the worker filter is an autocomplete widget, not a list.
+    assert resp.context["cl"].result_count == 4
+    html = resp.content.decode()
+    assert "admin-autocomplete" in html and "Worker 7" in html and "?worker__id__exact=" not in html
+
+    resp, _ = load(worker__id__exact=workers[0].id)
+    assert resp.context["cl"].result_count == 1
+    assert f'<option value="{workers[0].id}" selected>' in resp.content.decode()
+
+    params = {"app_label": "production", "model_name": "productionentry", "field_name": "worker", "term": "Worker 7"}
+    results = client.get(reverse("admin:autocomplete"), params).json()["results"]
+    assert [row["text"] for row in results] == ["Worker 7 (A007)"]
+
+
+def test_entry_targets_prefetch_is_cacheable_and_scoped(supervisor_user, section, item, target_rule, client):
+    other_item = Item.objects.create(name="Bolt", sku="BLT", unit=Item.UNIT_PCS)
+    client.force_login(supervisor_user)
+    url = reverse("production:entry-targets")
+    params = {"section": section.id, "entry_date": date.today().isoformat()}
+
+    resp = client.get(url, params)
+    assert resp.status_code == 200
+    assert resp.json()["targets"] == {str(item.id): ["100.00", "8.00"]}
+    assert str(other_item.id) not in resp.json()["targets"]
+    assert "max-age=300" in resp.headers["Cache-Control"] and "private" in resp.headers["Cache-Control"]
+    assert client.get(url, params, HTTP_IF_NONE_MATCH=resp.headers["ETag"]).status_code == 304
+
+    other = Section.objects.create(name="Paint", code="PNT")
+    assert client.get(url, {**params, "section": other.id}).status_code == 403
+    page = client.get(reverse("production:entry"), {"section": section.id})
+    assert page.context["targets"] == resp.json()
+    assert 'id="entry-targets"' in page.content.decode()
+
+
+def test_resubmitted_formset_upserts_on_natural_key(admin_user, section, worker, item, target_rule, client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    other = Worker.objects.create(name="Asha", employee_code="W002")
+    client.force_login(admin_user)
+    data = _formset_post_data(section, [(worker, item, 120), (other, item, 80)])
+    client.post(reverse("production:entry"), data=data)
+    first = _summary_tuple(section, item)
+
+    with CaptureQueriesContext(connection) as ctx:
+        client.post(reverse("production:entry"), data=data)
+    assert sum(1 for query in ctx.captured_queries if query["sql"].startswith("INSERT INTO \"production_productionentry\"")) == 1
+    assert ProductionEntry.objects.count() == 2
+    assert _summary_tuple(section, item) == first
+
+    resp = client.post(reverse("production:entry"), data={**data, "form-1-worker": worker.id})
+    assert resp.status_code == 200
+    assert "more than one row" in str(resp.context["formset"].non_form_errors())
+
+
+def test_entry_page_shows_duplicate_row_error(admin_user, section, worker, item, target_rule, client):
+    client.force_login(admin_user)
+    resp = client.post(reverse("production:entry"), data=_formset_post_data(section, [(worker, item, 120), (worker, item, 80)]))
+    assert resp.status_code == 200
+    assert f"{worker} has more than one row for {item}." in resp.content.decode()
+    assert not ProductionEntry.objects.exists()
+
+
+def test_upsert_counts_a_key_inserted_concurrently_once(admin_user, section, worker, item, monkeypatch):
+    from django.db.models import QuerySet
+
+    from .services import build_entry, upsert_entries
+
+    def entry(actual_qty):
+        row = {"worker": worker, "item": item, "actual_qty": actual_qty, "target_qty": "100", "shift_hours": "8"}
+        return build_entry(entry_date=date.today(), section=section, row=row, created_by=admin_user)
+
+    # Another writer inserts the same key after this batch started but before its INSERT runs.
+    bulk_create, rivals = QuerySet.bulk_create, [entry("90")]
+
+    def racing_bulk_create(self, objs, *args, **kwargs):
+        if rivals:
+            upsert_entries([rivals.pop()])
+        return bulk_create(self, objs, *args, **kwargs)
+
+    monkeypatch.setattr(QuerySet, "bulk_create", racing_bulk_create)
+    result = upsert_entries([entry("120")])
+    assert result.updated == {(date.today(), section.id, worker.id, item.id)}
+    assert ProductionEntry.objects.get().actual_qty == Decimal("120")
+    assert _summary_tuple(section, item) == (Decimal("120"), Decimal("100"), Decimal("1.60"), 1, 1)
+
+
+def test_entries_grid_bulk_edits_with_version_checks(supervisor_user, section, item, target_rule, client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    workers = [Worker.objects.create(name=f"Worker {i}", employee_code=f"G{i:03d}") for i in range(4)]
+    entries = [_make_entry(section, worker, item, supervisor_user, actual_qty="90") for worker in workers]
+    client.force_login(supervisor_user)
+    url = reverse("production:entries-grid") + f"?section={section.id}&date={date.today().isoformat()}"
+
+    page = client.get(url)
+    assert page.status_code == 200
+    assert f'data-version="{entries[0].updated_at.isoformat()}"' in page.content.decode()
+
+    edits = [{"id": entry.id, "version": entry.updated_at.isoformat(), "actual_qty": "120"} for entry in entries[:3]]
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.post(url, data=json.dumps({"rows": edits}), content_type="application/json")
+    assert resp.status_code == 200
+    assert sum(1 for query in ctx.captured_queries if query["sql"].startswith('UPDATE "production_productionentry"')) == 1
+    updated = {row["id"]: row for row in resp.json()["updated"]}
+    assert updated[entries[0].id]["target_met"] is True and updated[entries[0].id]["overtime_hours"] == "1.60"
+    assert _summary_tuple(section, item)[0] == Decimal("450")
+
+    # The first edit already bumped these versions, so replaying it is a conflict and saves nothing.
+    stale = [{**edits[0], "actual_qty": "10"}, {"id": entries[3].id, "version": entries[3].updated_at.isoformat(), "actual_qty": "10"}]
+    resp = client.post(url, data=json.dumps({"rows": stale}), content_type="application/json")
+    assert resp.status_code == 409
+    assert [row["id"] for row in resp.json()["conflicts"]] == [entries[0].id]
+    assert resp.json()["conflicts"][0]["actual_qty"] == "120.00"
+    assert ProductionEntry.objects.get(pk=entries[3].pk).actual_qty == Decimal("90")
+
+
+def test_entries_grid_refuses_shift_hour_edits_on_rule_backed_rows(supervisor_user, section, worker, item, target_rule, client):
+    free_item = Item.objects.create(name="Gadget", sku="ITM-002")
+    backed = _make_entry(section, worker, item, supervisor_user, actual_qty="90")
+    free = _make_entry(section, worker, free_item, supervisor_user, actual_qty="90", target_qty="100", shift_hours="8")
+    client.force_login(supervisor_user)
+    url = reverse("production:entries-grid") + f"?section={section.id}&date={date.today().isoformat()}"
+    assert 'value="8.00" data-original="8.00" readonly' in client.get(url).content.decode()
+
+    def post(entry, **values):
+        rows = [{"id": entry.id, "version": entry.updated_at.isoformat(), **values}]
+        return client.post(url, data=json.dumps({"rows": rows}), content_type="application/json")
+
+    resp = post(backed, actual_qty="120", shift_hours="10")
+    assert resp.status_code == 400
+    assert resp.json()["errors"] == [{"id": backed.id, "field": "shift_hours", "error": "Set by the target rule (8.00)"}]
+    assert ProductionEntry.objects.get(pk=backed.pk).actual_qty == Decimal("90")
+    # Resubmitting the rule's own value is fine, and rows without a rule keep their edited hours.
+    assert post(backed, actual_qty="120", shift_hours="8.00").status_code == 200
+    assert post(free, shift_hours="10").status_code == 200
+    assert ProductionEntry.objects.get(pk=free.pk).shift_hours == Decimal("10")
+
+
+def test_background_export_job_runs_on_worker_and_serves_result(supervisor_user, section, worker, item, client, settings, tmp_path):
+    from django.core.management import call_command
+
+    from . import jobs
+    from .models import Job
+
+    settings.PRODUCTION_JOB_RESULTS_DIR = tmp_path
+    _make_entry(section, worker, item, supervisor_user, actual_qty="120")
+    client.force_login(supervisor_user)
+    resp = client.get(reverse("production:entries-export"), {"background": "1"})
+    assert resp.status_code == 202
+    status_url = resp.json()["status_url"]
+    assert client.get(status_url).json()["status"] == "queued"
+
+    # Two workers never claim the same job; a claimed job no longer counts as queued.
+    job = jobs.claim("worker-a")
+    assert job is not None and jobs.claim("worker-b") is None
+    Job.objects.filter(pk=job.pk).update(status=Job.STATUS_RUNNING, heartbeat_at=job.heartbeat_at - timedelta(hours=1))
+    assert jobs.requeue_stale() == 1
+
+    call_command("run_production_worker", once=True, stdout=io.StringIO())
+    status = client.get(status_url).json()
+    assert (status["status"], status["progress"]) == ("succeeded", 2)
+    download = client.get(status["result_url"])
+    assert "attachment" in download["Content-Disposition"]
+    lines = b"".join(download.streaming_content).decode().splitlines()
+    assert lines[0].startswith("entry_date,section_code") and "W001" in lines[1]
+    assert not list(tmp_path.glob("*.part"))
+
+    other = get_user_model().objects.create_user(username="other", password="pass")
+    client.force_login(other)
+    assert client.get(status_url).status_code == 404
+
+
+def test_job_outcome_only_recorded_by_its_current_owner_and_results_expire(admin_user, settings, tmp_path):
+    import os
+    import time
+
+    from django.utils import timezone
+
+    from . import jobs
+    from .models import Job
+
+    settings.PRODUCTION_JOB_RESULTS_DIR = tmp_path
+    job = jobs.enqueue(Job.KIND_REBUILD_ROLLUPS, params={"start": "2026-09-01", "end": "2026-09-30"}, user=admin_user)
+    first = jobs.claim("worker-a")
+    # worker-a looks dead to the sweeper, so worker-b gets the job while worker-a is still busy.
+    Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+    assert jobs.requeue_stale() == 1
+    second = jobs.claim("worker-b")
+    lost = jobs.run(first)
+    assert (lost.status, lost.worker) == (Job.STATUS_RUNNING, "worker-b")
+    assert jobs.run(second).status == Job.STATUS_SUCCEEDED
+
+    (tmp_path / "old.csv").write_text("x")
+    stray = tmp_path / "old.csv.1.part"
+    stray.write_text("x")
+    os.utime(stray, (time.time() - 8 * 24 * 3600,) * 2)
+    Job.objects.filter(pk=job.pk).update(result_file="old.csv", finished_at=timezone.now() - timedelta(days=8))
+    assert jobs.purge_results() == 1
+    assert not list(tmp_path.iterdir())
+    assert Job.objects.get(pk=job.pk).result_file == ""
+
+
+def test_payroll_run_aggregates_daily_wage_workers_and_reruns_incrementally(supervisor_user, section, worker, item):
+    from . import payroll
+
+    Worker.objects.filter(pk=worker.pk).update(is_daily_wage=True)
+    helper = Worker.objects.create(name="Helper", employee_code="W002", is_daily_wage=True)
+    salaried = Worker.objects.create(name="Salaried", employee_code="W003")
+    other_item = Item.objects.create(name="Gadget", sku="ITM-002")
+    start, end = date(2026, 9, 1), date(2026, 9, 30)
+    _make_entry(section, worker, item, supervisor_user, entry_date=date(2026, 9, 1), actual_qty="120")
+    _make_entry(section, worker, other_item, supervisor_user, entry_date=date(2026, 9, 1), actual_qty="80")
+    second_day = _make_entry(section, worker, item, supervisor_user, entry_date=date(2026, 9, 2))
+    helper_entry = _make_entry(section, helper, item, supervisor_user, entry_date=date(2026, 9, 1), actual_qty="90")
+    _make_entry(section, salaried, item, supervisor_user, entry_date=date(2026, 9, 1), actual_qty="150")
+    _make_entry(section, worker, item, supervisor_user, entry_date=date(2026, 10, 1), actual_qty="150")
+
+    result = payroll.run_payroll(start=start, end=end, user=supervisor_user)
+    assert (result.created, result.run.worker_count) == (2, 2)
+    lines = {line.worker_id: line for line in result.run.lines.all()}
+    assert (lines[worker.id].days_worked, lines[worker.id].days_target_met, lines[worker.id].overtime_hours) == (2, 2, Decimal("1.60"))
+    assert (lines[helper.id].days_worked, lines[helper.id].days_target_met, lines[helper.id].overtime_hours) == (1, 0, Decimal("0"))
+
+    # Nothing changed: only the fingerprint query runs, no line is rewritten.
+    result = payroll.run_payroll(start=start, end=end)
+    assert (result.created, result.updated, result.deleted, result.unchanged) == (0, 0, 0, 2)
+
+    second_day.actual_qty = Decimal("150")
+    second_day.set_outcomes()
+    second_day.save()
+    helper_entry.delete()
+    result = payroll.run_payroll(start=start, end=end)
+    assert (result.created, result.updated, result.deleted, result.unchanged) == (0, 1, 1, 0)
+    assert result.run.worker_count == 1
+    assert result.run.lines.get().overtime_hours == Decimal("5.60")
+
+    assert payroll.finalize(result.run)
+    with pytest.raises(ValueError):
+        payroll.run_payroll(start=start, end=end)
+
+
+def test_payroll_job_is_queued_by_admins_and_run_by_worker(admin_user, supervisor_user, section, worker, item, client):
+    from django.core.management import call_command
+
+    from .models import Job, PayrollRun
+
+    Worker.objects.filter(pk=worker.pk).update(is_daily_wage=True)
+    _make_entry(section, worker, item, supervisor_user, entry_date=date(2026, 9, 3), actual_qty="110")
+    client.force_login(admin_user)
+    resp = client.post(
+        reverse("production:jobs"),
+        data=json.dumps({"kind": "payroll", "start": "2026-09-01", "end": "2026-09-30"}),
+        content_type="application/json",
+    )
+    assert resp.status_code == 202
+
+    call_command("run_production_worker", once=True, stdout=io.StringIO())
+    job = Job.objects.get()
+    assert (job.kind, job.status, job.progress) == (Job.KIND_PAYROLL, Job.STATUS_SUCCEEDED, 1)
+    run = PayrollRun.objects.get(period_start=date(2026, 9, 1), period_end=date(2026, 9, 30))
+    assert run.computed_by == admin_user
+    assert run.lines.get().overtime_hours == Decimal("0.80")
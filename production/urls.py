@@ -1,10 +1,30 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
 app_name = "production"
-urlpatterns = [
-    path("entry/", views.production_entry, name="entry"),
-    path("entries/", views.production_entries, name="entries"),
-    path("entry/row/", views.production_entry_row, name="entry-row"),
-]
+
+
+def build_urlpatterns(*, async_views: bool) -> list:
+    # Under ASGI the high-traffic entry-row and listing endpoints can use their async twins.
+    return [
+        path("entry/", views.production_entry, name="entry"),
+        path("entries/", views.aproduction_entries if async_views else views.production_entries, name="entries"),
+        path("entries/grid/", views.production_entries_grid, name="entries-grid"),
+        path("entries/export/", views.production_entries_export, name="entries-export"),
+        path("entry/targets/", views.production_entry_targets, name="entry-targets"),
+        path("entry/row/", views.aproduction_entry_row if async_views else views.production_entry_row, name="entry-row"),
+        path("reports/workers/", views.worker_report, name="worker-report"),
+        path("api/entries/", views.production_entries_api, name="entries-api"),
+        path("api/workers/", views.worker_lookup, name="worker-lookup"),
+        path("api/items/", views.item_lookup, name="item-lookup"),
+        path("api/entries/batch/", views.ingest_entries_api, name="entries-ingest"),
+        path("jobs/", views.enqueue_job, name="jobs"),
+        path("jobs/<int:job_id>/", views.job_status, name="job"),
+        path("jobs/<int:job_id>/result/", views.job_result, name="job-result"),
+        path("api/reports/workers/", views.worker_report_api, name="worker-report-api"),
+    ]
+
+
+urlpatterns = build_urlpatterns(async_views=getattr(settings, "PRODUCTION_ASYNC_VIEWS", False))
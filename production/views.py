@@ -1,40 +1,85 @@
 from __future__ import annotations
 
+import hashlib
+import hmac
+import json
 from datetime import date
-from decimal import Decimal
+from typing import Optional
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import Group
-from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
-from django.shortcuts import get_object_or_404, redirect, render
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
+from django.urls import reverse
 from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 
+from . import exports, grid, jobs, reports
+from .choices import LOOKUP_LIMIT, lookup, master_fragments
 from .forms import ProductionEntryForm, ProductionEntryFormSet
-from .models import Item, ProductionEntry, Section, TargetRule, Worker
+from .metrics import registry as metrics_registry
+from .models import ApiToken, IngestionBatch, Item, Job, ProductionEntry, Section
+from .pagecache import entry_pages
+from .pagination import apaginate, page_size, paginate
+from .permissions import aget_scope, get_scope
+from .resolver import target_resolver
+from .routers import reading_replica, replica_reads
+from .services import RowError, ingest_rows, save_entries
 
 ROLE_ADMIN = "ADMIN"
 ROLE_SUPERVISOR = "SUPERVISOR"
 
 
+def _has_role(user, scope, role: str) -> bool:
+    return user.is_superuser or scope.has_group(role)
+
+
+def _sections_for(user, scope):
+    if _has_role(user, scope, ROLE_ADMIN):
+        return Section.objects.filter(is_active=True)
+    return Section.objects.filter(is_active=True, id__in=scope.section_ids)
+
+
+def _may_enter(user, scope, section: Section) -> bool:
+    if _has_role(user, scope, ROLE_ADMIN):
+        return True
+    return _has_role(user, scope, ROLE_SUPERVISOR) and scope.supervises(section.id)
+
+
 def _user_has_role(user, role: str) -> bool:
-    return user.is_superuser or user.groups.filter(name=role).exists()
+    return _has_role(user, get_scope(user), role)
 
 
 def _available_sections(user):
-    if _user_has_role(user, ROLE_ADMIN):
-        return Section.objects.filter(is_active=True)
-    return Section.objects.filter(is_active=True, supervisors=user)
+    return _sections_for(user, get_scope(user))
 
 
 def _ensure_permission(user, section: Section) -> bool:
-    if _user_has_role(user, ROLE_ADMIN):
-        return True
-    return _user_has_role(user, ROLE_SUPERVISOR) and section.supervisors.filter(id=user.id).exists()
+    return _may_enter(user, get_scope(user), section)
+
+
+async def _aavailable_sections(user):
+    return _sections_for(user, await aget_scope(user))
+
 
+async def _aensure_permission(user, section: Section) -> bool:
+    return _may_enter(user, await aget_scope(user), section)
 
-def _target_for(section: Section, item: Item, entry_date: date):
-    return TargetRule.objects.for_section_item_date(section=section, item=item, target_date=entry_date).first()
+
+def _target_payload(section: Section, entry_date_val: date) -> dict:
+    # Every active item's resolved target for the day, as compact [target_qty, shift_hours] strings.
+    item_ids = list(Item.objects.filter(is_active=True).values_list("id", flat=True))
+    rules = target_resolver.resolve_many(section=section, items=item_ids, target_date=entry_date_val)
+    return {
+        "section": section.id,
+        "entry_date": entry_date_val.isoformat(),
+        "targets": {str(item_id): [str(rule.target_qty), str(rule.shift_hours)] for item_id, rule in rules.items()},
+    }
 
 
 @login_required
@@ -57,22 +102,13 @@ def production_entry(request: HttpRequest) -> HttpResponse:
         if not selected_section:
             messages.error(request, "Section is required")
         if formset.is_valid() and selected_section:
-            created_entries = []
-            for form in formset:
-                data = form.cleaned_data
-                entry = ProductionEntry(
-                    entry_date=entry_date_val,
-                    section=selected_section,
-                    worker=data["worker"],
-                    item=data["item"],
-                    target_qty=Decimal(data.get("target_qty") or 0),
-                    actual_qty=Decimal(data.get("actual_qty") or 0),
-                    shift_hours=Decimal(data.get("shift_hours") or 0),
-                    created_by=request.user,
-                )
-                entry.set_outcomes()
-                entry.save()
-                created_entries.append(entry)
+            created_entries = save_entries(
+                entry_date=entry_date_val,
+                section=selected_section,
+                rows=[form.cleaned_data for form in formset],
+                created_by=request.user,
+            )
+            for entry in created_entries:
                 if entry.target_qty <= 0:
                     messages.warning(request, f"No target rule found for {entry.item}; overtime set to 0")
             messages.success(request, f"Saved {len(created_entries)} production entr{'y' if len(created_entries)==1 else 'ies'}")
@@ -85,13 +121,76 @@ def production_entry(request: HttpRequest) -> HttpResponse:
         "entry_date": entry_date_val,
         "sections": sections,
         "selected_section": selected_section,
+        # Embedded so the first section/date fills targets without a request.
+        "targets": _target_payload(selected_section, entry_date_val) if selected_section else None,
     }
     return render(request, "production/entry_form.html", context)
 
 
+@login_required
+@require_GET
+@replica_reads
+def production_entry_targets(request: HttpRequest) -> HttpResponse:
+    # Targets only feed the client-side preview; the formset re-resolves them in bulk on submit.
+    try:
+        entry_date_val = date.fromisoformat(request.GET["entry_date"]) if request.GET.get("entry_date") else date.today()
+        section_id = int(request.GET["section"])
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "Invalid filters"}, status=400)
+    section = get_object_or_404(Section, id=section_id)
+    if not _ensure_permission(request.user, section):
+        return JsonResponse({"error": "Not allowed"}, status=403)
+    body = json.dumps(_target_payload(section, entry_date_val), separators=(",", ":"))
+    etag = quote_etag(hashlib.sha1(body.encode()).hexdigest())
+    response = get_conditional_response(request, etag=etag) or HttpResponse(body, content_type="application/json")
+    response.headers["ETag"] = etag
+    patch_cache_control(response, private=True, max_age=getattr(settings, "PRODUCTION_TARGETS_MAX_AGE", 300))
+    patch_vary_headers(response, ["Cookie"])
+    return response
+
+
+def _master_lookup(request: HttpRequest, kind: str) -> HttpResponse:
+    try:
+        section = get_object_or_404(Section, id=int(request.GET["section"]))
+        limit = int(request.GET.get("limit") or LOOKUP_LIMIT)
+        on = date.fromisoformat(request.GET["entry_date"]) if request.GET.get("entry_date") else date.today()
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "Invalid filters"}, status=400)
+    if not _ensure_permission(request.user, section):
+        return JsonResponse({"error": "Not allowed"}, status=403)
+    return JsonResponse({"results": lookup(kind, request.GET.get("q", ""), section_id=section.id, on=on, limit=limit)})
+
+
+@login_required
+@require_GET
+@replica_reads
+def worker_lookup(request: HttpRequest) -> HttpResponse:
+    return _master_lookup(request, "worker")
+
+
+@login_required
+@require_GET
+@replica_reads
+def item_lookup(request: HttpRequest) -> HttpResponse:
+    return _master_lookup(request, "item")
+
+
+def _entry_row_html(section: Optional[Section], entry_date_val: date) -> str:
+    return render_to_string(
+        "production/entry_row.html",
+        {"form": ProductionEntryForm(prefix="form-__prefix__", section=section, entry_date=entry_date_val)},
+    )
+
+
+def _entry_row_response(row_html: str, form_count: int) -> HttpResponse:
+    html = row_html.replace("__prefix__", str(form_count)) + render_to_string(
+        "production/entry_row_total.html", {"total_forms": form_count + 1}
+    )
+    return HttpResponse(html)
+
+
 @login_required
 def production_entry_row(request: HttpRequest) -> HttpResponse:
-    sections = _available_sections(request.user)
     section_id = request.GET.get("section")
     entry_date_str = request.GET.get("entry_date")
     form_count = int(request.GET.get("form_count", 0))
@@ -99,16 +198,74 @@ def production_entry_row(request: HttpRequest) -> HttpResponse:
     if section and not _ensure_permission(request.user, section):
         return HttpResponseForbidden("Not allowed")
     entry_date_val = date.fromisoformat(entry_date_str) if entry_date_str else date.today()
-    form = ProductionEntryForm(prefix=f"form-{form_count}", section=section, entry_date=entry_date_val)
-    html = render_to_string(
-        "production/entry_row.html",
-        {"form": form, "index": form_count, "next_index": form_count + 1},
-        request=request,
+    # The row markup only depends on section, date and master data; render it once with a
+    # placeholder prefix and stamp in this request's form index.
+    row_html = master_fragments.cached_fragment(
+        "entry-row",
+        section.id if section else "",
+        entry_date_val.isoformat(),
+        build=lambda: _entry_row_html(section, entry_date_val),
     )
-    return HttpResponse(html)
+    return _entry_row_response(row_html, form_count)
 
 
 @login_required
+async def aproduction_entry_row(request: HttpRequest) -> HttpResponse:
+    # ASGI twin of production_entry_row (PRODUCTION_ASYNC_VIEWS); only a cache miss leaves the event loop.
+    user = await request.auser()
+    section_id = request.GET.get("section")
+    entry_date_str = request.GET.get("entry_date")
+    form_count = int(request.GET.get("form_count", 0))
+    section = await aget_object_or_404(Section, id=section_id) if section_id else None
+    if section and not await _aensure_permission(user, section):
+        return HttpResponseForbidden("Not allowed")
+    entry_date_val = date.fromisoformat(entry_date_str) if entry_date_str else date.today()
+    row_html = await master_fragments.acached_fragment(
+        "entry-row",
+        section.id if section else "",
+        entry_date_val.isoformat(),
+        build=lambda: sync_to_async(_entry_row_html)(section, entry_date_val),
+    )
+    return _entry_row_response(row_html, form_count)
+
+
+ENTRY_LIST_ORDERING = ["section_id", "worker_id", "id"]
+
+
+def _entries_for_day(sections, entry_date_val: date, selected_section):
+    entries = ProductionEntry.objects.filter(entry_date=entry_date_val)
+    if selected_section:
+        return entries.filter(section=selected_section)
+    return entries.filter(section__in=sections)
+
+
+def _entries_page_key(request, entry_date_val: date, selected_section, section_ids: list, versions: list, master_version: str) -> str:
+    # Visible section ids stand in for the access scope: the page shows nothing else user-specific.
+    return entry_pages.page_key(
+        entry_date=entry_date_val,
+        section_id=selected_section.id if selected_section else None,
+        scope=",".join(str(pk) for pk in sorted(section_ids)),
+        versions=versions,
+        extra=master_version,
+        query=request.GET.urlencode(),
+    )
+
+
+def _caching_pages() -> bool:
+    # Page keys include the master-data version, which is only shared when its cache is.
+    return entry_pages.enabled and master_fragments.enabled
+
+
+def _revalidate(response: HttpResponse, etag: str) -> HttpResponse:
+    # Browsers keep the page but must revalidate; a matching ETag costs no entry queries.
+    response.headers["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ["Cookie"])
+    return response
+
+
+@login_required
+@replica_reads
 def production_entries(request: HttpRequest) -> HttpResponse:
     sections = _available_sections(request.user)
     entry_date_str = request.GET.get("date")
@@ -117,14 +274,422 @@ def production_entries(request: HttpRequest) -> HttpResponse:
     selected_section = Section.objects.filter(id=section_id).first() if section_id else None
     if selected_section and not _ensure_permission(request.user, selected_section):
         return HttpResponseForbidden("Not allowed")
-    entries = ProductionEntry.objects.select_related("worker", "item", "section").filter(entry_date=entry_date_val)
-    if selected_section:
-        entries = entries.filter(section=selected_section)
-    entries = entries.order_by("section__name", "worker__name")
+    # Replicas may lag the version tokens, so their pages are never cached or validated.
+    etag = None
+    if _caching_pages() and not reading_replica():
+        section_ids = [selected_section.id] if selected_section else list(sections.values_list("id", flat=True))
+        versions = entry_pages.versions(entry_date_val, section_ids)
+        key = _entries_page_key(request, entry_date_val, selected_section, section_ids, versions, master_fragments.version())
+        etag = quote_etag(key)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return _revalidate(not_modified, etag)
+        cached = entry_pages.get(key)
+        if cached is not None:
+            return _revalidate(HttpResponse(cached), etag)
+    entries = _entries_for_day(sections, entry_date_val, selected_section).select_related("worker", "item", "section")
+    try:
+        entries, next_cursor = paginate(entries, ENTRY_LIST_ORDERING, request.GET.get("cursor"), page_size(request.GET.get("limit")))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid page")
     context = {
         "entries": entries,
         "entry_date": entry_date_val,
         "sections": sections,
         "selected_section": selected_section,
+        "next_cursor": next_cursor,
+    }
+    response = render(request, "production/entries_list.html", context)
+    if etag is None:
+        return response
+    entry_pages.set(key, response.content.decode())
+    return _revalidate(response, etag)
+
+
+@login_required
+@replica_reads
+async def aproduction_entries(request: HttpRequest) -> HttpResponse:
+    # ASGI twin of production_entries; everything the template touches is loaded up front.
+    user = request.user = await request.auser()
+    sections = await _aavailable_sections(user)
+    entry_date_str = request.GET.get("date")
+    section_id = request.GET.get("section")
+    entry_date_val = date.fromisoformat(entry_date_str) if entry_date_str else date.today()
+    selected_section = await Section.objects.filter(id=section_id).afirst() if section_id else None
+    if selected_section and not await _aensure_permission(user, selected_section):
+        return HttpResponseForbidden("Not allowed")
+    etag = None
+    if _caching_pages() and not reading_replica():
+        section_ids = [selected_section.id] if selected_section else [pk async for pk in sections.values_list("id", flat=True)]
+        versions = await entry_pages.aversions(entry_date_val, section_ids)
+        key = _entries_page_key(request, entry_date_val, selected_section, section_ids, versions, await master_fragments.aversion())
+        etag = quote_etag(key)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return _revalidate(not_modified, etag)
+        cached = await entry_pages.aget(key)
+        if cached is not None:
+            return _revalidate(HttpResponse(cached), etag)
+    entries = _entries_for_day(sections, entry_date_val, selected_section).select_related("worker", "item", "section")
+    try:
+        entries, next_cursor = await apaginate(entries, ENTRY_LIST_ORDERING, request.GET.get("cursor"), page_size(request.GET.get("limit")))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid page")
+    context = {
+        "entries": entries,
+        "entry_date": entry_date_val,
+        "sections": [section async for section in sections],
+        "selected_section": selected_section,
+        "next_cursor": next_cursor,
+    }
+    response = render(request, "production/entries_list.html", context)
+    if etag is None:
+        return response
+    await entry_pages.aset(key, response.content.decode())
+    return _revalidate(response, etag)
+
+
+@login_required
+def production_entries_grid(request: HttpRequest) -> HttpResponse:
+    # GET renders one (section, date) as an editable grid; POST takes only the changed rows as
+    # JSON and applies them in one bulk_update, or answers 409 with the rows changed meanwhile.
+    try:
+        entry_date_val = date.fromisoformat(request.GET["date"]) if request.GET.get("date") else date.today()
+        section = get_object_or_404(Section, id=int(request.GET["section"]))
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest("A section and a valid date are required")
+    if not _ensure_permission(request.user, section):
+        return HttpResponseForbidden("Not allowed")
+
+    if request.method != "POST":
+        entries = (
+            ProductionEntry.objects.filter(section=section, entry_date=entry_date_val)
+            .select_related("worker", "item")
+            .order_by(*ENTRY_LIST_ORDERING)
+        )
+        entries = list(entries)
+        rules = target_resolver.resolve_many(section=section, items={entry.item_id for entry in entries}, target_date=entry_date_val)
+        for entry in entries:
+            # Rule-backed shift hours are shown read-only; apply_edits refuses changes to them.
+            entry.rule_backed = entry.item_id in rules
+        context = {"entries": entries, "entry_date": entry_date_val, "section": section}
+        return render(request, "production/entries_grid.html", context)
+
+    try:
+        edits = json.loads(request.body)["rows"]
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({"error": 'Body must be a JSON object with a "rows" array'}, status=400)
+    if not isinstance(edits, list):
+        return JsonResponse({"error": '"rows" must be an array'}, status=400)
+    max_rows = getattr(settings, "PRODUCTION_INGEST_MAX_ROWS", 5000)
+    if len(edits) > max_rows:
+        return JsonResponse({"error": f"At most {max_rows} rows per request"}, status=413)
+    try:
+        result = grid.apply_edits(section=section, entry_date=entry_date_val, edits=edits)
+    except RowError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    if result.conflicts:
+        return JsonResponse({"error": "Rows were changed by someone else", "conflicts": result.conflicts}, status=409)
+    if result.errors:
+        return JsonResponse({"error": "Some cells cannot be changed", "errors": result.errors}, status=400)
+    return JsonResponse({"updated": [grid.grid_row(entry) for entry in result.updated]})
+
+
+@login_required
+@replica_reads
+def production_entries_api(request: HttpRequest) -> HttpResponse:
+    try:
+        entry_date_val = date.fromisoformat(request.GET["date"]) if request.GET.get("date") else date.today()
+        section_id = int(request.GET["section"]) if request.GET.get("section") else None
+        limit = page_size(request.GET.get("limit"))
+    except ValueError:
+        return JsonResponse({"error": "Invalid filters"}, status=400)
+    selected_section = get_object_or_404(Section, id=section_id) if section_id else None
+    if selected_section and not _ensure_permission(request.user, selected_section):
+        return JsonResponse({"error": "Not allowed"}, status=403)
+    entries = _entries_for_day(_available_sections(request.user), entry_date_val, selected_section).values(
+        "id",
+        "entry_date",
+        "section_id",
+        "section__name",
+        "worker_id",
+        "worker__name",
+        "item_id",
+        "item__name",
+        "target_qty",
+        "actual_qty",
+        "shift_hours",
+        "overtime_hours",
+        "target_met",
+    )
+    try:
+        rows, next_cursor = paginate(entries, ENTRY_LIST_ORDERING, request.GET.get("cursor"), limit)
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+    return JsonResponse({"results": rows, "next_cursor": next_cursor})
+
+
+@login_required
+@replica_reads
+def production_entries_export(request: HttpRequest) -> HttpResponse:
+    sections = _available_sections(request.user)
+    try:
+        start = date.fromisoformat(request.GET["start"]) if request.GET.get("start") else date.today()
+        end = date.fromisoformat(request.GET["end"]) if request.GET.get("end") else start
+        section_id = int(request.GET["section"]) if request.GET.get("section") else None
+        worker_id = int(request.GET["worker"]) if request.GET.get("worker") else None
+        item_id = int(request.GET["item"]) if request.GET.get("item") else None
+    except ValueError:
+        return HttpResponseBadRequest("Invalid export filters")
+    if end < start:
+        return HttpResponseBadRequest("End date cannot be earlier than start date")
+    export_format = request.GET.get("format", "csv")
+    if export_format not in ("csv", "ndjson"):
+        return HttpResponseBadRequest("Unsupported export format")
+    if section_id:
+        selected_section = get_object_or_404(Section, id=section_id)
+        if not _ensure_permission(request.user, selected_section):
+            return HttpResponseForbidden("Not allowed")
+
+    if request.GET.get("background"):
+        # Large ranges run on run_production_worker; the client polls the job and downloads the file.
+        params = {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "section_ids": list(sections.values_list("id", flat=True)),
+            "section_id": section_id,
+            "worker_id": worker_id,
+            "item_id": item_id,
+            "format": export_format,
+        }
+        return _job_accepted(jobs.enqueue(Job.KIND_EXPORT, params=params, user=request.user))
+
+    rows = exports.iter_rows(
+        exports.export_queryset(
+            sections=sections, start=start, end=end, section_id=section_id, worker_id=worker_id, item_id=item_id
+        )
+    )
+    if export_format == "ndjson":
+        response = StreamingHttpResponse(exports.stream_ndjson(rows), content_type="application/x-ndjson")
+    else:
+        response = StreamingHttpResponse(exports.stream_csv(rows), content_type="text/csv")
+    filename = f"production-{start.isoformat()}-{end.isoformat()}.{export_format}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _job_payload(job: Job) -> dict:
+    payload = {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "message": job.message,
+        "status_url": reverse("production:job", args=[job.id]),
+    }
+    if job.status == Job.STATUS_FAILED:
+        payload["error"] = job.error.strip().splitlines()[-1] if job.error.strip() else "Failed"
+    if job.result_file:
+        payload["result_url"] = reverse("production:job-result", args=[job.id])
+    return payload
+
+
+def _job_accepted(job: Job) -> JsonResponse:
+    return JsonResponse(_job_payload(job), status=202)
+
+
+def _own_job(request: HttpRequest, job_id: int) -> Job:
+    jobs_seen = Job.objects.all() if request.user.is_superuser else Job.objects.filter(created_by=request.user)
+    return get_object_or_404(jobs_seen, id=job_id)
+
+
+@login_required
+@require_POST
+def enqueue_job(request: HttpRequest) -> HttpResponse:
+    # Admins queue recomputes, rollup rebuilds and payroll runs: {"kind", "start", "end", "section_ids"?, "item_ids"?}.
+    if not _user_has_role(request.user, ROLE_ADMIN):
+        return JsonResponse({"error": "Not allowed"}, status=403)
+    try:
+        payload = json.loads(request.body)
+        kind = payload["kind"]
+        start, end = date.fromisoformat(payload["start"]), date.fromisoformat(payload["end"])
+        section_ids = [int(pk) for pk in payload["section_ids"]] if payload.get("section_ids") else None
+        item_ids = [int(pk) for pk in payload["item_ids"]] if payload.get("item_ids") else None
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({"error": "Body must be a JSON object with kind, start and end"}, status=400)
+    if kind not in (Job.KIND_RECOMPUTE, Job.KIND_REBUILD_ROLLUPS, Job.KIND_PAYROLL):
+        return JsonResponse({"error": f"Unknown job kind {kind!r}"}, status=400)
+    if end < start:
+        return JsonResponse({"error": "End date cannot be earlier than start date"}, status=400)
+    params = {"start": start.isoformat(), "end": end.isoformat()}
+    if kind != Job.KIND_PAYROLL:
+        # Payroll always covers every section a daily-wage worker booked.
+        params["section_ids"] = section_ids
+    if kind == Job.KIND_RECOMPUTE:
+        params["item_ids"] = item_ids
+    return _job_accepted(jobs.enqueue(kind, params=params, user=request.user))
+
+
+@login_required
+@require_GET
+def job_status(request: HttpRequest, job_id: int) -> HttpResponse:
+    response = JsonResponse(_job_payload(_own_job(request, job_id)))
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+@login_required
+@require_GET
+def job_result(request: HttpRequest, job_id: int) -> HttpResponse:
+    job = _own_job(request, job_id)
+    path = jobs.result_path(job)
+    if job.status != Job.STATUS_SUCCEEDED or path is None or not path.exists():
+        raise Http404("No result for this job")
+    return FileResponse(path.open("rb"), as_attachment=True, filename=path.name.split("-", 2)[-1])
+
+
+def _worker_report(request: HttpRequest):
+    today = date.today()
+    start = date.fromisoformat(request.GET["start"]) if request.GET.get("start") else today.replace(day=1)
+    end = date.fromisoformat(request.GET["end"]) if request.GET.get("end") else today
+    section_id = int(request.GET["section"]) if request.GET.get("section") else None
+    daily_wage = {"1": True, "0": False}.get(request.GET.get("daily_wage", ""))
+    by_item = request.GET.get("by_item") == "1"
+    limit = page_size(request.GET.get("limit"))
+    if end < start:
+        raise ValueError("End date cannot be earlier than start date")
+    rows = reports.worker_performance(
+        sections=_available_sections(request.user),
+        start=start,
+        end=end,
+        section_id=section_id,
+        daily_wage=daily_wage,
+        by_item=by_item,
+    )
+    ordering = reports.WORKER_ITEM_ORDERING if by_item else reports.WORKER_ORDERING
+    page, next_cursor = paginate(rows, ordering, request.GET.get("cursor"), limit)
+    return {
+        "start": start,
+        "end": end,
+        "section_id": section_id,
+        "daily_wage": daily_wage,
+        "by_item": by_item,
+        "rows": [reports.worker_performance_row(row) for row in page],
+        "next_cursor": next_cursor,
+    }
+
+
+def _section_allowed(request: HttpRequest) -> bool:
+    section_id = request.GET.get("section")
+    if not section_id:
+        return True
+    section = get_object_or_404(Section, id=section_id)
+    return _ensure_permission(request.user, section)
+
+
+@login_required
+@replica_reads
+def worker_report(request: HttpRequest) -> HttpResponse:
+    try:
+        if not _section_allowed(request):
+            return HttpResponseForbidden("Not allowed")
+        report = _worker_report(request)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc) or "Invalid report filters")
+    context = {**report, "sections": _available_sections(request.user)}
+    return render(request, "production/worker_report.html", context)
+
+
+@login_required
+@replica_reads
+def worker_report_api(request: HttpRequest) -> HttpResponse:
+    try:
+        if not _section_allowed(request):
+            return JsonResponse({"error": "Not allowed"}, status=403)
+        report = _worker_report(request)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc) or "Invalid report filters"}, status=400)
+    report["start"] = report["start"].isoformat()
+    report["end"] = report["end"].isoformat()
+    return JsonResponse(report)
+
+
+def _api_token(request: HttpRequest):
+    scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "token" or not key.strip():
+        return None
+    return ApiToken.objects.for_key(key.strip())
+
+
+def _replay(batch: IngestionBatch) -> HttpResponse:
+    response = JsonResponse(batch.response, status=batch.status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+@csrf_exempt
+@require_POST
+def ingest_entries_api(request: HttpRequest) -> HttpResponse:
+    token = _api_token(request)
+    if token is None:
+        return JsonResponse({"error": "Invalid or missing API token"}, status=401)
+    user = token.user
+    is_admin = _user_has_role(user, ROLE_ADMIN)
+    if not (is_admin or _user_has_role(user, ROLE_SUPERVISOR)):
+        return JsonResponse({"error": "Not allowed"}, status=403)
+
+    idempotency_key = request.headers.get("Idempotency-Key", "").strip()[:255]
+    if idempotency_key:
+        existing = IngestionBatch.objects.filter(token=token, idempotency_key=idempotency_key).first()
+        if existing:
+            return _replay(existing)
+
+    try:
+        payload = json.loads(request.body)
+        rows = payload["entries"]
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({"error": 'Body must be a JSON object with an "entries" array'}, status=400)
+    if not isinstance(rows, list) or not rows:
+        return JsonResponse({"error": '"entries" must be a non-empty array'}, status=400)
+    max_rows = getattr(settings, "PRODUCTION_INGEST_MAX_ROWS", 5000)
+    if len(rows) > max_rows:
+        return JsonResponse({"error": f"At most {max_rows} entries per request"}, status=413)
+
+    try:
+        with transaction.atomic():
+            batch = IngestionBatch.objects.create(token=token, idempotency_key=idempotency_key) if idempotency_key else None
+            results = ingest_rows(
+                rows=rows,
+                created_by_id=user.pk,
+                allowed_section_ids=None if is_admin else set(get_scope(user).section_ids),
+            )
+            counts = {status: sum(1 for result in results if result["status"] == status) for status in ("created", "updated", "rejected")}
+            body = {**counts, "results": results}
+            if batch:
+                batch.status_code = 200
+                batch.response = body
+                batch.save(update_fields=["status_code", "response"])
+    except IntegrityError:
+        # A concurrent retry with the same key committed first.
+        existing = IngestionBatch.objects.filter(token=token, idempotency_key=idempotency_key).first()
+        if existing:
+            return _replay(existing)
+        raise
+    return JsonResponse(body)
+
+
+@require_GET
+def metrics(request: HttpRequest) -> HttpResponse:
+    expected = getattr(settings, "PRODUCTION_METRICS_TOKEN", "")
+    if expected:
+        scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(key.strip(), expected):
+            return HttpResponseForbidden("Invalid metrics token")
+    resolver_stats = target_resolver.stats()
+    extra = {
+        "production_target_resolver_hits": resolver_stats["hits"],
+        "production_target_resolver_misses": resolver_stats["misses"],
+        "production_target_resolver_invalidations": resolver_stats["invalidations"],
+        "production_target_resolver_pairs": resolver_stats["pairs"],
     }
-    return render(request, "production/entries_list.html", context)
+    return HttpResponse(metrics_registry.render(extra), content_type="text/plain; version=0.0.4; charset=utf-8")